@@ -0,0 +1,251 @@
+"""
+Anomaly detection over the snapshot history.
+
+The status colors on the cards come from fixed thresholds, which miss a sudden
+drop that still lands inside the "healthy" band. AnomalyDetector scores every
+numeric history column (all three views, plus the derived health score) against
+its own recent behaviour instead:
+
+- a rolling baseline per column: exponentially weighted mean and variance with
+  a span of BASELINE_SPAN snapshots
+- a seasonal baseline per column and UTC hour of day, used once that hour has
+  MIN_SEASONAL_OBSERVATIONS snapshots (nightly loads move some counts on a
+  daily rhythm)
+
+A snapshot is anomalous in a column when it lies more than Z_THRESHOLD
+standard deviations from the baseline. The deviation is floored at
+MIN_STD and at MIN_RELATIVE_STD of the baseline, so a long-flat series does
+not alert on a one-unit step or on rounding noise. All columns are scored and
+updated at once with NumPy. Each new snapshot costs one vector update, not a
+pass over the window. The state is saved next to the history and resumes from
+its last snapshot, so a restart replays only newer history rows.
+
+Detected anomalies are appended to a JSON-lines alert sink (DQ_ALERT_SINK,
+default DQ_CACHE_DIR/alerts.jsonl). The dashboard flags them on the cards.
+
+Usage:
+    python anomalies.py [--days 30] [--rebuild]
+"""
+
+import argparse
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+
+from health import calculate_health_scores
+from history_store import KEY_COLUMN, HistoryStore, history_schema
+from loaders import CACHE_DIR
+
+DEFAULT_STATE = os.path.join(CACHE_DIR, "anomaly_state.npz")
+ALERT_SINK = os.environ.get("DQ_ALERT_SINK") or os.path.join(CACHE_DIR, "alerts.jsonl")
+
+Z_THRESHOLD = float(os.environ.get("DQ_ANOMALY_Z", "4"))
+
+BASELINE_SPAN = 288            # about a day of 5-minute snapshots
+SEASONAL_SPAN = 14             # about two weeks of one hour's snapshots
+MIN_OBSERVATIONS = 12          # before a column is scored at all
+MIN_SEASONAL_OBSERVATIONS = 7
+MIN_RELATIVE_STD = 0.002       # 0.2% of the baseline
+MIN_STD = 0.5                  # half a count or percentage point
+
+HOURS = 24
+
+HEALTH_COLUMN = 'health_score'
+
+Anomaly = namedtuple('Anomaly', ['snapshot_at', 'column', 'value', 'baseline', 'std', 'z', 'seasonal'])
+
+
+def anomaly_columns():
+    """Return the scored columns: every numeric history column, plus the health score."""
+    numeric = [
+        field.name for field in history_schema()
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+    ]
+    return numeric + [HEALTH_COLUMN]
+
+
+def _values(history, columns):
+    """Return the history rows as a float64 (rows, columns) matrix, nulls as NaN."""
+    scores = calculate_health_scores(history).score
+    return np.column_stack([
+        scores.astype(np.float64) if column == HEALTH_COLUMN else np.asarray(history[column], dtype=np.float64)
+        for column in columns
+    ])
+
+
+def _ewma_update(count, mean, var, values, valid, span):
+    """Fold one observation per column into exponentially weighted mean/variance (in place).
+
+    While a column has fewer than `span` observations the weight is 1/(count + 1),
+    so the first ones are averaged evenly instead of the first value dominating.
+    """
+    alpha = np.maximum(2 / (span + 1), 1 / (count + 1))
+    diff = np.where(valid, values - mean, 0)
+    increment = alpha * diff
+    mean += increment
+    var[:] = np.where(valid, (1 - alpha) * (var + diff * increment), var)
+    count += valid
+
+
+class AnomalyDetector:
+    """Incremental per-column baselines over the snapshot history, persisted to `path`."""
+
+    def __init__(self, path=DEFAULT_STATE, threshold=Z_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.columns = anomaly_columns()
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        n = len(self.columns)
+        self.last_key = None
+        self.count = np.zeros(n)
+        self.mean = np.zeros(n)
+        self.var = np.zeros(n)
+        self.seasonal_count = np.zeros((HOURS, n))
+        self.seasonal_mean = np.zeros((HOURS, n))
+        self.seasonal_var = np.zeros((HOURS, n))
+        self.latest = []
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as state:
+                if list(state['columns']) != self.columns:
+                    return
+                for name in ('count', 'mean', 'var', 'seasonal_count', 'seasonal_mean', 'seasonal_var'):
+                    setattr(self, name, state[name].copy())
+                last_key = int(state['last_key'])
+                latest = state['latest']
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return
+        self.last_key = datetime.fromtimestamp(last_key / 1e6, timezone.utc) if last_key >= 0 else None
+        self.latest = [
+            Anomaly(self.last_key, self.columns[int(i)], value, baseline, std, z, bool(seasonal))
+            for i, value, baseline, std, z, seasonal in latest.tolist()
+        ]
+
+    def _save(self):
+        last_key = int(self.last_key.timestamp() * 1e6) if self.last_key else -1
+        latest = np.array(
+            [[self.columns.index(a.column), a.value, a.baseline, a.std, a.z, a.seasonal] for a in self.latest],
+            dtype=np.float64
+        ).reshape(-1, 6)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path, columns=np.array(self.columns), last_key=np.int64(last_key), latest=latest,
+            count=self.count, mean=self.mean, var=self.var, seasonal_count=self.seasonal_count,
+            seasonal_mean=self.seasonal_mean, seasonal_var=self.seasonal_var,
+        )
+        os.replace(tmp_path, self.path)
+
+    def _score(self, snapshot_at, values):
+        """Score one snapshot against the current baselines, then fold it in; return its Anomalies."""
+        hour = snapshot_at.astimezone(timezone.utc).hour
+        valid = ~np.isnan(values)
+        seasonal = self.seasonal_count[hour] >= MIN_SEASONAL_OBSERVATIONS
+        baseline = np.where(seasonal, self.seasonal_mean[hour], self.mean)
+        var = np.where(seasonal, self.seasonal_var[hour], self.var)
+        std = np.maximum(np.sqrt(var), np.maximum(MIN_STD, MIN_RELATIVE_STD * np.abs(baseline)))
+        with np.errstate(invalid='ignore'):
+            z = np.where(valid & (self.count >= MIN_OBSERVATIONS), (values - baseline) / std, 0.0)
+
+        _ewma_update(self.count, self.mean, self.var, values, valid, BASELINE_SPAN)
+        _ewma_update(self.seasonal_count[hour], self.seasonal_mean[hour], self.seasonal_var[hour],
+                     values, valid, SEASONAL_SPAN)
+
+        return [
+            Anomaly(snapshot_at, self.columns[i], float(values[i]), float(baseline[i]), float(std[i]),
+                    float(z[i]), bool(seasonal[i]))
+            for i in np.flatnonzero(np.abs(z) >= self.threshold)
+        ]
+
+    def observe(self, history):
+        """Fold in history rows newer than the last one seen; return the Anomalies found.
+
+        `history` maps history column names to equal-length sequences sorted by
+        KEY_COLUMN: a HistoryStore.read() table or a history_row() dict.
+        """
+        keys = list(history[KEY_COLUMN].to_pylist() if hasattr(history[KEY_COLUMN], 'to_pylist')
+                    else history[KEY_COLUMN])
+        with self._lock:
+            new = [i for i, key in enumerate(keys) if self.last_key is None or key > self.last_key]
+            if not new:
+                return []
+            if isinstance(history, (pa.Table, pa.RecordBatch)):
+                history = history.take(new)
+            else:
+                history = {column: [values[i] for i in new] for column, values in history.items()}
+            values = _values(history, self.columns)
+
+            found = []
+            for row, i in enumerate(new):
+                anomalies = self._score(keys[i], values[row])
+                found += anomalies
+                self.latest = anomalies
+                self.last_key = keys[i]
+            self._save()
+            return found
+
+    def catch_up(self, store, days=30):
+        """Replay the last `days` days of `store` newer than the saved state; return Anomalies."""
+        return self.observe(store.read(history_schema().names, days=days))
+
+    def current(self):
+        """Return {column: Anomaly} for the newest snapshot seen."""
+        with self._lock:
+            return {anomaly.column: anomaly for anomaly in self.latest}
+
+
+def emit_alerts(anomalies, path=ALERT_SINK):
+    """Append one JSON line per Anomaly to the alert sink."""
+    if not anomalies:
+        return
+    detected_at = datetime.now(timezone.utc).isoformat()
+    lines = [
+        json.dumps(dict(anomaly._asdict(), snapshot_at=anomaly.snapshot_at.isoformat(), detected_at=detected_at))
+        for anomaly in anomalies
+    ]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # One write per batch: appends of whole lines do not interleave across processes
+    with open(path, 'a') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def describe(anomaly):
+    """Return a short card label for an Anomaly, e.g. '▼ 5.2σ below baseline'."""
+    direction = "▲" if anomaly.z > 0 else "▼"
+    return f"{direction} {abs(anomaly.z):.1f}σ {'above' if anomaly.z > 0 else 'below'} {'hourly ' if anomaly.seasonal else ''}baseline"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=30, help="history to replay when the state is behind")
+    parser.add_argument('--rebuild', action='store_true', help="discard the saved baselines and replay")
+    parser.add_argument('--state', default=DEFAULT_STATE)
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.state):
+        os.remove(args.state)
+    detector = AnomalyDetector(args.state)
+    # A replay into empty baselines would re-alert on all of history
+    replay = detector.last_key is None
+    found = detector.catch_up(HistoryStore(os.path.join(CACHE_DIR, "history")), args.days)
+    if not replay:
+        emit_alerts(found)
+    print(json.dumps({
+        'last_snapshot_at': detector.last_key.isoformat() if detector.last_key else None,
+        'new_anomalies': len(found),
+        'current': [dict(a._asdict(), snapshot_at=a.snapshot_at.isoformat()) for a in detector.current().values()],
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,42 @@ Built with Streamlit using learnings from Zendesk Support Dashboard
 """
 
 import streamlit as st
-import pandas as pd
-from google.cloud import bigquery
-from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from components import (
+    build_completeness_chart,
+    build_match_chart,
+    format_data_age,
+    render_alignment_row,
+    render_change,
+    render_metric_card,
+    render_unavailable_card,
+)
+from data_sources import RETAIL_KEY, SF_ACCOUNT, UNMATCHED_PAGE_SIZE, default_bq_client
+from health import calculate_health_score, calculate_health_scores, health_status
+from instrumentation import Laps, prometheus_text, recent_queries, span, span_summary, write_textfile
+from loaders import (
+    CACHE_DIR,
+    CACHE_TTL_SECONDS,
+    DATA_SOURCE,
+    LOCAL_LATENCY_MS,
+    load_all,
+    open_data_source,
+    open_snapshot_cache,
+)
+from snapshots import history_column
+
+# pyarrow and the history, anomaly, comparison, profiling and batch-job
+# modules are imported by the functions that use them, so the first render
+# does not wait for them. NumPy is not deferred (health.py imports it): the
+# breakdown prefetch thread may import it through pyarrow, and plotly reads
+# numpy from sys.modules without waiting for an import in progress.
+
+logger = logging.getLogger(__name__)
 
 # Page config - MUST be first Streamlit command
 st.set_page_config(
@@ -112,6 +143,47 @@ st.markdown("""
         margin-top: 4px;
     }
 
+    .metric-card-anomaly {
+        border-color: rgba(255, 107, 107, 0.6);
+    }
+
+    .metric-anomaly {
+        font-size: 12px;
+        color: #ff6b6b;
+        margin-top: 6px;
+    }
+
+    .metric-change {
+        font-size: 12px;
+        margin-top: 6px;
+    }
+
+    .change-good {
+        color: #64ffda;
+    }
+
+    .change-bad {
+        color: #ff6b6b;
+    }
+
+    .change-flat {
+        color: #8892b0;
+    }
+
+    .metric-sparkline {
+        display: block;
+        width: 100%;
+        height: 28px;
+        margin-top: 12px;
+    }
+
+    .metric-sparkline polyline {
+        fill: none;
+        stroke: #667eea;
+        stroke-width: 1.5;
+        vector-effect: non-scaling-stroke;
+    }
+
     /* Header styling */
     .dashboard-header {
         background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
@@ -190,6 +262,14 @@ st.markdown("""
         animation: pulse 2s infinite;
     }
 
+    .live-indicator.stale {
+        color: #ffd666;
+    }
+
+    .live-indicator.stale .live-dot {
+        background: #ffd666;
+    }
+
     @keyframes pulse {
         0%, 100% { opacity: 1; transform: scale(1); }
         50% { opacity: 0.5; transform: scale(1.2); }
@@ -273,432 +353,1069 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Color palette
-COLORS = {
-    'primary': '#667eea',
-    'secondary': '#764ba2',
-    'success': '#64ffda',
-    'warning': '#ffd666',
-    'danger': '#ff6b6b',
-    'info': '#74b9ff',
-}
+
+@st.cache_resource
+def get_bq_client():
+    """Initialize BigQuery client."""
+    with span('bq_client'):
+        if "gcp_service_account" in st.secrets:
+            return default_bq_client(st.secrets["gcp_service_account"])
+        return default_bq_client()
 
 
-def apply_dark_theme(fig, height=350, **kwargs):
-    """Apply dark theme to a plotly figure."""
-    layout_args = {
-        'paper_bgcolor': 'rgba(0,0,0,0)',
-        'plot_bgcolor': 'rgba(0,0,0,0)',
-        'font': {'color': '#ccd6f6', 'family': 'Inter, sans-serif'},
-        'height': height,
-        'margin': kwargs.get('margin', dict(l=0, r=0, t=20, b=0)),
-        'xaxis': {
-            'gridcolor': 'rgba(255,255,255,0.1)',
-            'linecolor': 'rgba(255,255,255,0.1)',
-            'tickfont': {'color': '#8892b0'},
-            **kwargs.get('xaxis', {})
-        },
-        'yaxis': {
-            'gridcolor': 'rgba(255,255,255,0.1)',
-            'linecolor': 'rgba(255,255,255,0.1)',
-            'tickfont': {'color': '#8892b0'},
-            **kwargs.get('yaxis', {})
-        }
-    }
-    for k, v in kwargs.items():
-        if k not in ['xaxis', 'yaxis', 'margin']:
-            layout_args[k] = v
-    fig.update_layout(**layout_args)
-    return fig
+@st.cache_resource
+def get_data_source():
+    """Initialize the configured data source."""
+    return open_data_source(DATA_SOURCE, get_bq_client, latency=LOCAL_LATENCY_MS / 1000)
 
 
 @st.cache_resource
-def get_bq_client():
-    """Initialize BigQuery client."""
-    if "gcp_service_account" in st.secrets:
-        from google.oauth2 import service_account
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"]
+def get_snapshot_cache():
+    """Initialize the on-disk snapshot cache and its warmer, shared by all sessions."""
+    return open_snapshot_cache()
+
+
+def render_cache_stats():
+    """Show per-snapshot refresh timings and single-flight counts."""
+    # A toggle rather than an expander: st.dataframe imports pandas, which the
+    # first render should not wait for
+    if not st.toggle("⚙️ Cache status", key='show_cache_stats'):
+        return
+    stats = get_snapshot_cache().stats()
+    with st.container():
+        st.caption(
+            "Refreshes per snapshot since the app started. `warmed`: refreshed ahead of expiry; "
+            "`deduplicated`/`waited`: requests folded into a refresh already in flight."
         )
-        return bigquery.Client(project='artful-logic-475116-p1', credentials=credentials)
-    return bigquery.Client(project='artful-logic-475116-p1')
+        st.dataframe([
+            {
+                'snapshot': key,
+                'age_s': round(values['age_s']) if values['age_s'] is not None else None,
+                'in_flight': values['in_flight'],
+                'hits': values['hits'],
+                'stale_hits': values['stale_hits'],
+                'cold_loads': values['cold_loads'],
+                'reloads': values['reloads'],
+                'revalidations': values['revalidations'],
+                'warmed': values['warmed'],
+                'deduplicated': values['deduplicated'],
+                'waited': values['waited'],
+                'failures': values['failures'],
+                'last_refresh_ms': round(values['last_refresh_s'] * 1000) if values['last_refresh_s'] is not None else None,
+            }
+            for key, values in sorted(stats.items())
+        ], hide_index=True, use_container_width=True)
 
 
 # =============================================================================
-# BigQuery Data Loaders
+# Data Loaders
 # =============================================================================
+# The loaders themselves live in loaders.py, shared with headless.py.
 
-@st.cache_data(ttl=300)  # 5-minute cache
-def load_vip_match_quality():
-    """Load VIP match quality metrics."""
-    client = get_bq_client()
-    query = """
-    SELECT *
-    FROM `artful-logic-475116-p1.staging_data_quality.vip_match_quality`
-    """
-    return client.query(query).to_dataframe().iloc[0]
+# Display label for each view, used in error messages
+VIEW_LABELS = {
+    'vip_match_quality': "VIP match quality",
+    'salesforce_quality': "Salesforce quality",
+    'vip_sf_alignment': "VIP ↔ Salesforce alignment",
+}
 
 
-@st.cache_data(ttl=300)
-def load_salesforce_quality():
-    """Load Salesforce data quality metrics."""
-    client = get_bq_client()
-    query = """
-    SELECT *
-    FROM `artful-logic-475116-p1.staging_data_quality.salesforce_quality`
-    """
-    return client.query(query).to_dataframe().iloc[0]
+def load_all_stats():
+    """Load all views (cold ones concurrently); return (entries, errors) keyed by view name."""
+    try:
+        source = get_data_source()
+    except Exception as e:
+        return {}, {view: e for view in VIEW_LABELS}
+    return load_all(get_snapshot_cache(), source)
+
+
+# =============================================================================
+# History & Trends
+# =============================================================================
+
+TREND_DAYS = 7     # sparkline window
+TREND_POINTS = 60  # max points per sparkline
+
+# History column behind each KPI card's sparkline (health score is derived)
+TREND_COLUMNS = {
+    'retail_match_rate': history_column('vip_sf_alignment', 'retail_match_rate_pct'),
+    'distributor_match_rate': history_column('vip_sf_alignment', 'distributor_match_rate_pct'),
+    'duplicate_names': history_column('salesforce_quality', 'accounts_with_duplicate_names'),
+    'total_vip_accounts': history_column('vip_match_quality', 'total_vip_accounts'),
+    'chain_hq_coverage': history_column('vip_match_quality', 'chain_hq_coverage_pct'),
+    'vip_distributor_match_rate': history_column('vip_match_quality', 'distributor_match_rate_pct'),
+    'total_accounts': history_column('salesforce_quality', 'total_accounts'),
+    'vip_coverage': history_column('salesforce_quality', 'vip_coverage_pct'),
+    'active_rate': history_column('salesforce_quality', 'active_rate_pct'),
+}
+
+
+@st.cache_resource
+def get_history_store():
+    """Initialize the local snapshot history."""
+    from history_store import HistoryStore
 
+    return HistoryStore(os.path.join(CACHE_DIR, "history"))
+
+
+@st.cache_resource
+def history_loaded():
+    """Set once the history loader has started in this process.
 
-@st.cache_data(ttl=300)
-def load_vip_sf_alignment():
-    """Load VIP to Salesforce alignment metrics."""
-    client = get_bq_client()
-    query = """
-    SELECT *
-    FROM `artful-logic-475116-p1.staging_data_quality.vip_sf_alignment`
+    Reading or writing the Parquet history builds Arrow arrays, which imports
+    pandas (about 300 ms). start_history_loader() does that on a background
+    thread after the first render; until then the cards have no sparklines or
+    anomaly notes.
     """
-    return client.query(query).to_dataframe().iloc[0]
+    return threading.Event()
+
+
+@st.cache_resource
+def start_history_loader(_entries):
+    """Append the first snapshot and catch up the anomaly baselines on a
+    background thread, once per process."""
+    def load():
+        history_loaded().set()
+        record_history(_entries)
+
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+    thread = threading.Thread(target=load, name='history-loader', daemon=True)
+    # get_history_store() and get_anomaly_detector() are cache_resource functions
+    add_script_run_ctx(thread)
+    thread.start()
+    return thread
+
+
+@st.cache_resource
+def get_anomaly_detector():
+    """Initialize the anomaly detector, replaying history it has not seen yet."""
+    from anomalies import AnomalyDetector, emit_alerts
+
+    detector = AnomalyDetector(os.path.join(CACHE_DIR, "anomaly_state.npz"))
+    replay = detector.last_key is None
+    found = detector.catch_up(get_history_store())
+    # A replay into empty baselines would re-alert on all of history
+    if not replay:
+        emit_alerts(found)
+    return detector
+
+
+def record_history(entries):
+    """Append the current snapshot to the history (a no-op until a view reloads)
+    and score it for anomalies."""
+    if len(entries) != len(VIEW_LABELS) or not history_loaded().is_set():
+        return
+    from anomalies import emit_alerts
+    from history_store import history_row
+
+    snapshots = {view: entry.value for view, entry in entries.items()}
+    try:
+        # Before the append, so the first replay leaves this snapshot to be alerted on
+        detector = get_anomaly_detector()
+        if get_history_store().append(snapshots):
+            emit_alerts(detector.observe(history_row(snapshots)))
+    except Exception:
+        # History is best-effort; never fail the page over it
+        logger.warning("Could not append snapshot to history", exc_info=True)
+
+
+def load_anomalies():
+    """Return a short description per KPI (TREND_COLUMNS keys plus 'health_score')
+    whose newest snapshot was anomalous."""
+    if not history_loaded().is_set():
+        return {}
+    from anomalies import HEALTH_COLUMN, describe
+
+    try:
+        current = get_anomaly_detector().current()
+    except Exception:
+        logger.warning("Could not load anomaly baselines", exc_info=True)
+        return {}
+    columns = dict(TREND_COLUMNS, health_score=HEALTH_COLUMN)
+    return {name: describe(current[column]) for name, column in columns.items() if column in current}
+
+
+def load_trends():
+    """Return downsampled sparkline values per KPI (TREND_COLUMNS keys plus 'health_score')."""
+    if not history_loaded().is_set():
+        return {}
+    from history_store import history_schema
+
+    table = get_history_store().read(history_schema().names, days=TREND_DAYS)
+    if table.num_rows < 2:
+        return {}
+
+    # Evenly thin the window, always keeping the newest point
+    stride = math.ceil(table.num_rows / TREND_POINTS)
+    table = table.take(list(range(table.num_rows - 1, -1, -stride))[::-1])
+
+    trends = {
+        name: tuple(value for value in table[column].to_pylist() if value is not None)
+        for name, column in TREND_COLUMNS.items()
+    }
+    trends['health_score'] = tuple(calculate_health_scores(table).score.tolist())
+    return trends
 
 
 # =============================================================================
-# UI Components
+# Point-in-Time Comparison
 # =============================================================================
+# The cards and alignment rows can show their change since an earlier time.
+# comparison.py resolves that time from the stored history, or through
+# BigQuery time travel, and keeps the result in an on-disk LRU: past results
+# never change, so each comparison is computed once.
 
-def render_metric_card(value, label, sublabel=None, status="neutral"):
-    """Render a styled metric card."""
-    value_class = {
-        "healthy": "metric-value-green",
-        "warning": "metric-value-yellow",
-        "critical": "metric-value-red",
-        "neutral": "metric-value"
-    }.get(status, "metric-value")
-
-    sublabel_html = f'<div class="metric-sublabel">{sublabel}</div>' if sublabel else ""
-
-    return f"""
-    <div class="metric-card">
-        <div class="{value_class}">{value}</div>
-        <div class="metric-label">{label}</div>
-        {sublabel_html}
-    </div>
-    """
+# Days back per picker option (None: comparison off)
+COMPARE_OPTIONS = {None: "Off", 1: "Yesterday", 7: "Last week", 28: "4 weeks ago"}
 
+# KPIs where a rise is bad, and counts where neither direction is
+LOWER_IS_BETTER = {'duplicate_names'}
+NEUTRAL_CHANGES = {'total_vip_accounts', 'total_accounts'}
 
-def render_alignment_row(label, vip_count, sf_count, matched_count, match_rate):
-    """Render an alignment comparison row."""
-    delta = sf_count - vip_count
-    delta_class = "delta-positive" if delta >= 0 else "delta-negative"
-    delta_sign = "+" if delta >= 0 else ""
 
-    rate_class = "status-healthy" if match_rate >= 90 else "status-warning" if match_rate >= 70 else "status-critical"
+@st.cache_resource
+def get_point_in_time():
+    """Initialize the point-in-time resolver and its result cache, shared by all sessions."""
+    from comparison import COMPARISON_CACHE_MB, PointInTime
+    from result_cache import ResultCache
 
-    return f"""
-    <div class="alignment-row">
-        <div class="alignment-label">{label}</div>
-        <div class="alignment-values">
-            <div class="alignment-value">
-                <div class="alignment-number">{vip_count:,}</div>
-                <div class="alignment-source">VIP</div>
-            </div>
-            <div class="alignment-value">
-                <div class="alignment-number">{sf_count:,}</div>
-                <div class="alignment-source">Salesforce</div>
-            </div>
-            <div class="alignment-value">
-                <div class="alignment-number">{matched_count:,}</div>
-                <div class="alignment-source">Matched</div>
-            </div>
-            <div class="alignment-value">
-                <div class="{delta_class}">{delta_sign}{delta:,}</div>
-                <div class="alignment-source">Delta</div>
-            </div>
-            <div>
-                <span class="{rate_class}">{match_rate:.0f}%</span>
-            </div>
-        </div>
-    </div>
-    """
+    cache = ResultCache(os.path.join(CACHE_DIR, "comparisons.sqlite"), COMPARISON_CACHE_MB * 2**20)
+    return PointInTime(get_data_source(), get_history_store(), cache)
 
 
-def calculate_health_score(vip_stats, sf_stats, alignment_stats):
-    """Calculate overall data health score (0-100)."""
-    scores = []
+def load_comparison():
+    """Return the Comparison for the picked time (None when off, pending or unavailable)."""
+    days = st.session_state.get('compare_days')
+    if days is None:
+        return None
+    try:
+        comparison = get_point_in_time().compare(datetime.now(timezone.utc) - timedelta(days=days))
+    except Exception:
+        # render_compare_status() reports why
+        return None
+    return comparison if comparison.snapshots is not None else None
+
+
+def load_changes(vip_stats, sf_stats, alignment_stats, comparison):
+    """Return the change HTML per KPI (TREND_COLUMNS keys plus 'health_score') vs. the comparison."""
+    if comparison is None:
+        return {}
+    from history_store import history_row
+
+    current = {
+        view: stats for view, stats in zip(VIEW_LABELS, (vip_stats, sf_stats, alignment_stats))
+        if stats is not None
+    }
+    now = history_row(current) if current else {}
+    before = history_row(comparison.snapshots)
+
+    changes = {}
+    for name, column in TREND_COLUMNS.items():
+        value, previous = (now.get(column) or [None])[0], before[column][0]
+        if value is None or previous is None:
+            continue
+        percent = column.endswith('_pct')
+        changes[name] = render_change(
+            value - previous,
+            " pts" if percent else "",
+            1 if percent else 0,
+            None if name in NEUTRAL_CHANGES else name not in LOWER_IS_BETTER,
+        )
+    if len(current) == len(VIEW_LABELS):
+        previous_health = calculate_health_score(*(comparison.snapshots[view] for view in VIEW_LABELS))
+        changes['health_score'] = render_change(
+            calculate_health_score(vip_stats, sf_stats, alignment_stats) - previous_health, decimals=0
+        )
+    return changes
 
-    # VIP match rate score (35 points max)
-    if vip_stats is not None:
-        match_rate = vip_stats.get('match_rate_pct', 0) or 0
-        vip_score = (match_rate / 100) * 35
-        scores.append(vip_score)
-    else:
-        scores.append(0)
-
-    # Alignment score (40 points max) - average of retail, distributor, chain match rates
-    if alignment_stats is not None:
-        retail_rate = alignment_stats.get('retail_match_rate_pct', 0) or 0
-        dist_rate = alignment_stats.get('distributor_match_rate_pct', 0) or 0
-        chain_rate = alignment_stats.get('chain_match_rate_pct', 0) or 0
-        avg_alignment = (retail_rate + dist_rate + chain_rate) / 3
-        alignment_score = (avg_alignment / 100) * 40
-        scores.append(alignment_score)
-    else:
-        scores.append(0)
-
-    # Salesforce data quality score (25 points max)
-    if sf_stats is not None:
-        name_completeness = sf_stats.get('account_name_completeness', 100) or 100
-        phone_completeness = sf_stats.get('phone_completeness', 0) or 0
-        duplicate_penalty = min(10, sf_stats.get('accounts_with_duplicate_names', 0) / 1000)
-        sf_score = ((name_completeness + phone_completeness) / 200 * 25) - duplicate_penalty
-        sf_score = max(0, sf_score)
-        scores.append(sf_score)
+
+# =============================================================================
+# Alignment Breakdown
+# =============================================================================
+# Retail match counts per distributor and per chain, grouped in BigQuery by a
+# single query and kept in the snapshot cache. The page prefetches it in the
+# background, so opening the breakdown does not wait on a query. Filtering
+# happens in memory and sorting in the browser (st.dataframe is virtualized).
+
+BREAKDOWN_KINDS = {'distributor': "Distributors", 'chain': "Chains"}
+
+
+def _breakdown_loader():
+    """Return the (loader, version) pair of the breakdown cache entry."""
+    source = get_data_source()
+    return source.fetch_alignment_breakdown, lambda: source.source_version(['vip_sf_alignment'])
+
+
+def prefetch_alignment_breakdown():
+    """Start loading the breakdown in the background unless it is cached."""
+    loader, version = _breakdown_loader()
+    get_snapshot_cache().prefetch('alignment_breakdown', loader, version)
+
+
+def load_alignment_breakdown():
+    """Load the per-distributor and per-chain breakdown as an Arrow table."""
+    loader, version = _breakdown_loader()
+    with span('load_alignment_breakdown'):
+        return get_snapshot_cache().get('alignment_breakdown', loader, version=version).value
+
+
+def render_alignment_breakdown():
+    """Render the breakdown for one kind, filtered in memory."""
+    import pyarrow.compute as pc
+
+    breakdown = load_alignment_breakdown()
+
+    bcol1, bcol2, bcol3 = st.columns([1, 2, 1])
+    with bcol1:
+        kind = st.radio("Group by", list(BREAKDOWN_KINDS), format_func=BREAKDOWN_KINDS.get,
+                        horizontal=True, key='breakdown_kind')
+    with bcol2:
+        name_filter = st.text_input("Filter by name or code", key='breakdown_filter')
+    with bcol3:
+        min_stores = st.number_input("Min. stores", min_value=0, value=0, step=10, key='breakdown_min_stores')
+
+    of_kind = pc.equal(breakdown['kind'], kind)
+    mask = pc.and_(of_kind, pc.greater_equal(breakdown['stores'], min_stores))
+    if name_filter:
+        mask = pc.and_(mask, pc.or_kleene(
+            pc.match_substring(breakdown['name'], name_filter, ignore_case=True),
+            pc.match_substring(breakdown['code'], name_filter, ignore_case=True)
+        ))
+    rows = breakdown.filter(mask).drop_columns(['kind'])
+
+    st.dataframe(rows, hide_index=True, use_container_width=True, column_config={
+        'name': "Name",
+        'code': "Code",
+        'sf_account_id': "SF account",
+        'stores': "Stores",
+        'matched': "Matched",
+        'unmatched': "Unmatched",
+        'match_rate_pct': st.column_config.ProgressColumn(
+            "Match rate", format="%.1f%%", min_value=0, max_value=100
+        ),
+    })
+    total = pc.sum(of_kind).as_py()
+    st.caption(
+        f"{rows.num_rows:,} of {total:,} {BREAKDOWN_KINDS[kind].lower()} • worst match rate first; "
+        "click a column header to re-sort"
+    )
+
+
+# =============================================================================
+# Unmatched Account Drilldown
+# =============================================================================
+# Keyset-paginated pages of VIP accounts with no sf_account_id. The session
+# keeps a stack of page cursors (the last key of each previous page) so Next
+# pushes and Previous pops; changing a filter starts over at page 1.
+
+# Written by the `python matching.py` batch job
+MATCHES_PATH = os.path.join(CACHE_DIR, "match_candidates.parquet")
+
+
+def load_unmatched_facets():
+    """Load distributor and chain filter options (with unmatched counts)."""
+    source = get_data_source()
+    with span('load_unmatched_facets'):
+        return get_snapshot_cache().get(
+            'unmatched_facets',
+            source.fetch_unmatched_facets,
+            version=lambda: source.source_version(['vip_match_quality'])
+        ).value
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=256, show_spinner=False)
+def load_unmatched_page(after, distributor, chain):
+    """Load one page of unmatched VIP accounts as an Arrow table."""
+    with span('load_unmatched_page'):
+        return get_data_source().fetch_unmatched_page(after=after, distributor=distributor, chain=chain)
+
+
+def reset_unmatched_pages():
+    """Go back to the first drilldown page."""
+    st.session_state.unmatched_cursors = [None]
+
+
+def next_unmatched_page(last_key):
+    """Advance the drilldown past `last_key`."""
+    st.session_state.unmatched_cursors.append(last_key)
+
+
+def previous_unmatched_page():
+    """Step the drilldown back one page."""
+    st.session_state.unmatched_cursors.pop()
+
+
+def render_unmatched_drilldown(unmatched):
+    """Render the paged, filterable table of unmatched VIP accounts."""
+    from matching import read_best_matches
+
+    facets = load_unmatched_facets()
+    distributor_counts = dict(facets['distributors'])
+    chain_counts = dict(facets['chains'])
+
+    fcol1, fcol2 = st.columns(2)
+    with fcol1:
+        distributor = st.selectbox(
+            "Distributor",
+            [None, *distributor_counts],
+            format_func=lambda name: "All distributors" if name is None else f"{name} ({distributor_counts[name]:,})",
+            key='unmatched_distributor',
+            on_change=reset_unmatched_pages
+        )
+    with fcol2:
+        chain = st.selectbox(
+            "Chain",
+            [None, *chain_counts],
+            format_func=lambda name: "All chains" if name is None else f"{name} ({chain_counts[name]:,})",
+            key='unmatched_chain',
+            on_change=reset_unmatched_pages
+        )
+
+    cursors = st.session_state.setdefault('unmatched_cursors', [None])
+    page = load_unmatched_page(cursors[-1], distributor, chain)
+
+    # Best Salesforce candidate per account, from the last match run
+    suggestions = read_best_matches('retail', MATCHES_PATH)
+    if suggestions is not None:
+        page = page.join(suggestions, keys=RETAIL_KEY, right_keys='key', join_type='left outer').sort_by(RETAIL_KEY)
+    st.dataframe(page, hide_index=True, use_container_width=True)
+
+    # Totals are known for one filter at a time; with both set, only the row range is shown
+    if distributor is None and chain is None:
+        total = unmatched
+    elif chain is None:
+        total = distributor_counts[distributor]
+    elif distributor is None:
+        total = chain_counts[chain]
     else:
-        scores.append(0)
+        total = None
+    first_row = (len(cursors) - 1) * UNMATCHED_PAGE_SIZE + 1
+    last_row = first_row + page.num_rows - 1
+    ncol1, ncol2, ncol3 = st.columns([1, 2, 1])
+    with ncol1:
+        st.button("← Previous", key='unmatched_previous', disabled=len(cursors) == 1,
+                  on_click=previous_unmatched_page)
+    with ncol2:
+        if page.num_rows:
+            st.caption(f"Rows {first_row:,}–{last_row:,}" + (f" of {total:,}" if total is not None else ""))
+        else:
+            st.caption("No unmatched accounts")
+    with ncol3:
+        st.button("Next →", key='unmatched_next', disabled=page.num_rows < UNMATCHED_PAGE_SIZE,
+                  on_click=next_unmatched_page,
+                  args=(page[RETAIL_KEY][-1].as_py() if page.num_rows else None,))
+
+
+# =============================================================================
+# Field Profiles
+# =============================================================================
+# Completeness of any Salesforce Account field, without view SQL: profiler.py
+# profiles the chosen fields with one aggregate query (optionally over a
+# TABLESAMPLE) and the result is kept in the snapshot cache until the table
+# changes. Nothing is queried until the field picker is opened, and the cache
+# warmer skips profiles: a changed table is re-profiled only when read again.
+
+PROFILE_TABLE = SF_ACCOUNT
+PROFILE_FILTER = "NOT IsDeleted"
+PROFILE_SAMPLES = {None: "Exact", 10: "10% sample", 1: "1% sample"}
+
+
+def _profile_version():
+    source = get_data_source()
+    return lambda: source.source_version(['salesforce_quality'])
+
+
+def load_profile_columns():
+    """Load the profiled table's column names."""
+    source = get_data_source()
+    return get_snapshot_cache().get(
+        f'profile_columns:{PROFILE_TABLE}',
+        lambda: source.table_columns(PROFILE_TABLE),
+        version=_profile_version()
+    ).value
+
+
+def load_field_profile(fields, sample_percent):
+    """Load the TableProfile of a sorted tuple of fields."""
+    from profiler import profile_table
+
+    source = get_data_source()
+    with span('load_field_profile'):
+        return get_snapshot_cache().get(
+            f"profile:{PROFILE_TABLE}:{sample_percent or 'exact'}:{','.join(fields)}",
+            lambda: profile_table(source, PROFILE_TABLE, fields, sample_percent, PROFILE_FILTER),
+            version=_profile_version(),
+            # A profile scans the table; only re-run it when a viewer asks again
+            warm=False
+        ).value
+
+
+def render_field_profile(profile):
+    """Render the profile details of the picked fields."""
+    import pyarrow as pa
+
+    rows = list(profile.columns.values())
+    st.dataframe(pa.table({
+        'field': [c.column for c in rows],
+        'completeness_pct': [c.completeness_pct for c in rows],
+        'error_pct': [c.completeness_error_pct for c in rows],
+        'distinct': [c.distinct for c in rows],
+        'top_value': [c.top_values[0][0] if c.top_values else None for c in rows],
+        'avg_length': [c.avg_length for c in rows],
+        'max_length': [c.max_length for c in rows],
+    }), hide_index=True, use_container_width=True, column_config={
+        'field': "Field",
+        'completeness_pct': st.column_config.ProgressColumn(
+            "Complete", format="%.1f%%", min_value=0, max_value=100
+        ),
+        'error_pct': st.column_config.NumberColumn("±", format="%.2f"),
+        'distinct': "Distinct (approx.)",
+        'top_value': "Most frequent",
+        'avg_length': st.column_config.NumberColumn("Avg. length", format="%.1f"),
+        'max_length': "Max. length",
+    })
+    scope = f"about {profile.sample_percent:g}% of rows, ±95% bounds" if profile.sample_percent else "all rows"
+    st.caption(f"{PROFILE_TABLE} • {profile.rows:,} live accounts • {scope} • "
+               f"one query in {profile.seconds:.1f}s")
+
+
+# =============================================================================
+# Duplicate Clusters
+# =============================================================================
+# Written by the `python duplicates.py` batch job; the dashboard only reads them.
+
+DUPLICATES_PATH = os.path.join(CACHE_DIR, "duplicates.parquet")
+DUPLICATE_CLUSTERS_SHOWN = 500
+
 
-    return round(sum(scores))
+def render_duplicate_clusters():
+    """Render the ranked duplicate clusters from the last batch run, if any."""
+    # Before the first batch run there is nothing to read (or import)
+    if not os.path.exists(DUPLICATES_PATH):
+        return
+    from duplicates import read_clusters
+
+    result = read_clusters(DUPLICATES_PATH)
+    if result is None:
+        return
+    clusters, written_at = result
+    with st.expander(f"🧬 Duplicate account clusters ({clusters.num_rows:,})"):
+        st.caption(
+            f"Largest and closest first • scanned {datetime.fromtimestamp(written_at, timezone.utc):%Y-%m-%d %H:%M} UTC"
+        )
+        st.dataframe(
+            clusters.slice(0, DUPLICATE_CLUSTERS_SHOWN).select(
+                ['cluster', 'size', 'similarity', 'names', 'account_ids', 'streets', 'cities']
+            ),
+            hide_index=True,
+            use_container_width=True
+        )
 
 
 # =============================================================================
-# Main Dashboard
+# Dashboard Sections
 # =============================================================================
+# Each section is a Streamlit fragment. Its widgets (the breakdown and
+# drilldown toggles, pagination) rerun only that section. Each section also
+# re-reads its views from the snapshot cache on its own timer, so a refreshed
+# snapshot shows up without a full-page rerun. Those reads are memory hits,
+# and the card, row and chart builders are memoized on their inputs. A timed
+# rerun of a section whose views did not change therefore rebuilds nothing,
+# and the browser gets hash references for its unchanged elements.
+
+# DQ_AUTO_REFRESH=0 turns the timed section reruns off (sections then only
+# update on interaction or page reload)
+AUTO_REFRESH = os.environ.get("DQ_AUTO_REFRESH", "1") == "1"
+
+# Seconds between timed reruns per section. The snapshots behind them refresh
+# every 5 minutes; the header and KPIs poll more often to pick up a refresh
+# (and the data age) sooner.
+SECTION_REFRESH_SECONDS = {
+    'header': 30,
+    'kpis': 60,
+    'alignment': 120,
+    'vip_panel': 300,
+    'salesforce_panel': 300,
+    'footer': 30,
+}
 
-def main():
-    # Header
-    st.markdown("""
-    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 32px;">
-        <div>
-            <h1 class="dashboard-header">Data Quality Command Center</h1>
-            <p class="dashboard-subtitle">VIP ↔ Salesforce Alignment • Data Quality Metrics</p>
-        </div>
-        <div class="live-indicator">
-            <span class="live-dot"></span>
-            Live Data
+
+def section_refresh(section):
+    """Return the fragment run_every of a section (None when auto-refresh is off)."""
+    return SECTION_REFRESH_SECONDS[section] if AUTO_REFRESH else None
+
+
+def section_stats():
+    """Return (vip_stats, sf_stats, alignment_stats, entries, errors) from the snapshot cache."""
+    entries, errors = load_all_stats()
+    vip_stats, sf_stats, alignment_stats = (
+        entries[view].value if view in entries else None for view in VIEW_LABELS
+    )
+    return vip_stats, sf_stats, alignment_stats, entries, errors
+
+
+@st.fragment(run_every=section_refresh('header'))
+def render_header():
+    """Title, snapshot age and per-view load errors."""
+    with span('fragment', section='header'):
+        _, _, _, entries, errors = section_stats()
+        # Shows how old the oldest snapshot is; stale snapshots are refreshing
+        if entries:
+            fetched_at = min(entry.fetched_at for entry in entries.values())
+            stale = any(entry.stale for entry in entries.values())
+            data_age = f"Data as of {format_data_age(fetched_at)}" + (" • Refreshing" if stale else "")
+        else:
+            stale, data_age = True, "No data"
+        st.markdown(f"""
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 32px;">
+            <div>
+                <h1 class="dashboard-header">Data Quality Command Center</h1>
+                <p class="dashboard-subtitle">VIP ↔ Salesforce Alignment • Data Quality Metrics</p>
+            </div>
+            <div class="live-indicator{' stale' if stale else ''}">
+                <span class="live-dot"></span>
+                {data_age}
+            </div>
         </div>
-    </div>
-    """, unsafe_allow_html=True)
+        """, unsafe_allow_html=True)
+
+        for view, e in errors.items():
+            st.error(f"Error loading {VIEW_LABELS[view]}: {e}")
+
 
-    # Load all data
+def render_compare_picker():
+    """The comparison picker; a full rerun, since every section shows the changes."""
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        days = st.selectbox("Compare with", list(COMPARE_OPTIONS), format_func=COMPARE_OPTIONS.get,
+                            key='compare_days')
+    if days is not None:
+        with col2:
+            render_compare_status()
+
+
+# On the KPI row's cadence, so a finished time travel shows up with its changes
+@st.fragment(run_every=section_refresh('kpis'))
+def render_compare_status():
+    """Where the picked comparison comes from, or why it is not (yet) available."""
+    days = st.session_state.get('compare_days')
+    if days is None:
+        return
     try:
-        vip_stats = load_vip_match_quality()
-        sf_stats = load_salesforce_quality()
-        alignment_stats = load_vip_sf_alignment()
+        comparison = get_point_in_time().compare(datetime.now(timezone.utc) - timedelta(days=days))
+    except (LookupError, ValueError) as e:
+        st.warning(f"No comparison available: {e}")
+        return
     except Exception as e:
-        st.error(f"Error loading data: {e}")
+        st.error(f"Error loading comparison: {e}")
         return
+    if comparison.method == 'pending':
+        st.caption(
+            f"⏳ Reading the views as of {comparison.requested_at:%Y-%m-%d %H:%M} UTC with BigQuery "
+            "time travel (a full scan of each source table); the changes appear when it finishes"
+        )
+        return
+    source = "stored snapshot" if comparison.method == 'history' else "BigQuery time travel"
+    st.caption(f"Changes since {comparison.as_of:%Y-%m-%d %H:%M} UTC ({source})")
+
+
+@st.fragment(run_every=section_refresh('kpis'))
+def render_kpis():
+    """Row 1: health score and the headline match/duplicate cards."""
+    with span('fragment', section='kpis'):
+        vip_stats, sf_stats, alignment_stats, entries, _ = section_stats()
+        # A no-op unless a snapshot was reloaded since the last append
+        record_history(entries)
+        trends = load_trends()
+        anomalies = load_anomalies()
+        changes = load_changes(vip_stats, sf_stats, alignment_stats, load_comparison())
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            # A view that failed to load would score its component 0
+            if None not in (vip_stats, sf_stats, alignment_stats):
+                with span('health_score'):
+                    health_score = calculate_health_score(vip_stats, sf_stats, alignment_stats)
+                st.markdown(render_metric_card(
+                    f"{health_score}",
+                    "Health Score",
+                    "System-wide quality",
+                    health_status(health_score),
+                    trend=trends.get('health_score', ()),
+                    anomaly=anomalies.get('health_score'),
+                    change=changes.get('health_score')
+                ), unsafe_allow_html=True)
+            else:
+                st.markdown(render_unavailable_card("Health Score"), unsafe_allow_html=True)
+
+        with col2:
+            if alignment_stats is not None:
+                match_rate = alignment_stats.retail_match_rate_pct
+                match_status = "healthy" if match_rate >= 90 else "warning" if match_rate >= 75 else "critical"
+                st.markdown(render_metric_card(
+                    f"{match_rate:.1f}%",
+                    "Retail Match Rate",
+                    f"{alignment_stats.matched_retail_count:,} matched",
+                    match_status,
+                    trend=trends.get('retail_match_rate', ()),
+                    anomaly=anomalies.get('retail_match_rate'),
+                    change=changes.get('retail_match_rate')
+                ), unsafe_allow_html=True)
+            else:
+                st.markdown(render_unavailable_card("Retail Match Rate"), unsafe_allow_html=True)
+
+        with col3:
+            if alignment_stats is not None:
+                dist_rate = alignment_stats.distributor_match_rate_pct
+                dist_status = "healthy" if dist_rate >= 90 else "warning" if dist_rate >= 75 else "critical"
+                st.markdown(render_metric_card(
+                    f"{dist_rate:.1f}%",
+                    "Distributor Match",
+                    f"{alignment_stats.matched_distributor_count:,} matched",
+                    dist_status,
+                    trend=trends.get('distributor_match_rate', ()),
+                    anomaly=anomalies.get('distributor_match_rate'),
+                    change=changes.get('distributor_match_rate')
+                ), unsafe_allow_html=True)
+            else:
+                st.markdown(render_unavailable_card("Distributor Match"), unsafe_allow_html=True)
+
+        with col4:
+            if sf_stats is not None:
+                dup_count = sf_stats.accounts_with_duplicate_names
+                dup_status = "healthy" if dup_count < 1000 else "warning" if dup_count < 5000 else "critical"
+                st.markdown(render_metric_card(
+                    f"{dup_count:,}",
+                    "Duplicate Names",
+                    "Salesforce Accounts",
+                    dup_status,
+                    trend=trends.get('duplicate_names', ()),
+                    anomaly=anomalies.get('duplicate_names'),
+                    change=changes.get('duplicate_names')
+                ), unsafe_allow_html=True)
+            else:
+                st.markdown(render_unavailable_card("Duplicate Names"), unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+
+@st.fragment(run_every=section_refresh('alignment'))
+def render_alignment():
+    """Row 2: VIP ↔ Salesforce alignment rows and the breakdown toggle."""
+    with span('fragment', section='alignment'):
+        _, _, alignment_stats, _, _ = section_stats()
+        st.markdown('<p class="section-header">🔗 VIP ↔ Salesforce Alignment</p>', unsafe_allow_html=True)
+
+        comparison = load_comparison()
+        before = comparison.snapshots['vip_sf_alignment'] if comparison else None
+
+        if alignment_stats is not None:
+            st.markdown(render_alignment_row(
+                "Retail Locations",
+                alignment_stats.vip_retail_count,
+                alignment_stats.sf_retail_count,
+                alignment_stats.matched_retail_count,
+                alignment_stats.retail_match_rate_pct,
+                previous=(before.vip_retail_count, before.sf_retail_count, before.matched_retail_count,
+                          before.retail_match_rate_pct) if before else None
+            ), unsafe_allow_html=True)
 
-    # Calculate health score
-    health_score = calculate_health_score(vip_stats, sf_stats, alignment_stats)
-    health_status = "healthy" if health_score >= 80 else "warning" if health_score >= 60 else "critical"
+            st.markdown(render_alignment_row(
+                "Distributors",
+                alignment_stats.vip_distributor_count,
+                alignment_stats.sf_distributor_count,
+                alignment_stats.matched_distributor_count,
+                alignment_stats.distributor_match_rate_pct,
+                previous=(before.vip_distributor_count, before.sf_distributor_count, before.matched_distributor_count,
+                          before.distributor_match_rate_pct) if before else None
+            ), unsafe_allow_html=True)
 
-    # ==========================================================================
-    # Row 1: Key Metrics
-    # ==========================================================================
-    col1, col2, col3, col4 = st.columns(4)
+            st.markdown(render_alignment_row(
+                "Chain HQs",
+                alignment_stats.vip_chain_count,
+                alignment_stats.sf_chain_hq_count,
+                alignment_stats.matched_chain_count,
+                alignment_stats.chain_match_rate_pct,
+                previous=(before.vip_chain_count, before.sf_chain_hq_count, before.matched_chain_count,
+                          before.chain_match_rate_pct) if before else None
+            ), unsafe_allow_html=True)
 
-    with col1:
-        st.markdown(render_metric_card(
-            f"{health_score}",
-            "Health Score",
-            "System-wide quality",
-            health_status
-        ), unsafe_allow_html=True)
+            # Served from the snapshot cache (prefetched by main()); filters run in memory
+            if st.toggle("📊 Break down by distributor and chain", key='show_breakdown'):
+                try:
+                    render_alignment_breakdown()
+                except Exception as e:
+                    st.error(f"Error loading alignment breakdown: {e}")
+        else:
+            st.markdown(render_unavailable_card("VIP ↔ Salesforce Alignment"), unsafe_allow_html=True)
 
-    with col2:
-        match_rate = alignment_stats['retail_match_rate_pct']
-        match_status = "healthy" if match_rate >= 90 else "warning" if match_rate >= 75 else "critical"
-        st.markdown(render_metric_card(
-            f"{match_rate:.1f}%",
-            "Retail Match Rate",
-            f"{alignment_stats['matched_retail_count']:,} matched",
-            match_status
-        ), unsafe_allow_html=True)
-
-    with col3:
-        dist_rate = alignment_stats['distributor_match_rate_pct']
-        dist_status = "healthy" if dist_rate >= 90 else "warning" if dist_rate >= 75 else "critical"
-        st.markdown(render_metric_card(
-            f"{dist_rate:.1f}%",
-            "Distributor Match",
-            f"{alignment_stats['matched_distributor_count']:,} matched",
-            dist_status
-        ), unsafe_allow_html=True)
-
-    with col4:
-        dup_count = sf_stats['accounts_with_duplicate_names']
-        dup_status = "healthy" if dup_count < 1000 else "warning" if dup_count < 5000 else "critical"
-        st.markdown(render_metric_card(
-            f"{dup_count:,}",
-            "Duplicate Names",
-            "Salesforce Accounts",
-            dup_status
-        ), unsafe_allow_html=True)
-
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # ==========================================================================
-    # Row 2: VIP ↔ Salesforce Alignment (NEW SECTION)
-    # ==========================================================================
-    st.markdown('<p class="section-header">🔗 VIP ↔ Salesforce Alignment</p>', unsafe_allow_html=True)
-
-    st.markdown(render_alignment_row(
-        "Retail Locations",
-        alignment_stats['vip_retail_count'],
-        alignment_stats['sf_retail_count'],
-        alignment_stats['matched_retail_count'],
-        alignment_stats['retail_match_rate_pct']
-    ), unsafe_allow_html=True)
-
-    st.markdown(render_alignment_row(
-        "Distributors",
-        alignment_stats['vip_distributor_count'],
-        alignment_stats['sf_distributor_count'],
-        alignment_stats['matched_distributor_count'],
-        alignment_stats['distributor_match_rate_pct']
-    ), unsafe_allow_html=True)
-
-    st.markdown(render_alignment_row(
-        "Chain HQs",
-        alignment_stats['vip_chain_count'],
-        alignment_stats['sf_chain_hq_count'],
-        alignment_stats['matched_chain_count'],
-        alignment_stats['chain_match_rate_pct']
-    ), unsafe_allow_html=True)
-
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # ==========================================================================
-    # Row 3: VIP & Salesforce Quality Side by Side
-    # ==========================================================================
-    col1, col2 = st.columns(2)
+        st.markdown("<br>", unsafe_allow_html=True)
 
-    with col1:
+
+@st.fragment(run_every=section_refresh('vip_panel'))
+def render_vip_panel():
+    """Row 3, left: VIP data quality cards, match chart and unmatched drilldown."""
+    with span('fragment', section='vip_panel'):
+        vip_stats, sf_stats, alignment_stats, _, _ = section_stats()
         st.markdown('<p class="section-header">🏪 VIP Data Quality</p>', unsafe_allow_html=True)
 
+        if vip_stats is None:
+            st.markdown(render_unavailable_card("VIP Data Quality"), unsafe_allow_html=True)
+            return
+        trends = load_trends()
+        anomalies = load_anomalies()
+        changes = load_changes(vip_stats, sf_stats, alignment_stats, load_comparison())
+
         # VIP metrics in sub-columns
         subcol1, subcol2, subcol3 = st.columns(3)
 
         with subcol1:
             st.markdown(render_metric_card(
-                f"{vip_stats['total_vip_accounts']:,}",
+                f"{vip_stats.total_vip_accounts:,}",
                 "Total VIP Accounts",
-                status="neutral"
+                status="neutral",
+                trend=trends.get('total_vip_accounts', ()),
+                anomaly=anomalies.get('total_vip_accounts'),
+                change=changes.get('total_vip_accounts')
             ), unsafe_allow_html=True)
 
         with subcol2:
-            chain_coverage = vip_stats['chain_hq_coverage_pct']
+            chain_coverage = vip_stats.chain_hq_coverage_pct
             chain_status = "healthy" if chain_coverage >= 70 else "warning" if chain_coverage >= 50 else "critical"
             st.markdown(render_metric_card(
                 f"{chain_coverage:.0f}%",
                 "Chain HQ Coverage",
-                f"{vip_stats['chains_with_hq']}/{vip_stats['total_chains']} chains",
-                chain_status
+                f"{vip_stats.chains_with_hq}/{vip_stats.total_chains} chains",
+                chain_status,
+                trend=trends.get('chain_hq_coverage', ()),
+                anomaly=anomalies.get('chain_hq_coverage'),
+                change=changes.get('chain_hq_coverage')
             ), unsafe_allow_html=True)
 
         with subcol3:
-            dist_rate = vip_stats['distributor_match_rate_pct']
+            dist_rate = vip_stats.distributor_match_rate_pct
             dist_status = "healthy" if dist_rate >= 90 else "warning" if dist_rate >= 70 else "critical"
             st.markdown(render_metric_card(
                 f"{dist_rate:.0f}%",
                 "Distributor Match",
-                f"{vip_stats['distributors_matched_sf']}/{vip_stats['active_distributors']}",
-                dist_status
+                f"{vip_stats.distributors_matched_sf}/{vip_stats.active_distributors}",
+                dist_status,
+                trend=trends.get('vip_distributor_match_rate', ()),
+                anomaly=anomalies.get('vip_distributor_match_rate'),
+                change=changes.get('vip_distributor_match_rate')
             ), unsafe_allow_html=True)
 
         # Match breakdown chart
-        match_data = pd.DataFrame({
-            'Status': ['Matched', 'Unmatched'],
-            'Count': [vip_stats['matched_to_sf'], vip_stats['unmatched']]
-        })
-
-        fig = go.Figure(data=[go.Pie(
-            labels=match_data['Status'],
-            values=match_data['Count'],
-            hole=0.6,
-            marker_colors=[COLORS['success'], COLORS['danger']],
-            textinfo='percent',
-            textfont=dict(color='white')
-        )])
-
-        apply_dark_theme(fig, height=200,
-            margin=dict(l=20, r=20, t=20, b=20),
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5, font=dict(color='#8892b0'))
-        )
+        fig = build_match_chart(vip_stats.matched_to_sf, vip_stats.unmatched)
         st.plotly_chart(fig, use_container_width=True)
 
-    with col2:
+        # Drilldown only queries once opened
+        if st.toggle(f"🔎 Show unmatched accounts ({vip_stats.unmatched:,})", key='show_unmatched'):
+            try:
+                render_unmatched_drilldown(vip_stats.unmatched)
+            except Exception as e:
+                st.error(f"Error loading unmatched accounts: {e}")
+
+
+@st.fragment(run_every=section_refresh('salesforce_panel'))
+def render_salesforce_panel():
+    """Row 3, right: Salesforce data quality cards, completeness chart and duplicate clusters."""
+    with span('fragment', section='salesforce_panel'):
+        vip_stats, sf_stats, alignment_stats, _, _ = section_stats()
         st.markdown('<p class="section-header">☁️ Salesforce Data Quality</p>', unsafe_allow_html=True)
 
+        if sf_stats is None:
+            st.markdown(render_unavailable_card("Salesforce Data Quality"), unsafe_allow_html=True)
+            return
+        trends = load_trends()
+        anomalies = load_anomalies()
+        changes = load_changes(vip_stats, sf_stats, alignment_stats, load_comparison())
+
         # SF metrics in sub-columns
         subcol1, subcol2, subcol3 = st.columns(3)
 
         with subcol1:
             st.markdown(render_metric_card(
-                f"{sf_stats['total_accounts']:,}",
+                f"{sf_stats.total_accounts:,}",
                 "Total Accounts",
-                status="neutral"
+                status="neutral",
+                trend=trends.get('total_accounts', ()),
+                anomaly=anomalies.get('total_accounts'),
+                change=changes.get('total_accounts')
             ), unsafe_allow_html=True)
 
         with subcol2:
-            vip_coverage = sf_stats['vip_coverage_pct']
+            vip_coverage = sf_stats.vip_coverage_pct
             vip_status = "healthy" if vip_coverage >= 70 else "warning" if vip_coverage >= 50 else "critical"
             st.markdown(render_metric_card(
                 f"{vip_coverage:.0f}%",
                 "VIP Coverage",
-                f"{sf_stats['accounts_with_vip_id']:,} with VIP ID",
-                vip_status
+                f"{sf_stats.accounts_with_vip_id:,} with VIP ID",
+                vip_status,
+                trend=trends.get('vip_coverage', ()),
+                anomaly=anomalies.get('vip_coverage'),
+                change=changes.get('vip_coverage')
             ), unsafe_allow_html=True)
 
         with subcol3:
-            active_rate = sf_stats['active_rate_pct']
+            active_rate = sf_stats.active_rate_pct
             active_status = "warning" if active_rate < 5 else "neutral"
             st.markdown(render_metric_card(
                 f"{active_rate:.1f}%",
                 "Active (90d)",
-                f"{sf_stats['active_last_90d']:,} accounts",
-                active_status
+                f"{sf_stats.active_last_90d:,} accounts",
+                active_status,
+                trend=trends.get('active_rate', ()),
+                anomaly=anomalies.get('active_rate'),
+                change=changes.get('active_rate')
             ), unsafe_allow_html=True)
 
-        # Completeness chart
-        completeness_data = pd.DataFrame({
-            'Field': ['Name', 'Address', 'Phone', 'Email (Contacts)'],
-            'Completeness': [
-                sf_stats['account_name_completeness'],
-                sf_stats['address_completeness'],
-                sf_stats['phone_completeness'],
-                sf_stats['contact_email_completeness']
-            ]
-        })
-
-        fig = go.Figure(go.Bar(
-            x=completeness_data['Completeness'],
-            y=completeness_data['Field'],
-            orientation='h',
-            marker=dict(
-                color=completeness_data['Completeness'],
-                colorscale=[[0, COLORS['danger']], [0.5, COLORS['warning']], [1, COLORS['success']]],
-                cmin=0,
-                cmax=100
-            ),
-            hovertemplate='%{y}: %{x:.1f}%<extra></extra>'
-        ))
+        # Completeness chart, drawn above the field picker that can extend it
+        chart = st.container()
+        names = ('Name', 'Address', 'Phone', 'Email (Contacts)')
+        completeness = (
+            sf_stats.account_name_completeness,
+            sf_stats.address_completeness,
+            sf_stats.phone_completeness,
+            sf_stats.contact_email_completeness
+        )
+        errors = None
+        if st.toggle("➕ Chart more Account fields", key='profile_fields_open'):
+            try:
+                pcol1, pcol2 = st.columns([3, 1])
+                with pcol1:
+                    fields = st.multiselect("Fields", load_profile_columns(), key='profile_fields')
+                with pcol2:
+                    sample_percent = st.selectbox("Scan", list(PROFILE_SAMPLES), format_func=PROFILE_SAMPLES.get,
+                                                  key='profile_sample')
+                if fields:
+                    profile = load_field_profile(tuple(sorted(fields)), sample_percent)
+                    extra = [profile.columns[field] for field in fields]
+                    errors = (0,) * len(names) + tuple(c.completeness_error_pct or 0 for c in extra)
+                    names += tuple(c.column for c in extra)
+                    completeness += tuple(c.completeness_pct or 0 for c in extra)
+                    render_field_profile(profile)
+            except Exception as e:
+                st.error(f"Error profiling fields: {e}")
+        with chart:
+            fig = build_completeness_chart(names, completeness, errors)
+            st.plotly_chart(fig, use_container_width=True)
+
+        render_duplicate_clusters()
+
+
+@st.fragment(run_every=section_refresh('footer'))
+def render_footer():
+    """Last-updated time of the oldest snapshot."""
+    with span('fragment', section='footer'):
+        _, _, _, entries, _ = section_stats()
+        if not entries:
+            return
+        fetched_at = min(entry.fetched_at for entry in entries.values())
+        st.markdown(f"""
+        <div style="text-align: center; color: #8892b0; margin-top: 48px; padding: 24px; border-top: 1px solid rgba(255,255,255,0.1);">
+            <p style="margin: 0;">Last updated: {datetime.fromtimestamp(fetched_at, timezone.utc):%Y-%m-%d %H:%M:%S} UTC</p>
+            <p style="margin: 4px 0 0 0; font-size: 12px;">Data refreshes every 5 minutes • Built with 💜 by BigQuery Agent</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+# =============================================================================
+# Main Dashboard
+# =============================================================================
+
+def main():
+    # Each lap() records the render time of the section above it (full runs only;
+    # timed and widget-triggered section reruns are timed by span('fragment'))
+    laps = Laps('render')
+
+    # Load all data up front, so cold loads run concurrently (failures are reported per view)
+    entries, _ = load_all_stats()
+    laps.lap('load')
+
+    # Sections are registered even when nothing loaded: each shows its own
+    # unavailable state, and their timed reruns recover once the views load
+    render_header()
+    laps.lap('header')
+
+    if entries:
+        try:
+            prefetch_alignment_breakdown()
+        except Exception:
+            logger.warning("Could not prefetch the alignment breakdown", exc_info=True)
+    laps.lap('prefetch')
+
+    render_compare_picker()
+    laps.lap('compare')
+
+    render_kpis()
+    laps.lap('kpis')
+
+    render_alignment()
+    laps.lap('alignment')
+
+    # Row 3: VIP & Salesforce quality side by side
+    col1, col2 = st.columns(2)
+    with col1:
+        render_vip_panel()
+    laps.lap('vip_panel')
+    with col2:
+        render_salesforce_panel()
+    laps.lap('salesforce_panel')
+
+    render_cache_stats()
+
+    render_footer()
+    laps.lap('footer')
 
-        apply_dark_theme(fig, height=200,
-            margin=dict(l=0, r=20, t=10, b=10),
-            xaxis={'range': [0, 100]}
+    # Off the first render (see history_loaded); sections pick it up on their next rerun
+    start_history_loader(entries)
+
+
+# =============================================================================
+# Debug Panel & Metrics Export
+# =============================================================================
+
+# DQ_DEBUG_PANEL=1 (or ?debug=1 in the URL) shows timings and recent queries
+DEBUG_PANEL = os.environ.get("DQ_DEBUG_PANEL", "0") == "1"
+
+# Rewritten after every run, e.g. for node_exporter's textfile collector
+PROMETHEUS_TEXTFILE = os.environ.get("DQ_PROMETHEUS_TEXTFILE")
+
+
+def render_debug_panel():
+    """Show per-section timings, recent queries and the Prometheus export."""
+    if not (DEBUG_PANEL or st.query_params.get("debug") == "1"):
+        return
+    with st.expander("🛠️ Debug: timings & queries", expanded=True):
+        st.caption("Section timings since the app started (process-wide)")
+        st.dataframe(span_summary(), hide_index=True, use_container_width=True)
+        st.caption("Recent queries (job IDs and bytes are BigQuery-only)")
+        st.dataframe([
+            dict(record._asdict(), finished_at=datetime.fromtimestamp(record.finished_at, timezone.utc))
+            for record in recent_queries()
+        ], hide_index=True, use_container_width=True)
+        st.download_button(
+            "Download Prometheus metrics",
+            prometheus_text(get_snapshot_cache().stats()),
+            file_name="dq_metrics.prom",
+            mime="text/plain"
         )
-        st.plotly_chart(fig, use_container_width=True)
 
-    # ==========================================================================
-    # Footer
-    # ==========================================================================
-    st.markdown(f"""
-    <div style="text-align: center; color: #8892b0; margin-top: 48px; padding: 24px; border-top: 1px solid rgba(255,255,255,0.1);">
-        <p style="margin: 0;">Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>
-        <p style="margin: 4px 0 0 0; font-size: 12px;">Data refreshes every 5 minutes • Built with 💜 by BigQuery Agent</p>
-    </div>
-    """, unsafe_allow_html=True)
+
+def export_metrics():
+    """Write the Prometheus text file, if configured."""
+    if not PROMETHEUS_TEXTFILE:
+        return
+    try:
+        write_textfile(PROMETHEUS_TEXTFILE, get_snapshot_cache().stats())
+    except OSError:
+        logger.warning("Could not write %s", PROMETHEUS_TEXTFILE, exc_info=True)
 
 
 if __name__ == "__main__":
     main()
+    render_debug_panel()
+    export_metrics()
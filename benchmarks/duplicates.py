@@ -0,0 +1,152 @@
+"""
+Duplicate-cluster benchmark on synthetic Salesforce accounts.
+
+Generates N accounts in which a share of businesses were entered two to four
+times with the usual variations (case, legal suffix, "No." for "#", dropped
+apostrophes, a typo, "Street" for "St", a missing address), plus franchise
+stores that share a name but differ by store number. Runs find_clusters()
+and reports stage timings and pairwise precision/recall against the planted
+duplicates as JSON.
+
+Usage:
+    python benchmarks/duplicates.py [--accounts 300000] [--workers N] [--output duplicates.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from duplicates import find_clusters  # noqa: E402
+
+OWNERS = ('Smith', 'Garcia', 'Patel', 'Nguyen', 'Kim', "O'Brien", 'Rossi', 'Cohen', 'Murphy', 'Lopez',
+          'Chen', 'Novak', 'Silva', 'Dubois', 'Schmidt', 'Kowalski', 'Haddad', 'Okafor', 'Tanaka', 'Larsen')
+WORDS = ('Corner', 'Village', 'Harbor', 'Summit', 'Oak', 'Liberty', 'Depot', 'Country', 'Metro', 'Sunset',
+         'Pine', 'River', 'Lakeside', 'Hilltop', 'Golden', 'Union', 'Park', 'Station', 'Crown', 'Eagle')
+KINDS = ('Liquors', 'Market', 'Wine & Spirits', 'Grocery', 'Tavern', 'Bottle Shop', 'Beverage', 'Deli',
+         'Package Store', 'Food Mart')
+FRANCHISES = ('Total Wine', 'BevMo', 'Spec\'s', 'ABC Fine Wine', 'Binny\'s', 'Liquor Barn')
+STREETS = ('Main St', 'Oak Ave', 'Elm St', 'Route 9', 'Broadway', 'Park Ave', 'Mill Rd', 'Maple Dr', 'Lake Blvd')
+CITIES = ('Springfield', 'Riverside', 'Fairview', 'Franklin', 'Greenville', 'Clinton', 'Madison', 'Salem',
+          'Georgetown', 'Arlington')
+STATES = ('CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI')
+
+
+def _variant(rng, name, street):
+    """Return a re-keyed copy of a name and street, as a second data-entry would look."""
+    kind = rng.integers(7)
+    if kind == 0:
+        name = name.upper()
+    elif kind == 1:
+        name = f"{name} LLC"
+    elif kind == 2:
+        name = name.replace('#', 'No. ')
+    elif kind == 3:
+        name = name.replace("'", '').replace('&', 'and')
+    elif kind == 4:
+        name = f"The {name}"
+    elif kind == 5 and len(name) > 8:
+        # One dropped character
+        cut = int(rng.integers(1, len(name) - 1))
+        name = name[:cut] + name[cut + 1:]
+    else:
+        name = name.lower()
+    if rng.random() < 0.3:
+        street = street.replace(' St', ' Street').replace(' Ave', ' Avenue').replace(' Rd', ' Road')
+    if rng.random() < 0.1:
+        street = None
+    return name, street
+
+
+def synthetic_accounts(n, duplicate_rate=0.03, seed=0):
+    """Return (accounts Arrow table, entity id per account)."""
+    rng = np.random.default_rng(seed)
+    columns = {column: [] for column in (
+        'Id', 'Name', 'Type', 'VIP_ID__c', 'BillingStreet', 'BillingCity', 'BillingState', 'BillingPostalCode'
+    )}
+    entities = []
+    entity = 0
+    while len(entities) < n:
+        if rng.random() < 0.1:
+            name = f"{FRANCHISES[rng.integers(len(FRANCHISES))]} #{rng.integers(1, 2000)}"
+        else:
+            name = (f"{OWNERS[rng.integers(len(OWNERS))]}'s {WORDS[rng.integers(len(WORDS))]} "
+                    f"{KINDS[rng.integers(len(KINDS))]}")
+            if rng.random() < 0.5:
+                name += f" #{rng.integers(1, 300)}"
+        street = f"{rng.integers(1, 20000)} {STREETS[rng.integers(len(STREETS))]}"
+        city, state = CITIES[rng.integers(len(CITIES))], STATES[rng.integers(len(STATES))]
+        postal_code = f"{rng.integers(10000, 99999)}"
+
+        copies = [(name, street)]
+        if rng.random() < duplicate_rate:
+            copies += [_variant(rng, name, street) for _ in range(int(rng.integers(1, 4)))]
+        for copy_name, copy_street in copies:
+            if len(entities) == n:
+                break
+            columns['Id'].append(f"001{len(entities):015d}")
+            columns['Name'].append(copy_name)
+            columns['Type'].append('Retailer')
+            columns['VIP_ID__c'].append(None)
+            columns['BillingStreet'].append(copy_street)
+            columns['BillingCity'].append(city)
+            columns['BillingState'].append(state)
+            columns['BillingPostalCode'].append(postal_code)
+            entities.append(entity)
+        entity += 1
+    return pa.table(columns), np.array(entities)
+
+
+def pair_set(groups):
+    """Return the set of unordered index pairs inside each group."""
+    return {pair for group in groups for pair in combinations(sorted(group), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=300000)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    accounts, entities = synthetic_accounts(args.accounts)
+    generate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clusters, stats = find_clusters(accounts, args.workers)
+    total_s = time.perf_counter() - start
+
+    # Pairwise precision/recall against the planted duplicates
+    row_of_id = {account_id: row for row, account_id in enumerate(accounts['Id'].to_pylist())}
+    found = pair_set([row_of_id[account_id] for account_id in ids] for ids in clusters['account_ids'].to_pylist())
+    order = np.argsort(entities, kind='stable')
+    boundaries = np.flatnonzero(np.diff(entities[order])) + 1
+    expected = pair_set(group for group in np.split(order, boundaries) if len(group) > 1)
+    true_positives = len(found & expected)
+
+    summary = dict(stats, **{
+        'generate_s': generate_s,
+        'total_s': total_s,
+        'accounts_per_s': args.accounts / total_s,
+        'planted_pairs': len(expected),
+        'found_pairs': len(found),
+        'precision': true_positives / len(found) if found else 1.0,
+        'recall': true_positives / len(expected) if expected else 1.0,
+    })
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
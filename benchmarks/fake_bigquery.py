@@ -0,0 +1,96 @@
+"""
+Fake google.cloud.bigquery.Client for benchmarks.
+
+Answers the dashboard's view queries like the real client. Each view query
+returns the view's single row, taken once from the local DuckDB fixtures so
+the row matches the README schemas (snapshots.py). The alignment breakdown
+query returns the fixtures' breakdown rows. It answers after an
+injected per-query latency, with job statistics attached. get_table()
+reports a fixed modification time, so snapshot refreshes revalidate instead of
+reloading. Use install() to make data_sources.default_bq_client() return it.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_sources  # noqa: E402
+from data_sources import DATASET, VIEWS, LocalSource  # noqa: E402
+
+MODIFIED = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# Per-query statistics reported on every fake job
+BYTES_PROCESSED = 12 * 2**20
+BYTES_BILLED = 20 * 2**20  # on-demand minimum billing rounds up
+SLOT_MS = 850
+
+
+def fixture_rows():
+    """Return {view: row dict} from the local fixtures, plus 'alignment_breakdown': [row dict, ...]."""
+    source = LocalSource()
+    rows = {view: source.fetch_view(view).to_dict() for view in VIEWS}
+    rows['alignment_breakdown'] = source.fetch_alignment_breakdown().to_pylist()
+    return rows
+
+
+class FakeQueryJob:
+    """Finished query job: rows plus the statistics instrumentation reads."""
+
+    def __init__(self, job_id, rows, latency):
+        self.job_id = job_id
+        self.total_bytes_processed = BYTES_PROCESSED
+        self.total_bytes_billed = BYTES_BILLED
+        self.slot_millis = SLOT_MS
+        self.cache_hit = False
+        self._rows = rows
+        self._latency = latency
+
+    def result(self):
+        time.sleep(self._latency)
+        return list(self._rows)
+
+    def to_arrow(self, create_bqstorage_client=False):
+        import pyarrow as pa
+        return pa.Table.from_pylist(self.result())
+
+
+class FakeBigQueryClient:
+    """Serves the three quality views (one at a time or batched) and the alignment
+    breakdown, sleeping `latency` s per query."""
+
+    def __init__(self, rows=None, latency=0.0):
+        self.rows = rows if rows is not None else fixture_rows()
+        self.latency = latency
+        self.query_count = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def query(self, query, job_config=None):
+        with self._lock:
+            self.query_count += 1
+        views = [view for view in VIEWS if f"{DATASET}.{view}" in query]
+        if "AS kind" in query:
+            # fetch_alignment_breakdown()
+            return FakeQueryJob(f"fake_job_{next(self._ids)}", self.rows['alignment_breakdown'], self.latency)
+        if len(views) == len(VIEWS):
+            # fetch_snapshot(): one wide row with view-prefixed columns
+            row = {f"{view}__{column}": value for view in VIEWS for column, value in self.rows[view].items()}
+        elif len(views) == 1:
+            row = self.rows[views[0]]
+        else:
+            raise NotImplementedError(f"FakeBigQueryClient only serves the quality views:\n{query}")
+        return FakeQueryJob(f"fake_job_{next(self._ids)}", [row], self.latency)
+
+    def get_table(self, table):
+        return SimpleNamespace(modified=MODIFIED)
+
+
+def install(client):
+    """Make data_sources.default_bq_client() (and so app.py) return `client`."""
+    data_sources.default_bq_client = lambda service_account_info=None: client
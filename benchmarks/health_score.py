@@ -0,0 +1,103 @@
+"""
+Health score benchmark: scalar vs. vectorized.
+
+Builds N synthetic snapshots (including nulls and zeros), scores them with
+calculate_health_score() one at a time and with calculate_health_scores() in
+one call, and reports throughput as JSON. tests/test_health_score.py checks
+that the two agree.
+
+Usage:
+    python benchmarks/health_score.py [--snapshots 50000] [--output health.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from health import calculate_health_score, calculate_health_scores  # noqa: E402
+from history_store import history_column  # noqa: E402
+
+# (view, column, low, high) for every input of the score
+INPUTS = (
+    ('vip_match_quality', 'match_rate_pct', 0, 100),
+    ('vip_sf_alignment', 'retail_match_rate_pct', 0, 100),
+    ('vip_sf_alignment', 'distributor_match_rate_pct', 0, 100),
+    ('vip_sf_alignment', 'chain_match_rate_pct', 0, 100),
+    ('salesforce_quality', 'account_name_completeness', 0, 100),
+    ('salesforce_quality', 'phone_completeness', 0, 100),
+    ('salesforce_quality', 'accounts_with_duplicate_names', 0, 20000),
+)
+
+
+def synthetic_history(n, seed=0):
+    """Return {history column: list} for n snapshots with edge cases mixed in."""
+    rng = np.random.default_rng(seed)
+    history = {}
+    for view, column, low, high in INPUTS:
+        if column == 'accounts_with_duplicate_names':
+            values = rng.integers(low, high, n).tolist()
+        else:
+            values = np.round(rng.uniform(low, high, n), 1).tolist()
+            # Nulls and zeros exercise the `or` defaults
+            for i in rng.choice(n, n // 50, replace=False):
+                values[i] = None
+            for i in rng.choice(n, n // 50, replace=False):
+                values[i] = 0.0
+        history[history_column(view, column)] = values
+    return history
+
+
+def scalar_scores(history, n):
+    """Score each snapshot with the scalar function."""
+    columns = {view: [c for v, c, _, _ in INPUTS if v == view] for view, _, _, _ in INPUTS}
+    scores = []
+    for i in range(n):
+        stats = {
+            view: SimpleNamespace(**{c: history[history_column(view, c)][i] for c in view_columns})
+            for view, view_columns in columns.items()
+        }
+        scores.append(calculate_health_score(
+            stats['vip_match_quality'], stats['salesforce_quality'], stats['vip_sf_alignment']
+        ))
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--snapshots', type=int, default=50000)
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    n = args.snapshots
+    history = synthetic_history(n)
+
+    start = time.perf_counter()
+    scalar_scores(history, n)
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_health_scores(history)
+    vector_s = time.perf_counter() - start
+
+    summary = {
+        'snapshots': n,
+        'scalar_ms': scalar_s * 1000,
+        'vectorized_ms': vector_s * 1000,
+        'speedup': scalar_s / vector_s,
+    }
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
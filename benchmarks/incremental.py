@@ -0,0 +1,133 @@
+"""
+Incremental metrics benchmark: delta refreshes vs. full rebuilds on the local fixtures.
+
+Builds the running counters of incremental.py from a full scan of the DuckDB
+fixtures. Then, for each churn size, it edits, soft-deletes and inserts about
+that many Salesforce accounts, contacts, leads and VIP retail rows, stamped
+past the watermark, and times a delta refresh of every table. Finally it
+rebuilds a second state from scratch and checks that both produce the same
+view snapshots. Reports timings as JSON; exits non-zero if the snapshots differ.
+
+Usage:
+    python benchmarks/incremental.py [--churn 10 100 1000 10000] [--output incremental.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources import VIEWS, LocalSource  # noqa: E402
+from incremental import TABLES, MetricsEngine  # noqa: E402
+
+ACCOUNTS = 360535
+
+# Numeric part of the Salesforce Id / vip_code, to pick rows deterministically
+SF_N = "CAST(substr(Id, 4) AS BIGINT)"
+VIP_N = "CAST(substr(vip_code, 2) AS BIGINT)"
+
+
+def churn_statements(step, offset, stamp):
+    """Edits touching every `step`-th row (shifted by `offset`), stamped `stamp`."""
+    return (
+        f"""UPDATE raw_salesforce.Account SET
+                Phone = CASE WHEN Phone IS NULL THEN '(555) 010-0000' END,
+                Name = CASE WHEN {SF_N} % 3 = 0 THEN 'Duplicate Name ' || ({SF_N} % 50)::VARCHAR ELSE Name END,
+                VIP_ID__c = CASE WHEN {SF_N} % 5 = 0 THEN NULL WHEN {SF_N} % 5 = 1 THEN 'R0000001' ELSE VIP_ID__c END,
+                LastActivityDate = current_date - CAST({SF_N} % 120 AS INTEGER),
+                IsDeleted = {SF_N} % 7 = 0,
+                SystemModstamp = {stamp}
+            WHERE {SF_N} % {step} = {offset}""",
+        f"""UPDATE raw_salesforce.Contact SET
+                Email = CASE WHEN Email IS NULL THEN 'new@example.com' END,
+                AccountId = CASE WHEN {SF_N} % 4 = 0 THEN NULL ELSE AccountId END,
+                IsDeleted = {SF_N} % 9 = 0,
+                SystemModstamp = {stamp}
+            WHERE {SF_N} % {step * 3} = {offset}""",
+        f"""UPDATE raw_salesforce.Lead SET
+                Status = 'Closed - Converted', IsConverted = true, SystemModstamp = {stamp}
+            WHERE {SF_N} % {step * 16} = {offset}""",
+        f"""UPDATE staging_vip.retail_universe_fact_sheet SET
+                sf_account_id = CASE WHEN sf_account_id IS NULL THEN '001999' || vip_code END,
+                account_name = CASE WHEN {VIP_N} % 4 = 0 THEN NULL ELSE account_name END,
+                loaded_at = {stamp}
+            WHERE {VIP_N} % {step} = {offset}""",
+        f"""INSERT INTO staging_vip.retail_universe_fact_sheet (vip_code, sf_account_id, account_name, street_address, loaded_at)
+            SELECT 'R' || (9000000 + {offset} * 100000 + i)::VARCHAR, NULL, 'New Store ' || i::VARCHAR, '1 New St', {stamp}
+            FROM range({max(1, ACCOUNTS // step // 10)}) r(i)""",
+    )
+
+
+def snapshots(engine):
+    """Return every view's snapshot as a dict, without calculated_at."""
+    rows = {}
+    for view in VIEWS:
+        engine.refresh_view(view)
+        row = engine.snapshot(view).to_dict()
+        del row['calculated_at']
+        rows[view] = row
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--churn', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help="approximate accounts changed per round")
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    source = LocalSource()
+    with tempfile.TemporaryDirectory() as directory:
+        engine = MetricsEngine(source, os.path.join(directory, 'incremental.sqlite'), min_interval=0)
+        start = time.perf_counter()
+        full_rows = sum(engine.refresh(name)['rows'] for name in TABLES)
+        full_s = time.perf_counter() - start
+
+        rounds = []
+        for offset, churn in enumerate(args.churn):
+            # Each round is stamped an hour after the previous one, past the Salesforce overlap
+            stamp = f"TIMESTAMPTZ '2026-01-01 00:00:00+00' + to_hours({offset})"
+            for statement in churn_statements(max(1, ACCOUNTS // churn), offset, stamp):
+                source.run_query(statement)
+            start = time.perf_counter()
+            stats = {name: engine.refresh(name) for name in TABLES}
+            rounds.append({
+                'churn': churn,
+                'rows_applied': sum(table_stats['rows'] for table_stats in stats.values()),
+                'delta_ms': (time.perf_counter() - start) * 1000,
+                'modes': sorted({table_stats['mode'] for table_stats in stats.values()}),
+            })
+
+        incremental = snapshots(engine)
+        rebuilt_engine = MetricsEngine(source, os.path.join(directory, 'rebuilt.sqlite'))
+        start = time.perf_counter()
+        rebuilt = snapshots(rebuilt_engine)
+        rebuild_s = time.perf_counter() - start
+
+    differences = {
+        f"{view}.{column}": [value, rebuilt[view][column]]
+        for view in VIEWS for column, value in incremental[view].items() if value != rebuilt[view][column]
+    }
+    summary = {
+        'full_rows': full_rows,
+        'full_s': full_s,
+        'rounds': rounds,
+        'rebuild_after_churn_s': rebuild_s,
+        'incremental_matches_rebuild': not differences,
+        'differences': differences,
+    }
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if differences:
+        sys.exit("incremental counters differ from a full rebuild")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Concurrent-viewer load test: N sessions running app.py in one process.
+
+For each session count, a fresh interpreter plays one app.py process serving
+that many viewers. Each session is an AppTest harness on its own thread. All
+sessions open the page at the same moment, like a Monday-morning spike. Each
+then reruns the full script --reruns times, pausing a random think time
+(mean --think-ms) between reruns. The data comes from the local DuckDB
+fixtures with --latency-ms per query, or from fake_bigquery.FakeBigQueryClient.
+Reports per session count:
+- first-run and warm-rerun latency percentiles (p50, p95, p99)
+- peak RSS of the process, and RSS after imports before any session started
+- backend queries issued per loader (instrumentation.query_summary()), and
+  the snapshot cache's loads, hits and deduplicated requests per snapshot
+
+The source tables do not change during a run, so every snapshot should be
+loaded once per process however many sessions ask for it. The script exits
+non-zero if one was loaded more often. Every run is appended to
+benchmarks/load_results.jsonl with the git commit, to track capacity over time.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1 10 25 50] [--reruns 10] [--think-ms 500]
+                                   [--latency-ms 300] [--backend local|fake-bigquery] [--output load.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+HISTORY_PATH = os.path.join(REPO_DIR, 'benchmarks', 'load_results.jsonl')
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(values):
+    """Return {'p50_ms': ..., ...} (nearest rank) for timings in ms."""
+    values = sorted(values)
+    if not values:
+        return {}
+    return {f'p{p}_ms': values[min(len(values) - 1, len(values) * p // 100)] for p in PERCENTILES}
+
+
+def peak_rss_mb():
+    """Return this process's peak resident set size so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def child(args):
+    """Serve `args.sessions` concurrent sessions in this process; print measurements as JSON."""
+    sys.path.insert(0, REPO_DIR)
+    import loaders
+    from instrumentation import query_summary
+    from streamlit.testing.v1 import AppTest
+
+    if args.backend == 'fake-bigquery':
+        from fake_bigquery import FakeBigQueryClient, install
+        install(FakeBigQueryClient(latency=args.latency_ms / 1000))
+
+    # app.py re-imports open_snapshot_cache on every run; keep the cache it opens for its stats
+    caches = []
+    open_snapshot_cache = loaders.open_snapshot_cache
+
+    def tracked_open_snapshot_cache(warm=True):
+        cache = open_snapshot_cache(warm)
+        caches.append(cache)
+        return cache
+
+    loaders.open_snapshot_cache = tracked_open_snapshot_cache
+    baseline_rss = peak_rss_mb()
+
+    start_line = threading.Barrier(args.sessions)
+    first_runs, reruns, errors = [], [], []
+    lock = threading.Lock()
+
+    def session(seed):
+        rng = random.Random(seed)
+        at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        start_line.wait()
+        for run in range(args.reruns + 1):
+            if run:
+                time.sleep(rng.expovariate(1000 / args.think_ms) if args.think_ms else 0)
+            start = time.perf_counter()
+            try:
+                at.run()
+            except Exception as e:
+                failure = repr(e)
+            else:
+                failure = at.exception[0].value if at.exception else None
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if failure:
+                    errors.append(failure)
+                (reruns if run else first_runs).append(elapsed)
+
+    threads = [threading.Thread(target=session, args=(i,), name=f"session-{i}") for i in range(args.sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_s = time.perf_counter() - start
+
+    cache_stats = caches[0].stats() if caches else {}
+    print(json.dumps({
+        'sessions': args.sessions,
+        'wall_s': wall_s,
+        'runs': len(first_runs) + len(reruns),
+        'runs_per_s': (len(first_runs) + len(reruns)) / wall_s,
+        'first_run': percentiles(first_runs),
+        'rerun': percentiles(reruns),
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': peak_rss_mb(),
+        'queries': {row['query']: row['count'] for row in query_summary()},
+        'total_queries': sum(row['count'] for row in query_summary()),
+        'snapshots': {
+            key: {
+                'loads': stats['cold_loads'] + stats['reloads'],
+                'hits': stats['hits'] + stats['stale_hits'],
+                'deduplicated': stats['deduplicated'] + stats['waited'],
+            }
+            for key, stats in sorted(cache_stats.items())
+        },
+        'errors': errors[:10],
+        'error_count': len(errors),
+    }))
+
+
+def run_level(args, sessions):
+    """Run one session count in a fresh interpreter with an empty cache; return its measurements."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(
+            os.environ,
+            DQ_CACHE_DIR=cache_dir,
+            DQ_DATA_SOURCE='local' if args.backend == 'local' else 'bigquery',
+            DQ_LOCAL_LATENCY_MS=str(args.latency_ms),
+            DQ_SNAPSHOT_ARTIFACT='',
+        )
+        command = [
+            sys.executable, __file__, '--child', '--sessions', str(sessions), '--reruns', str(args.reruns),
+            '--think-ms', str(args.think_ms), '--latency-ms', str(args.latency_ms),
+            '--backend', args.backend, '--timeout', str(args.timeout),
+        ]
+        result = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"{sessions} sessions failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 25, 50],
+                        help="concurrent session counts to test, each in a fresh process")
+    parser.add_argument('--reruns', type=int, default=10, help="warm reruns per session after the first run")
+    parser.add_argument('--think-ms', type=float, default=500, help="mean pause between a session's reruns")
+    parser.add_argument('--latency-ms', type=float, default=300, help="backend latency per query")
+    parser.add_argument('--backend', choices=('local', 'fake-bigquery'), default='local')
+    parser.add_argument('--timeout', type=float, default=300, help="AppTest timeout per run, in seconds")
+    parser.add_argument('--history', default=HISTORY_PATH, help="JSON-lines file runs are appended to")
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.sessions = args.sessions[0]
+        child(args)
+        return
+
+    levels = []
+    for sessions in args.sessions:
+        levels.append(run_level(args, sessions))
+        print(f"{sessions} sessions: rerun p95 {levels[-1]['rerun'].get('p95_ms', 0):.0f} ms, "
+              f"peak RSS {levels[-1]['peak_rss_mb']:.0f} MiB", file=sys.stderr)
+
+    summary = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'backend': args.backend,
+        'latency_ms': args.latency_ms,
+        'reruns': args.reruns,
+        'think_ms': args.think_ms,
+        'levels': levels,
+    }
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(summary) + '\n')
+
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    duplicated = [
+        f"{level['sessions']} sessions: {key} loaded {stats['loads']} times"
+        for level in levels for key, stats in level['snapshots'].items() if stats['loads'] > 1
+    ]
+    failed = [f"{level['sessions']} sessions: {level['error_count']} failed runs" for level in levels if level['error_count']]
+    if duplicated or failed:
+        sys.exit("\n".join(duplicated + failed))
+
+
+if __name__ == '__main__':
+    main()
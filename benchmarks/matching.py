@@ -0,0 +1,114 @@
+"""
+Candidate-match benchmark: full vs. incremental runs on the local fixtures.
+
+Runs the match job over every unmatched VIP record in the DuckDB fixtures,
+checks top-1/top-5 recall against the accounts the Salesforce fixture planted
+for unmatched retail rows, then edits a few accounts and VIP records and
+checks that an incremental run writes exactly what a full run does. Reports
+timings as JSON; exits non-zero if the incremental and full results differ.
+
+Usage:
+    python benchmarks/matching.py [--workers N] [--output matching.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matching  # noqa: E402
+from data_sources import LocalSource  # noqa: E402
+
+KINDS = ['retail', 'distributor', 'chain']
+
+# Edits between the two runs: a renamed, a new and a deleted account, and a renamed VIP record
+EDITS = (
+    "UPDATE raw_salesforce.Account SET Name = 'Totally Different Name' WHERE Id = '001000000000060460'",
+    """INSERT INTO raw_salesforce.Account (Id, Name, Type, BillingStreet, BillingCity, BillingState, BillingPostalCode)
+       SELECT '001999999999999999', account_name, 'Retailer', street_address, city, state, zip_code
+       FROM staging_vip.retail_universe_fact_sheet WHERE vip_code = 'R0000000'""",
+    "UPDATE raw_salesforce.Account SET IsDeleted = true WHERE Id = '001000000002000288'",
+    "UPDATE staging_vip.retail_universe_fact_sheet SET account_name = 'Renamed Store #5' WHERE vip_code = 'R0000004'",
+)
+
+
+def planted_recall(path):
+    """Return (planted, top-1 hits, top-5 hits) for unmatched retail rows with a planted account."""
+    table = pq.read_table(path, filters=[('kind', '=', 'retail')])
+    planted = top1 = top5 = 0
+    for key, candidates in zip(table['key'].to_pylist(), table['candidate_ids'].to_pylist()):
+        # The fixture derives both sides from the same permuted row number p
+        p = (int(key[1:]) * 104729) % 412870
+        if not 56656 <= p < 74317:
+            continue
+        expected = f"001{p:015d}"
+        planted += 1
+        top1 += bool(candidates) and candidates[0] == expected
+        top5 += expected in candidates
+    return planted, top1, top5
+
+
+def sorted_results(path):
+    table = pq.read_table(path)
+    return table.sort_by([('kind', 'ascending'), ('key', 'ascending')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    source = LocalSource()
+    with tempfile.TemporaryDirectory() as directory:
+        full_path = os.path.join(directory, 'full.parquet')
+        incremental_path = os.path.join(directory, 'incremental.parquet')
+
+        start = time.perf_counter()
+        full_stats = matching.run(source, KINDS, full_path, workers=args.workers)
+        full_s = time.perf_counter() - start
+        planted, top1, top5 = planted_recall(full_path)
+
+        shutil.copy(full_path, incremental_path)
+        shutil.copy(matching.account_state_path(full_path), matching.account_state_path(incremental_path))
+        for statement in EDITS:
+            source.run_query(statement)
+
+        start = time.perf_counter()
+        incremental_stats = matching.run(source, KINDS, incremental_path, incremental=True, workers=args.workers)
+        incremental_s = time.perf_counter() - start
+        matching.run(source, KINDS, full_path, workers=args.workers)
+        identical = sorted_results(full_path).equals(sorted_results(incremental_path))
+        suggestions = pq.read_table(full_path)
+        with_suggestions = int(pc.sum(pc.greater(pc.list_value_length(suggestions['candidate_ids']), 0)).as_py())
+
+    summary = {
+        'records': {kind: stats['records'] for kind, stats in full_stats.items()},
+        'with_suggestions': with_suggestions,
+        'full_s': full_s,
+        'incremental_s': incremental_s,
+        'incremental_rescored': {kind: stats['rescored'] for kind, stats in incremental_stats.items()},
+        'planted_retail_matches': planted,
+        'top1_recall': top1 / planted if planted else 1.0,
+        'top5_recall': top5 / planted if planted else 1.0,
+        'incremental_matches_full': identical,
+    }
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if not identical:
+        sys.exit("incremental run differs from a full run")
+
+
+if __name__ == '__main__':
+    main()
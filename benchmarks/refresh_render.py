@@ -0,0 +1,221 @@
+"""
+Refresh- and render-path benchmark: app.py against a fake BigQuery client.
+
+app.py runs unchanged under Streamlit's AppTest harness with
+DQ_DATA_SOURCE=bigquery. data_sources.default_bq_client() is swapped for
+fake_bigquery.FakeBigQueryClient, which answers each view query after
+--latency-ms. Measures:
+- loader latency: load_all() against an empty and a warm snapshot cache
+- calculate_health_score() calls per second
+- card/alignment-row HTML and Plotly figure build times, uncached and memoized
+- end-to-end rerun time: first run and warm reruns (median, p95), and the
+  number of queries a warm rerun sends (should be 0)
+
+Every run is appended to benchmarks/results.jsonl with the git commit. With
+--compare it is checked against the previous entry. The script exits non-zero
+if a timing got slower, or a throughput lower, by more than --tolerance.
+Timings must also grow by at least --min-delta-ms, so that noise in
+microsecond-scale numbers is not flagged.
+
+Usage:
+    python benchmarks/refresh_render.py [--reruns 20] [--latency-ms 300]
+                                        [--compare] [--tolerance 0.25] [--output refresh_render.json]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+HISTORY_PATH = os.path.join(REPO_DIR, 'benchmarks', 'results.jsonl')
+
+# loaders.py reads its configuration at import time
+CACHE_DIR = tempfile.mkdtemp(prefix='dq-bench-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+os.environ.update(DQ_DATA_SOURCE='bigquery', DQ_CACHE_DIR=CACHE_DIR, DQ_BATCHED_SNAPSHOT='0')
+
+sys.path.insert(0, REPO_DIR)
+
+import components  # noqa: E402
+from data_sources import BigQuerySource  # noqa: E402
+from fake_bigquery import FakeBigQueryClient, fixture_rows, install  # noqa: E402
+from health import calculate_health_score  # noqa: E402
+from loaders import load_all  # noqa: E402
+from snapshot_cache import SnapshotCache  # noqa: E402
+from snapshots import SNAPSHOT_TYPES  # noqa: E402
+
+
+def timed_ms(fn, repeat):
+    """Return the median wall time of fn() over `repeat` calls, in ms."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def bench_loaders(rows, latency, repeat=5):
+    """Time load_all() with an empty cache (queries) and a warm one (memory hits)."""
+    source = BigQuerySource(FakeBigQueryClient(rows, latency))
+
+    def cold():
+        with tempfile.TemporaryDirectory() as directory:
+            load_all(SnapshotCache(os.path.join(directory, 'snapshots.sqlite')), source)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SnapshotCache(os.path.join(directory, 'snapshots.sqlite'))
+        load_all(cache, source)
+        warm_ms = timed_ms(lambda: load_all(cache, source), repeat * 20)
+    return {'load_cold_ms': timed_ms(cold, repeat), 'load_warm_ms': warm_ms}
+
+
+def bench_health_score(rows, calls=200000):
+    """Return calculate_health_score() calls per second on the fixture snapshots."""
+    vip, sf, alignment = (
+        SNAPSHOT_TYPES[view].from_row(rows[view])
+        for view in ('vip_match_quality', 'salesforce_quality', 'vip_sf_alignment')
+    )
+    start = time.perf_counter()
+    for _ in range(calls):
+        calculate_health_score(vip, sf, alignment)
+    return {'health_score_per_s': calls / (time.perf_counter() - start)}
+
+
+def bench_builders():
+    """Time each HTML/figure builder with its memo bypassed and through the memo."""
+    trend = tuple(80 + (i % 7) * 0.5 for i in range(60))
+    builders = {
+        'metric_card': (components.render_metric_card, ("78", "Health Score", "System-wide quality", "warning", trend), 2000),
+        'alignment_row': (components.render_alignment_row, ("Retail Locations", 412870, 360000, 338553, 82.0), 2000),
+        'match_chart': (components.build_match_chart, (338553, 74317), 20),
+        'completeness_chart': (
+            components.build_completeness_chart,
+            (('Name', 'Address', 'Phone', 'Email (Contacts)'), (99.5, 91.0, 68.0, 55.5)),
+            20,
+        ),
+    }
+    results = {}
+    for name, (builder, args, repeat) in builders.items():
+        results[f'{name}_build_ms'] = timed_ms(lambda: builder.__wrapped__(*args), repeat)
+        builder(*args)
+        results[f'{name}_memo_ms'] = timed_ms(lambda: builder(*args), repeat)
+    return results
+
+
+def bench_reruns(rows, latency, reruns):
+    """Run app.py under AppTest: first run, then `reruns` warm reruns."""
+    from streamlit.testing.v1 import AppTest
+
+    client = FakeBigQueryClient(rows, latency)
+    install(client)
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+
+    start = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise SystemExit(f"app.py raised: {at.exception[0].value}")
+
+    queries_before = client.query_count
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        'first_run_ms': first_ms,
+        'rerun_median_ms': statistics.median(times),
+        'rerun_p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+        'queries_per_warm_rerun': (client.query_count - queries_before) / reruns,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path):
+    """Return the last recorded run, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def regressions(current, previous, tolerance, min_delta_ms):
+    """Return a message per metric that got worse than `tolerance` (a fraction) vs. previous."""
+    messages = []
+    for name, value in current.items():
+        old = previous.get(name)
+        if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old <= 0:
+            continue
+        if name.endswith('_ms') and value > old * (1 + tolerance) and value - old >= min_delta_ms:
+            messages.append(f"{name}: {old:.3f} -> {value:.3f} ms (+{value / old - 1:.0%})")
+        elif name.endswith('_per_s') and value < old * (1 - tolerance):
+            messages.append(f"{name}: {old:,.0f} -> {value:,.0f}/s ({value / old - 1:.0%})")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=300, help="fake BigQuery latency per query")
+    parser.add_argument('--history', default=HISTORY_PATH, help="JSON-lines file runs are appended to")
+    parser.add_argument('--compare', action='store_true', help="fail on regressions vs. the previous run")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    rows = fixture_rows()
+    latency = args.latency_ms / 1000
+    metrics = {}
+    metrics.update(bench_loaders(rows, latency))
+    metrics.update(bench_health_score(rows))
+    metrics.update(bench_builders())
+    metrics.update(bench_reruns(rows, latency, args.reruns))
+
+    previous = previous_result(args.history)
+    summary = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'latency_ms': args.latency_ms,
+        'metrics': metrics,
+    }
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(summary) + '\n')
+
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if args.compare and previous is not None:
+        if previous.get('latency_ms') != args.latency_ms:
+            print(f"Previous run used --latency-ms {previous.get('latency_ms')}; not comparing", file=sys.stderr)
+            return
+        found = regressions(metrics, previous['metrics'], args.tolerance, args.min_delta_ms)
+        if found:
+            sys.exit(f"Regressions vs. {previous.get('commit')} ({previous['recorded_at']}):\n  " + "\n  ".join(found))
+        print(f"No regressions vs. {previous.get('commit')} ({previous['recorded_at']})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
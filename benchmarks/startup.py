@@ -0,0 +1,120 @@
+"""
+Cold-start benchmark for app.py.
+
+Each run starts a fresh interpreter (with -X importtime) that imports
+Streamlit's test harness and renders app.py once against the local DuckDB
+data source with an empty snapshot cache. Reports median import times of the
+heavy dependencies, time-to-first-render, and which of them were loaded.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+
+# Top-level imports whose cumulative import time is reported
+TRACKED_MODULES = (
+    'streamlit',
+    'plotly.graph_objects',
+    'plotly.express',
+    'pandas',
+    'pyarrow',
+    'google.cloud.bigquery',
+    'duckdb',
+)
+
+
+def child():
+    """Render app.py once in this process and print timings as JSON."""
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    harness_loaded = time.perf_counter()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    rendered = time.perf_counter()
+
+    if at.exception:
+        raise SystemExit(f"app.py raised: {at.exception[0].value}")
+    print(json.dumps({
+        'harness_import_ms': (harness_loaded - start) * 1000,
+        'first_render_ms': (rendered - harness_loaded) * 1000,
+        'total_ms': (rendered - start) * 1000,
+        'loaded': {name: name in sys.modules for name in TRACKED_MODULES},
+    }))
+
+
+def parse_importtime(stderr):
+    """Return cumulative import time (ms) per tracked module from -X importtime output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line.split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        if name in TRACKED_MODULES and name not in times:
+            times[name] = int(parts[1]) / 1000
+    return times
+
+
+def run_once():
+    """Run one cold start in a subprocess; return its measurements."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, DQ_DATA_SOURCE='local', DQ_CACHE_DIR=cache_dir)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', __file__, '--child'],
+            cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True
+        )
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    measurements['import_ms'] = parse_importtime(result.stderr)
+    return measurements
+
+
+def summarize(runs):
+    """Reduce per-run measurements to medians."""
+    return {
+        'runs': len(runs),
+        'harness_import_ms': statistics.median(r['harness_import_ms'] for r in runs),
+        'first_render_ms': statistics.median(r['first_render_ms'] for r in runs),
+        'total_ms': statistics.median(r['total_ms'] for r in runs),
+        'import_ms': {
+            name: statistics.median(r['import_ms'].get(name, 0.0) for r in runs)
+            for name in TRACKED_MODULES
+        },
+        'loaded': runs[-1]['loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help="also write the JSON summary to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    summary = summarize([run_once() for _ in range(args.runs)])
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
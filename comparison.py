@@ -0,0 +1,230 @@
+"""
+Point-in-time comparison: the three views as they were at an earlier time.
+
+PointInTime.compare(at) resolves a past time to view snapshots, trying in order:
+1. the stored snapshot history (history_store.py): the newest row at or
+   before `at`, if it is at most HISTORY_TOLERANCE_SECONDS older. Free.
+2. BigQuery time travel, if `at` is inside the source's time_travel_days
+   window with TIME_TRAVEL_MARGIN_SECONDS to spare: incremental.py's
+   MetricsEngine rebuilds the view counters from the source tables read
+   FOR SYSTEM_TIME AS OF `at`. This is one full scan of each source table, so
+   it runs on a background thread and compare() returns a 'pending'
+   Comparison until it is done. Time travel cannot read views, so the
+   match-method columns incremental.py carries over from vip_match_quality
+   are None.
+3. the newest stored snapshot within HISTORY_LOOKBACK_DAYS before `at`,
+   however old; its own time is reported as `as_of`
+
+Results of 1. and 2. never change, so they are kept in a ResultCache: an
+on-disk LRU bounded at DQ_COMPARISON_CACHE_MB, with no expiry. Repeating a
+comparison costs no scans. A 3. result may be superseded once time travel or
+a closer snapshot becomes available, so it is only kept in memory for
+FALLBACK_TTL_SECONDS. Times are rounded up to the hour, so "a week ago" maps
+to the same entry for an hour and stays inside a 7-day time travel window,
+and must be at least MIN_AGE_SECONDS in the past.
+
+Usage:
+    python comparison.py [--days-ago 7 | --at 2026-10-10T00:00+00:00] [--source bigquery|local]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from data_sources import VIEWS
+from history_store import KEY_COLUMN, snapshots_from_row
+from incremental import TABLES, MetricsEngine
+from instrumentation import span
+from loaders import CACHE_DIR, DATA_SOURCE
+
+COMPARISON_CACHE_MB = float(os.environ.get("DQ_COMPARISON_CACHE_MB", "64"))
+
+HISTORY_TOLERANCE_SECONDS = 6 * 3600
+HISTORY_LOOKBACK_DAYS = 7
+# Newer snapshots may still be appended to the history; only older times are final
+MIN_AGE_SECONDS = 3600
+# Time travel must still reach `at` when the queries run
+TIME_TRAVEL_MARGIN_SECONDS = 300
+# A failed time travel is not retried for this long
+RETRY_AFTER_SECONDS = 600
+# How long a stale-history fallback is reused before resolving again
+FALLBACK_TTL_SECONDS = 300
+
+# Comparisons kept in memory per process, on top of the disk cache
+MEMORY_ENTRIES = 32
+
+# requested_at: the rounded time asked for; as_of: the time the snapshots reflect;
+# method: 'history', 'time_travel' or 'pending' (time travel running; no snapshots yet)
+Comparison = namedtuple('Comparison', ['requested_at', 'as_of', 'method', 'snapshots'])
+
+
+class AsOfSource:
+    """Data source whose source tables are read as of `at`; everything else is `source`'s."""
+
+    def __init__(self, source, at):
+        self.source = source
+        self.at = at
+
+    def source_ref(self, table):
+        return self.source.source_ref_as_of(table, self.at)
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+
+def time_travel_snapshots(source, at):
+    """Rebuild the view snapshots from the source tables as of `at` (full scans)."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = MetricsEngine(AsOfSource(source, at), os.path.join(directory, 'as_of.sqlite'), as_of=at)
+        for name in TABLES:
+            engine.refresh(name, full=True)
+        return {view: engine.snapshot(view, carry_over=False) for view in VIEWS}
+
+
+def ceil_hour(at):
+    at = at.astimezone(timezone.utc)
+    floor = at.replace(minute=0, second=0, microsecond=0)
+    return floor if floor == at else floor + timedelta(hours=1)
+
+
+class PointInTime:
+    """Resolves past times to view snapshots, caching exact results indefinitely."""
+
+    def __init__(self, source, history, cache):
+        self.source = source
+        self.history = history
+        self.cache = cache
+        self._memory = OrderedDict()   # key -> (Comparison, expires_at or None)
+        self._pending = {}             # key -> Future of a time travel
+        self._failures = {}            # key -> (failed_at, exception)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='time-travel')
+
+    def _remember(self, key, comparison, ttl=None):
+        with self._lock:
+            self._memory[key] = (comparison, time.time() + ttl if ttl else None)
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return comparison
+
+    def _in_time_travel_window(self, at):
+        travel_days = getattr(self.source, 'time_travel_days', 0)
+        age = (datetime.now(timezone.utc) - at).total_seconds()
+        return age < travel_days * 86400 - TIME_TRAVEL_MARGIN_SECONDS
+
+    def _travel(self, key, at):
+        with span('time_travel'):
+            return self.cache.get_or_load(
+                key, lambda: Comparison(at, at, 'time_travel', time_travel_snapshots(self.source, at))
+            )
+
+    def _time_travel(self, key, at):
+        """Return the finished time travel to `at`, or start it (once) and return None."""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None and future.done():
+                del self._pending[key]
+                if future.exception() is not None:
+                    self._failures[key] = (time.time(), future.exception())
+                else:
+                    return future.result()
+            failed_at, error = self._failures.get(key, (0, None))
+            if error is not None and time.time() - failed_at < RETRY_AFTER_SECONDS:
+                raise LookupError(f"Time travel to {at:%Y-%m-%d %H:%M} UTC failed: {error}")
+            if key not in self._pending:
+                self._failures.pop(key, None)
+                self._pending[key] = self._pool.submit(self._travel, key, at)
+        return None
+
+    def compare(self, at):
+        """Return the Comparison for time `at` (rounded up to the hour).
+
+        A time travel result is computed in the background: until it is
+        cached, this returns a Comparison with method 'pending'.
+        """
+        at = ceil_hour(at)
+        if (datetime.now(timezone.utc) - at).total_seconds() < MIN_AGE_SECONDS:
+            raise ValueError(f"Comparison times must be at least {MIN_AGE_SECONDS // 60} minutes in the past")
+        key = f"views@{at.isoformat()}"
+        with self._lock:
+            if key in self._memory:
+                comparison, expires_at = self._memory[key]
+                if expires_at is None or time.time() < expires_at:
+                    self._memory.move_to_end(key)
+                    return comparison
+                del self._memory[key]
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._remember(key, cached)
+
+        row = self.history.latest_before(at, max_days=HISTORY_LOOKBACK_DAYS)
+        if row is not None and (at - row[KEY_COLUMN]).total_seconds() <= HISTORY_TOLERANCE_SECONDS:
+            comparison = Comparison(at, row[KEY_COLUMN], 'history', snapshots_from_row(row))
+            self.cache.put(key, comparison)
+            return self._remember(key, comparison)
+
+        if self._in_time_travel_window(at):
+            comparison = self._time_travel(key, at)
+            if comparison is None:
+                return Comparison(at, at, 'pending', None)
+            return self._remember(key, comparison)
+
+        if row is not None:
+            comparison = Comparison(at, row[KEY_COLUMN], 'history', snapshots_from_row(row))
+            return self._remember(key, comparison, ttl=FALLBACK_TTL_SECONDS)
+        travel_days = getattr(self.source, 'time_travel_days', 0)
+        raise LookupError(
+            f"No stored snapshot within {HISTORY_LOOKBACK_DAYS} days before {at:%Y-%m-%d %H:%M} UTC"
+            + (f", and it is outside the {travel_days}-day time travel window" if travel_days
+               else ", and this data source has no time travel")
+        )
+
+    def wait(self, at):
+        """Return the Comparison for `at`, blocking on a pending time travel (for batch use)."""
+        comparison = self.compare(at)
+        if comparison.method != 'pending':
+            return comparison
+        with self._lock:
+            future = self._pending.get(f"views@{comparison.requested_at.isoformat()}")
+        if future is not None:
+            future.exception()
+        return self.compare(at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument('--days-ago', type=float, default=7)
+    when.add_argument('--at', type=datetime.fromisoformat, help="ISO time with UTC offset")
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to query")
+    args = parser.parse_args()
+
+    from data_sources import create_data_source
+    from history_store import HistoryStore
+    from result_cache import ResultCache
+
+    point_in_time = PointInTime(
+        create_data_source(args.source),
+        HistoryStore(os.path.join(CACHE_DIR, "history")),
+        ResultCache(os.path.join(CACHE_DIR, "comparisons.sqlite"), COMPARISON_CACHE_MB * 2**20),
+    )
+    comparison = point_in_time.wait(args.at or datetime.now(timezone.utc) - timedelta(days=args.days_ago))
+    print(json.dumps({
+        'requested_at': comparison.requested_at.isoformat(),
+        'as_of': comparison.as_of.isoformat(),
+        'method': comparison.method,
+        'views': {view: snapshot.to_dict() for view, snapshot in comparison.snapshots.items()},
+    }, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+UI components for the Data Quality Command Center.
+
+HTML fragments and Plotly figures rendered by app.py. These live in an
+imported module rather than in app.py because Streamlit re-executes the main
+script on every rerun: memoized functions defined here survive reruns, so
+unchanged snapshot values reuse the previously generated HTML and figures.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Color palette
+COLORS = {
+    'primary': '#667eea',
+    'secondary': '#764ba2',
+    'success': '#64ffda',
+    'warning': '#ffd666',
+    'danger': '#ff6b6b',
+    'info': '#74b9ff',
+}
+
+
+def apply_dark_theme(fig, height=350, **kwargs):
+    """Apply dark theme to a plotly figure."""
+    layout_args = {
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)',
+        'font': {'color': '#ccd6f6', 'family': 'Inter, sans-serif'},
+        'height': height,
+        'margin': kwargs.get('margin', dict(l=0, r=0, t=20, b=0)),
+        'xaxis': {
+            'gridcolor': 'rgba(255,255,255,0.1)',
+            'linecolor': 'rgba(255,255,255,0.1)',
+            'tickfont': {'color': '#8892b0'},
+            **kwargs.get('xaxis', {})
+        },
+        'yaxis': {
+            'gridcolor': 'rgba(255,255,255,0.1)',
+            'linecolor': 'rgba(255,255,255,0.1)',
+            'tickfont': {'color': '#8892b0'},
+            **kwargs.get('yaxis', {})
+        }
+    }
+    for k, v in kwargs.items():
+        if k not in ['xaxis', 'yaxis', 'margin']:
+            layout_args[k] = v
+    fig.update_layout(**layout_args)
+    return fig
+
+
+# =============================================================================
+# Charts
+# =============================================================================
+# plotly.graph_objects is imported where a chart is built, not at module load.
+# Builders are memoized on their (hashable) inputs, so an unchanged snapshot
+# reuses the same figure instead of rebuilding and re-validating it.
+
+@lru_cache(maxsize=32)
+def build_match_chart(matched, unmatched):
+    """Build the matched/unmatched donut chart."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Pie(
+        labels=['Matched', 'Unmatched'],
+        values=[matched, unmatched],
+        hole=0.6,
+        marker_colors=[COLORS['success'], COLORS['danger']],
+        textinfo='percent',
+        textfont=dict(color='white')
+    )])
+
+    return apply_dark_theme(fig, height=200,
+        margin=dict(l=20, r=20, t=20, b=20),
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5, font=dict(color='#8892b0'))
+    )
+
+
+@lru_cache(maxsize=32)
+def build_completeness_chart(field_names, completeness, errors=None):
+    """Build the horizontal field-completeness bar chart (tuples of names and %,
+    plus optional ± error bounds for sampled fields)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(
+        x=completeness,
+        y=field_names,
+        error_x=dict(type='data', array=errors, visible=True) if errors else None,
+        orientation='h',
+        marker=dict(
+            color=completeness,
+            colorscale=[[0, COLORS['danger']], [0.5, COLORS['warning']], [1, COLORS['success']]],
+            cmin=0,
+            cmax=100
+        ),
+        hovertemplate='%{y}: %{x:.1f}%<extra></extra>'
+    ))
+
+    return apply_dark_theme(fig, height=max(200, 40 * len(field_names)),
+        margin=dict(l=0, r=20, t=10, b=10),
+        xaxis={'range': [0, 100]}
+    )
+
+
+# =============================================================================
+# UI Components
+# =============================================================================
+
+@lru_cache(maxsize=256)
+def render_sparkline(values, width=120, height=28):
+    """Render a tuple of trend values as an inline SVG sparkline."""
+    if len(values) < 2:
+        return ""
+    low, high = min(values), max(values)
+    step = width / (len(values) - 1)
+    # A flat series is drawn through the middle rather than along the bottom edge
+    points = " ".join(
+        f"{i * step:.1f},{height - (value - low) / (high - low) * height if high > low else height / 2:.1f}"
+        for i, value in enumerate(values)
+    )
+    return (
+        f'<svg class="metric-sparkline" viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+        f'<polyline points="{points}" /></svg>'
+    )
+
+
+@lru_cache(maxsize=256)
+def render_change(delta, unit="", decimals=1, higher_is_better=True):
+    """Render the change vs. a comparison snapshot; green when it moved the good
+    way, red when the bad way, grey when higher_is_better is None."""
+    if round(delta, decimals) == 0:
+        return '<div class="metric-change change-flat">= unchanged</div>'
+    arrow = "▲" if delta > 0 else "▼"
+    tone = "change-flat" if higher_is_better is None else "change-good" if (delta > 0) == higher_is_better else "change-bad"
+    return f'<div class="metric-change {tone}">{arrow} {abs(delta):,.{decimals}f}{unit}</div>'
+
+
+@lru_cache(maxsize=256)
+def render_metric_card(value, label, sublabel=None, status="neutral", trend=(), anomaly=None, change=None):
+    """Render a styled metric card, with a sparkline when a trend tuple is given,
+    an anomaly badge when `anomaly` (a short description) is given and a
+    render_change() line when `change` is given."""
+    value_class = {
+        "healthy": "metric-value-green",
+        "warning": "metric-value-yellow",
+        "critical": "metric-value-red",
+        "neutral": "metric-value"
+    }.get(status, "metric-value")
+
+    sublabel_html = f'<div class="metric-sublabel">{sublabel}</div>' if sublabel else ""
+    anomaly_html = f'<div class="metric-anomaly">{anomaly}</div>' if anomaly else ""
+
+    return f"""
+    <div class="metric-card{' metric-card-anomaly' if anomaly else ''}">
+        <div class="{value_class}">{value}</div>
+        <div class="metric-label">{label}</div>
+        {sublabel_html}{change or ""}{anomaly_html}{render_sparkline(trend)}
+    </div>
+    """
+
+
+def render_unavailable_card(label):
+    """Render a placeholder card for a metric whose view failed to load."""
+    return render_metric_card("—", label, "Data unavailable")
+
+
+def format_data_age(fetched_at):
+    """Format a snapshot fetch timestamp as 'HH:MM UTC (N min ago)'."""
+    as_of = datetime.fromtimestamp(fetched_at, timezone.utc)
+    age_minutes = int((datetime.now(timezone.utc) - as_of).total_seconds() // 60)
+    age = "just now" if age_minutes < 1 else f"{age_minutes} min ago"
+    return f"{as_of:%H:%M} UTC ({age})"
+
+
+@lru_cache(maxsize=256)
+def render_alignment_row(label, vip_count, sf_count, matched_count, match_rate, previous=None):
+    """Render an alignment comparison row; `previous` is the (vip, sf, matched, rate)
+    tuple of a comparison snapshot, shown as changes under each value."""
+    delta = sf_count - vip_count
+    delta_class = "delta-positive" if delta >= 0 else "delta-negative"
+    delta_sign = "+" if delta >= 0 else ""
+
+    rate_class = "status-healthy" if match_rate >= 90 else "status-warning" if match_rate >= 70 else "status-critical"
+
+    changes = ("",) * 4
+    if previous is not None and None not in previous:
+        changes = (
+            render_change(vip_count - previous[0], decimals=0, higher_is_better=None),
+            render_change(sf_count - previous[1], decimals=0, higher_is_better=None),
+            render_change(matched_count - previous[2], decimals=0),
+            render_change(match_rate - previous[3], " pts"),
+        )
+
+    return f"""
+    <div class="alignment-row">
+        <div class="alignment-label">{label}</div>
+        <div class="alignment-values">
+            <div class="alignment-value">
+                <div class="alignment-number">{vip_count:,}</div>
+                <div class="alignment-source">VIP</div>{changes[0]}
+            </div>
+            <div class="alignment-value">
+                <div class="alignment-number">{sf_count:,}</div>
+                <div class="alignment-source">Salesforce</div>{changes[1]}
+            </div>
+            <div class="alignment-value">
+                <div class="alignment-number">{matched_count:,}</div>
+                <div class="alignment-source">Matched</div>{changes[2]}
+            </div>
+            <div class="alignment-value">
+                <div class="{delta_class}">{delta_sign}{delta:,}</div>
+                <div class="alignment-source">Delta</div>
+            </div>
+            <div>
+                <span class="{rate_class}">{match_rate:.0f}%</span>{changes[3]}
+            </div>
+        </div>
+    </div>
+    """
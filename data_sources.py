@@ -0,0 +1,490 @@
+"""
+Data sources for the Data Quality Command Center.
+
+Every source serves the three single-row staging_data_quality views, plus
+reads of the raw tables behind them (paged drilldowns into the VIP retail
+universe, full Salesforce account extracts for batch jobs):
+- BigQuerySource: the live views in BigQuery
+- LocalSource: DuckDB over the SQL fixtures in fixtures/, for offline runs,
+  profiling and load tests (optionally with injected latency)
+
+View rows come back as plain dicts and are turned into the typed snapshots
+from snapshots.py; raw-table reads come back as Arrow tables. pandas is not
+involved.
+"""
+
+import glob
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import timezone
+
+from instrumentation import record_query
+from snapshots import SNAPSHOT_TYPES
+
+PROJECT_ID = 'artful-logic-475116-p1'
+DATASET = f'{PROJECT_ID}.staging_data_quality'
+
+VIEWS = ('vip_match_quality', 'salesforce_quality', 'vip_sf_alignment')
+
+# Source tables each view reads (see README "Data Sources"); their modification
+# times tell us whether re-running a view can return anything new
+VIEW_SOURCES = {
+    'vip_match_quality': (
+        'staging_vip.retail_universe_fact_sheet',
+        'staging_vip.distributor_fact_sheet_v2',
+        'staging_vip.chain_fact_sheet_v2',
+    ),
+    'salesforce_quality': (
+        'raw_salesforce.Account',
+        'raw_salesforce.Contact',
+        'raw_salesforce.Lead',
+    ),
+    'vip_sf_alignment': (
+        'staging_vip.retail_universe_fact_sheet',
+        'staging_vip.distributor_fact_sheet_v2',
+        'staging_vip.chain_fact_sheet_v2',
+        'raw_salesforce.Account',
+    ),
+}
+
+# staging_vip.retail_universe_fact_sheet columns shown in the unmatched-account
+# drilldown. Only sf_account_id is documented (README); the rest follow the VIP
+# fact sheet naming and are the one place to adjust if the table differs.
+RETAIL_UNIVERSE = 'staging_vip.retail_universe_fact_sheet'
+RETAIL_KEY = 'vip_code'
+RETAIL_SF_ID = 'sf_account_id'
+RETAIL_DISTRIBUTOR = 'distributor_name'
+RETAIL_CHAIN = 'chain_name'
+UNMATCHED_COLUMNS = (
+    RETAIL_KEY, 'account_name', 'street_address', 'city', 'state', 'zip_code',
+    RETAIL_DISTRIBUTOR, RETAIL_CHAIN,
+)
+UNMATCHED_PAGE_SIZE = 100
+
+# raw_salesforce.Account columns read by the duplicate and match engines
+# (standard Account fields plus the VIP_ID__c link; rows with IsDeleted are skipped)
+SF_ACCOUNT = 'raw_salesforce.Account'
+SF_ACCOUNT_COLUMNS = (
+    'Id', 'Name', 'Type', 'VIP_ID__c',
+    'BillingStreet', 'BillingCity', 'BillingState', 'BillingPostalCode',
+)
+
+# VIP records the match engine suggests Salesforce accounts for, per kind:
+# the fact sheet, its key/name/address columns (None where it has no address),
+# the column linking it to Salesforce, and the Salesforce Account.Type it
+# matches (None: any account not already linked to VIP). Only
+# sfdc_hq_account_id is documented (README); the rest are assumed.
+MatchTarget = namedtuple('MatchTarget', ['table', 'key', 'name', 'address', 'link', 'sf_type'])
+MATCH_TARGETS = {
+    'retail': MatchTarget(
+        RETAIL_UNIVERSE, RETAIL_KEY, 'account_name',
+        ('street_address', 'city', 'state', 'zip_code'), RETAIL_SF_ID, None,
+    ),
+    'distributor': MatchTarget(
+        'staging_vip.distributor_fact_sheet_v2', 'distributor_code', 'distributor_name',
+        ('street_address', 'city', 'state', 'zip_code'), 'sf_account_id', 'Distributor',
+    ),
+    'chain': MatchTarget(
+        'staging_vip.chain_fact_sheet_v2', 'chain_code', 'chain_name', None, 'sfdc_hq_account_id', 'Chain HQ',
+    ),
+}
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class DataSource:
+    """Base class for view backends; subclasses implement table_ref(), source_ref(),
+    param(), timestamp_micros(), micros_timestamp(), top_values(), table_columns(),
+    run_query(), run_arrow_query() and source_version()."""
+
+    # How far back source_ref_as_of() can read (0: no time travel)
+    time_travel_days = 0
+
+    def table_ref(self, view):
+        """Return the SQL reference for a view."""
+        raise NotImplementedError
+
+    def source_ref(self, table):
+        """Return the SQL reference for a source table such as 'staging_vip.retail_universe_fact_sheet'."""
+        raise NotImplementedError
+
+    def source_ref_as_of(self, table, at):
+        """Return the SQL reference for a source table as it was at datetime `at`."""
+        raise NotImplementedError(f"{type(self).__name__} has no time travel")
+
+    def param(self, name):
+        """Return the placeholder for a named query parameter."""
+        raise NotImplementedError
+
+    def timestamp_micros(self, expr):
+        """Return SQL converting a timestamp expression to INT64 microseconds since the epoch."""
+        raise NotImplementedError
+
+    def micros_timestamp(self, expr):
+        """Return SQL converting INT64 microseconds since the epoch to a timestamp."""
+        raise NotImplementedError
+
+    def top_values(self, expr, k):
+        """Return an aggregate of the most frequent values of a string expression,
+        as a list of structs with `value` and `count` fields, most frequent first.
+
+        The list may hold a NULL value; profiler.py drops it and keeps the first `k`.
+        """
+        raise NotImplementedError
+
+    def sample_clause(self, percent):
+        """Return the clause that samples about `percent`% of a table's storage blocks."""
+        return f"TABLESAMPLE SYSTEM ({percent:g} PERCENT)"
+
+    def table_columns(self, table):
+        """Return the column names of a source table (a metadata lookup, not a scan)."""
+        raise NotImplementedError
+
+    def run_query(self, query):
+        """Run a query and return the result rows as dicts."""
+        raise NotImplementedError
+
+    def run_arrow_query(self, query, params, bulk=False):
+        """Run a parameterized query and return the result as an Arrow table.
+
+        `bulk` marks results of many rows (full-table reads for batch jobs).
+        """
+        raise NotImplementedError
+
+    def source_version(self, views):
+        """Return a cheap token that changes whenever the views' source tables change."""
+        raise NotImplementedError
+
+    def _single_row(self, query, description):
+        rows = self.run_query(query)
+        if not rows:
+            raise ValueError(f"{description} returned no rows")
+        return rows[0]
+
+    def fetch_view(self, view):
+        """Fetch the single row of a view as its typed snapshot."""
+        snapshot_type = SNAPSHOT_TYPES[view]
+        query = f"""
+        SELECT {', '.join(snapshot_type.columns())}
+        FROM {self.table_ref(view)}
+        """
+        return snapshot_type.from_row(self._single_row(query, view))
+
+    def fetch_snapshot(self):
+        """Fetch all views in a single query; return a dict of snapshots keyed by view."""
+        # Each view is a single row; cross join them into one wide row, prefixing
+        # columns with the view name since some names (e.g. calculated_at) repeat
+        aliases = {'vip_match_quality': 'v', 'salesforce_quality': 's', 'vip_sf_alignment': 'a'}
+        select_list = ",\n            ".join(
+            f"{alias}.{column} AS {view}__{column}"
+            for view, alias in aliases.items()
+            for column in SNAPSHOT_TYPES[view].columns()
+        )
+        query = f"""
+        SELECT
+            {select_list}
+        FROM {self.table_ref('vip_match_quality')} v
+        CROSS JOIN {self.table_ref('salesforce_quality')} s
+        CROSS JOIN {self.table_ref('vip_sf_alignment')} a
+        """
+        row = self._single_row(query, "snapshot query")
+        return {
+            view: SNAPSHOT_TYPES[view].from_row({
+                column: row[f"{view}__{column}"]
+                for column in SNAPSHOT_TYPES[view].columns()
+                if f"{view}__{column}" in row
+            })
+            for view in VIEWS
+        }
+
+    def _unmatched_filters(self, distributor, chain):
+        """Return the WHERE conditions and parameters shared by the drilldown queries."""
+        conditions, params = [f"{RETAIL_SF_ID} IS NULL"], {}
+        if distributor is not None:
+            conditions.append(f"{RETAIL_DISTRIBUTOR} = {self.param('distributor')}")
+            params['distributor'] = distributor
+        if chain is not None:
+            conditions.append(f"{RETAIL_CHAIN} = {self.param('chain')}")
+            params['chain'] = chain
+        return conditions, params
+
+    def fetch_unmatched_page(self, after=None, distributor=None, chain=None, limit=UNMATCHED_PAGE_SIZE):
+        """Fetch one page of VIP retail accounts without a Salesforce match as an Arrow table.
+
+        Keyset pagination: rows are ordered by RETAIL_KEY and a page starts
+        after the last key of the previous page, so page 500 costs the same as
+        page 1 (no OFFSET) and only `limit` rows are ever held in memory.
+        """
+        conditions, params = self._unmatched_filters(distributor, chain)
+        if after is not None:
+            conditions.append(f"{RETAIL_KEY} > {self.param('after')}")
+            params['after'] = after
+        params['limit'] = limit
+        query = f"""
+        SELECT {', '.join(UNMATCHED_COLUMNS)}
+        FROM {self.source_ref(RETAIL_UNIVERSE)}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {RETAIL_KEY}
+        LIMIT {self.param('limit')}
+        """
+        return self.run_arrow_query(query, params)
+
+    def fetch_unmatched_facets(self):
+        """Return {'distributors': ((name, count), ...), 'chains': (...)} over unmatched accounts, largest first."""
+        conditions, params = self._unmatched_filters(None, None)
+        facets = {}
+        for key, column in (('distributors', RETAIL_DISTRIBUTOR), ('chains', RETAIL_CHAIN)):
+            query = f"""
+            SELECT {column} AS name, COUNT(*) AS accounts
+            FROM {self.source_ref(RETAIL_UNIVERSE)}
+            WHERE {' AND '.join(conditions)} AND {column} IS NOT NULL
+            GROUP BY {column}
+            ORDER BY accounts DESC, name
+            """
+            table = self.run_arrow_query(query, params)
+            facets[key] = tuple(zip(table['name'].to_pylist(), table['accounts'].to_pylist()))
+        return facets
+
+    def fetch_alignment_breakdown(self):
+        """Aggregate retail match counts per distributor and per chain as one Arrow table.
+
+        Columns: kind ('distributor' or 'chain'), name, code and sf_account_id
+        (from the distributor/chain fact sheet, null if the name is not in it),
+        stores, matched, unmatched, match_rate_pct. Worst match rate first.
+        A name the fact sheet lists more than once still gets one row, with
+        the code and account of any of its entries.
+        """
+        selects = []
+        for kind, column in (('distributor', RETAIL_DISTRIBUTOR), ('chain', RETAIL_CHAIN)):
+            target = MATCH_TARGETS[kind]
+            selects.append(f"""
+            SELECT
+                '{kind}' AS kind,
+                g.name,
+                CAST(f.code AS STRING) AS code,
+                CAST(f.sf_account_id AS STRING) AS sf_account_id,
+                g.stores,
+                g.matched,
+                g.stores - g.matched AS unmatched,
+                ROUND(100.0 * g.matched / g.stores, 1) AS match_rate_pct
+            FROM (
+                SELECT
+                    {column} AS name,
+                    COUNT(*) AS stores,
+                    COUNT({RETAIL_SF_ID}) AS matched
+                FROM {self.source_ref(RETAIL_UNIVERSE)}
+                WHERE {column} IS NOT NULL
+                GROUP BY {column}
+            ) g
+            LEFT JOIN (
+                SELECT
+                    {target.name} AS name,
+                    ANY_VALUE({target.key}) AS code,
+                    ANY_VALUE({target.link}) AS sf_account_id
+                FROM {self.source_ref(target.table)}
+                GROUP BY {target.name}
+            ) f ON f.name = g.name""")
+        query = "\n            UNION ALL".join(selects) + """
+        ORDER BY kind, match_rate_pct, stores DESC, name
+        """
+        return self.run_arrow_query(query, {})
+
+    def fetch_sf_accounts(self):
+        """Fetch every live Salesforce account (SF_ACCOUNT_COLUMNS) as an Arrow table."""
+        query = f"""
+        SELECT {', '.join(SF_ACCOUNT_COLUMNS)}
+        FROM {self.source_ref(SF_ACCOUNT)}
+        WHERE NOT IsDeleted
+        """
+        return self.run_arrow_query(query, {}, bulk=True)
+
+    def fetch_unmatched_records(self, kind):
+        """Fetch every unlinked VIP record of a MATCH_TARGETS kind as an Arrow table.
+
+        Columns are normalized to key, name, street, city, state, zip (address
+        columns are null for kinds without an address).
+        """
+        target = MATCH_TARGETS[kind]
+        address = target.address or ('NULL', 'NULL', 'NULL', 'NULL')
+        query = f"""
+        SELECT
+            {target.key} AS key,
+            {target.name} AS name,
+            CAST({address[0]} AS STRING) AS street,
+            CAST({address[1]} AS STRING) AS city,
+            CAST({address[2]} AS STRING) AS state,
+            CAST({address[3]} AS STRING) AS zip
+        FROM {self.source_ref(target.table)}
+        WHERE {target.link} IS NULL
+        """
+        return self.run_arrow_query(query, {}, bulk=True)
+
+
+class BigQuerySource(DataSource):
+    """Reads the live views from BigQuery."""
+
+    # BigQuery's default (and maximum) time travel window
+    time_travel_days = 7
+
+    def __init__(self, client):
+        self.client = client
+
+    def table_ref(self, view):
+        return f"`{DATASET}.{view}`"
+
+    def source_ref(self, table):
+        return f"`{PROJECT_ID}.{table}`"
+
+    def source_ref_as_of(self, table, at):
+        # Time travel applies to tables only, not to the views built on them
+        return f"{self.source_ref(table)} FOR SYSTEM_TIME AS OF TIMESTAMP '{at.astimezone(timezone.utc).isoformat()}'"
+
+    def param(self, name):
+        return f"@{name}"
+
+    def timestamp_micros(self, expr):
+        return f"UNIX_MICROS({expr})"
+
+    def micros_timestamp(self, expr):
+        return f"TIMESTAMP_MICROS({expr})"
+
+    def top_values(self, expr, k):
+        # APPROX_TOP_COUNT counts NULL as a value; one extra leaves k after dropping it.
+        # (An aggregate cannot go inside an ARRAY(SELECT ... FROM UNNEST(...)) subquery.)
+        return f"APPROX_TOP_COUNT({expr}, {k + 1})"
+
+    def table_columns(self, table):
+        return [field.name for field in self.client.get_table(f'{PROJECT_ID}.{table}').schema]
+
+    def run_query(self, query):
+        start = time.perf_counter()
+        job = self.client.query(query)
+        rows = [dict(row.items()) for row in job.result()]
+        record_query(time.perf_counter() - start, job)
+        return rows
+
+    def run_arrow_query(self, query, params, bulk=False):
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter(name, 'INT64' if isinstance(value, int) else 'STRING', value)
+            for name, value in params.items()
+        ])
+        # Small results download faster over REST than through a Storage API read
+        # session; bulk reads use the Storage API (if installed) to stream in parallel
+        start = time.perf_counter()
+        job = self.client.query(query, job_config=job_config)
+        table = job.to_arrow(create_bqstorage_client=bulk)
+        record_query(time.perf_counter() - start, job)
+        return table
+
+    def source_version(self, views):
+        # Table metadata lookups are API calls, not query jobs: no scan, no billing
+        tables = sorted({table for view in views for table in VIEW_SOURCES[view]})
+        return "|".join(
+            f"{table}@{self.client.get_table(f'{PROJECT_ID}.{table}').modified.isoformat()}"
+            for table in tables
+        )
+
+
+class LocalSource(DataSource):
+    """Serves the views from the DuckDB fixtures, sleeping `latency` seconds per query."""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.0):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("LocalSource requires duckdb: pip install -r requirements-dev.txt") from e
+
+        self.latency = latency
+        self.query_count = 0
+        self.data_version = 0
+        self._lock = threading.Lock()
+        self._conn = duckdb.connect()
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.sql'))):
+            with open(path) as f:
+                self._conn.execute(f.read())
+
+    def table_ref(self, view):
+        return view
+
+    def source_ref(self, table):
+        return table
+
+    def param(self, name):
+        return f"${name}"
+
+    def timestamp_micros(self, expr):
+        return f"epoch_us({expr})"
+
+    def micros_timestamp(self, expr):
+        return f"(TIMESTAMPTZ 'epoch' + to_microseconds({expr}))"
+
+    def top_values(self, expr, k):
+        # Exact counts: the fixtures are small enough for a full histogram
+        return (f"list_slice(list_reverse_sort(list_transform(map_entries(histogram({expr})), "
+                f"e -> {{'count': e.value, 'value': e.key}})), 1, {k})")
+
+    def sample_clause(self, percent):
+        # DuckDB's SYSTEM sampling picks whole 2048-row vectors, too coarse for the fixtures
+        return f"TABLESAMPLE {percent:g}% (bernoulli)"
+
+    def table_columns(self, table):
+        schema, name = table.split('.')
+        rows = self._execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = $schema AND table_name = $name ORDER BY ordinal_position",
+            {'schema': schema, 'name': name}
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _execute(self, query, params=None):
+        with self._lock:
+            self.query_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        # DuckDB connections are not thread-safe; each query gets its own cursor
+        return self._conn.cursor().execute(query, params)
+
+    def run_query(self, query):
+        start = time.perf_counter()
+        cursor = self._execute(query)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        record_query(time.perf_counter() - start)
+        return rows
+
+    def run_arrow_query(self, query, params, bulk=False):
+        start = time.perf_counter()
+        table = self._execute(query, params).fetch_record_batch().read_all()
+        record_query(time.perf_counter() - start)
+        return table
+
+    def source_version(self, views):
+        return str(self.data_version)
+
+    def mark_modified(self):
+        """Simulate a load into the source tables (changes source_version())."""
+        self.data_version += 1
+
+
+def default_bq_client(service_account_info=None):
+    """Return a BigQuery client for a service account (a key-file dict), else with
+    Application Default Credentials."""
+    from google.cloud import bigquery
+    if service_account_info:
+        from google.oauth2 import service_account
+        credentials = service_account.Credentials.from_service_account_info(service_account_info)
+        return bigquery.Client(project=PROJECT_ID, credentials=credentials)
+    return bigquery.Client(project=PROJECT_ID)
+
+
+def create_data_source(kind, bq_client_factory=None, latency=0.0):
+    """Build a data source by name ('bigquery' or 'local')."""
+    if kind == 'local':
+        return LocalSource(latency=latency)
+    if kind == 'bigquery':
+        return BigQuerySource((bq_client_factory or default_bq_client)())
+    raise ValueError(f"Unknown data source: {kind!r} (expected 'bigquery' or 'local')")
@@ -0,0 +1,336 @@
+"""
+Duplicate-cluster engine for Salesforce accounts.
+
+Finds groups of raw_salesforce.Account rows that are the same business entered
+more than once, e.g. "Smith's Corner Liquors #12" and "SMITHS CORNER LIQUORS
+NO. 12 LLC" at the same address, without comparing every pair:
+
+1. Names and addresses are normalized (normalize.py) and each name's character
+   trigrams are MinHashed, in a process pool.
+2. Candidate pairs come from two blocking keys: LSH bands of the MinHash
+   signatures, and the exact (ZIP, street) address. Inside a block, records
+   are sorted by key and only paired with their next WINDOW - 1 neighbours,
+   so a huge block costs O(n) rather than O(n²).
+   Store numbers are part of the LSH key, since "#12" and "#13" are never the
+   same store.
+3. Candidates whose estimated similarity is close enough get their exact
+   trigram Jaccard computed; a pair is accepted on that, identical store
+   numbers and a compatible location. Accepted pairs are merged into clusters
+   with a vectorized union-find.
+
+Clusters are ranked by size and similarity and written to
+<DQ_CACHE_DIR>/duplicates.parquet, which the dashboard reads.
+
+Usage:
+    python duplicates.py [--source bigquery|local] [--output PATH] [--workers N]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from loaders import CACHE_DIR, DATA_SOURCE
+from normalize import (
+    TRIGRAM_SPACE,
+    jaccard,
+    normalize_address,
+    normalize_name,
+    normalize_postal_code,
+    number_tokens,
+    stable_hash,
+    trigram_ids,
+)
+
+DEFAULT_OUTPUT = os.path.join(CACHE_DIR, "duplicates.parquet")
+
+# MinHash / LSH: 16 bands of 4 rows put the 50% candidate threshold at a name
+# similarity of about (1/16) ** (1/4) = 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SEED = 20240601
+PRIME = 4294967291  # largest prime below 2**32
+
+WINDOW = 8                    # sorted-neighbourhood window inside a block
+NAME_THRESHOLD = 0.8          # trigram Jaccard of names for a duplicate
+SAME_ADDRESS_THRESHOLD = 0.5  # ... when both accounts share a street address
+MINHASH_SLACK = 0.15          # estimate margin before computing the exact Jaccard
+CHUNK_SIZE = 25000            # accounts per worker task
+PAIR_BATCH = 500000           # candidate pairs scored per NumPy batch
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    """Return the MinHash value of every possible trigram id under each permutation."""
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+    ids = np.arange(TRIGRAM_SPACE, dtype=np.uint64)
+    return ((a[:, None] * ids + b[:, None]) % PRIME).astype(np.uint32)
+
+
+def minhash(ids, offsets):
+    """Return (signatures, valid) for the trigram sets from normalize.trigram_ids().
+
+    signatures is a (texts, NUM_PERM) uint32 array; rows of texts without any
+    trigram are zero and marked False in `valid`.
+    """
+    valid = np.diff(offsets) > 0
+    signatures = np.zeros((len(offsets) - 1, NUM_PERM), dtype=np.uint32)
+    if valid.any():
+        # Segments of empty texts have zero length, so reducing from the valid
+        # starts only still lines every segment up with its own text
+        signatures[valid] = np.minimum.reduceat(_permutations()[:, ids], offsets[:-1][valid], axis=1).T
+    return signatures, valid
+
+
+def prepare(chunk):
+    """Normalize and MinHash one chunk of accounts (a dict of column lists); runs in workers."""
+    names = [normalize_name(name) for name in chunk['Name']]
+    ids, offsets = trigram_ids(names)
+    signatures, valid = minhash(ids, offsets)
+    streets = [normalize_address(street) for street in chunk['BillingStreet']]
+    zips = [normalize_postal_code(code) for code in chunk['BillingPostalCode']]
+    return {
+        'trigrams': ids,
+        'trigram_counts': np.diff(offsets),
+        'signatures': signatures,
+        'valid': valid,
+        'number_key': np.array([stable_hash(' '.join(number_tokens(name))) for name in names], dtype=np.uint64),
+        'address_key': np.array([
+            stable_hash(f"{code}|{street}") if code and street else 0 for code, street in zip(zips, streets)
+        ], dtype=np.uint64),
+        # Where the account is: its ZIP, else its city and state
+        'location_key': np.array([
+            stable_hash(code) if code
+            else stable_hash(f"{city.strip().lower()}|{state.strip().lower()}") if city and state
+            else 0
+            for code, city, state in zip(zips, chunk['BillingCity'], chunk['BillingState'])
+        ], dtype=np.uint64),
+    }
+
+
+def _prepare_all(accounts, workers):
+    """Run prepare() over the accounts in chunks, across processes when workers > 1."""
+    columns = ['Name', 'BillingStreet', 'BillingCity', 'BillingState', 'BillingPostalCode']
+    chunks = [
+        accounts.slice(start, CHUNK_SIZE).select(columns).to_pydict()
+        for start in range(0, accounts.num_rows, CHUNK_SIZE)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(prepare, chunks))
+    else:
+        parts = [prepare(chunk) for chunk in chunks]
+    if not parts:
+        parts = [prepare({column: [] for column in columns})]
+    features = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    features['trigram_offsets'] = np.concatenate([[0], np.cumsum(features.pop('trigram_counts'))])
+    return features
+
+
+def _neighbour_pairs(keys, mask):
+    """Return (i, j) index pairs with equal keys within WINDOW of each other in key order."""
+    candidates = np.flatnonzero(mask)
+    order = candidates[np.argsort(keys[candidates], kind='stable')]
+    sorted_keys = keys[order]
+    left, right = [], []
+    for distance in range(1, WINDOW):
+        same = sorted_keys[distance:] == sorted_keys[:-distance]
+        left.append(order[:-distance][same])
+        right.append(order[distance:][same])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def candidate_pairs(features):
+    """Return the unique candidate pairs (i < j) from LSH bands and address blocks."""
+    signatures, valid = features['signatures'], features['valid']
+    multipliers = np.random.default_rng(SEED + 1).integers(1, 2**63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+    left, right = [], []
+    for band in range(BANDS):
+        rows = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].astype(np.uint64)
+        # Wrapping multiply-add hashes a band's rows (and the store numbers) into one bucket key
+        keys = (rows * multipliers).sum(axis=1, dtype=np.uint64) ^ features['number_key']
+        i, j = _neighbour_pairs(keys, valid)
+        left.append(i)
+        right.append(j)
+    address_key = features['address_key']
+    i, j = _neighbour_pairs(address_key, address_key != 0)
+    left.append(i)
+    right.append(j)
+
+    left, right = np.concatenate(left), np.concatenate(right)
+    low, high = np.minimum(left, right), np.maximum(left, right)
+    pairs = np.unique(low.astype(np.int64) * len(valid) + high)
+    return pairs // len(valid), pairs % len(valid)
+
+
+def score_pairs(features, left, right):
+    """Return (accepted mask, name similarity) for candidate pairs.
+
+    Similarity is the exact trigram Jaccard for pairs that could pass, and 0
+    for pairs ruled out by their MinHash estimate, store numbers or location.
+    """
+    signatures, valid = features['signatures'], features['valid']
+    same_numbers = features['number_key'][left] == features['number_key'][right]
+    location_left, location_right = features['location_key'][left], features['location_key'][right]
+    same_location = (location_left == location_right) | (location_left == 0) | (location_right == 0)
+    address_left = features['address_key'][left]
+    same_address = (address_left == features['address_key'][right]) & (address_left != 0)
+
+    # Accounts without a usable name never look alike
+    plausible = same_numbers & (same_location | same_address) & valid[left] & valid[right]
+    for start in range(0, len(left), PAIR_BATCH):
+        batch = slice(start, start + PAIR_BATCH)
+        estimate = (signatures[left[batch]] == signatures[right[batch]]).mean(axis=1)
+        plausible[batch] &= estimate >= SAME_ADDRESS_THRESHOLD - MINHASH_SLACK
+
+    similarity = np.zeros(len(left), dtype=np.float64)
+    checked = np.flatnonzero(plausible)
+    for start in range(0, len(checked), PAIR_BATCH):
+        batch = checked[start:start + PAIR_BATCH]
+        names = (features['trigrams'], features['trigram_offsets'])
+        similarity[batch] = jaccard(names, left[batch], names, right[batch])
+
+    accepted = ((similarity >= NAME_THRESHOLD) & same_location) | (same_address & (similarity >= SAME_ADDRESS_THRESHOLD))
+    return accepted, similarity
+
+
+def connected_components(n, left, right):
+    """Return the root label of every record after merging the pairs (vectorized union-find)."""
+    parent = np.arange(n)
+    while True:
+        root_left, root_right = parent[left], parent[right]
+        if np.array_equal(root_left, root_right):
+            return parent
+        # Union: hook each root onto the smaller root of its pairs...
+        low = np.minimum(root_left, root_right)
+        np.minimum.at(parent, root_left, low)
+        np.minimum.at(parent, root_right, low)
+        # ...then find with full path compression (pointer jumping)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def find_clusters(accounts, workers=None):
+    """Cluster duplicate accounts; return (ranked clusters Arrow table, timing stats).
+
+    `accounts` is an Arrow table with data_sources.SF_ACCOUNT_COLUMNS.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {'accounts': accounts.num_rows, 'workers': workers}
+
+    start = time.perf_counter()
+    features = _prepare_all(accounts, workers)
+    stats['prepare_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    left, right = candidate_pairs(features)
+    stats['candidate_pairs'] = len(left)
+    stats['blocking_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accepted, similarity = score_pairs(features, left, right)
+    left, right, similarity = left[accepted], right[accepted], similarity[accepted]
+    labels = connected_components(accounts.num_rows, left, right)
+    clusters = _cluster_table(accounts, labels, left, similarity)
+    stats['accepted_pairs'] = len(left)
+    stats['clusters'] = clusters.num_rows
+    stats['duplicate_accounts'] = int(pc.sum(clusters['size']).as_py() or 0)
+    stats['clustering_s'] = time.perf_counter() - start
+    return clusters, stats
+
+
+def _cluster_table(accounts, labels, edge_left, edge_similarity):
+    """Build the ranked cluster table (largest, then most similar, first)."""
+    members = np.flatnonzero(labels != np.arange(len(labels)))
+    members = np.union1d(members, labels[members])
+    roots, inverse, sizes = np.unique(labels[members], return_inverse=True, return_counts=True)
+
+    # Mean similarity of the accepted pairs inside each cluster
+    edge_cluster = np.searchsorted(roots, labels[edge_left])
+    edge_counts = np.bincount(edge_cluster, minlength=len(roots))
+    similarity = np.bincount(edge_cluster, weights=edge_similarity, minlength=len(roots)) / np.maximum(edge_counts, 1)
+
+    ranking = np.lexsort((-similarity, -sizes))
+    rank_of = np.empty(len(roots), dtype=np.int64)
+    rank_of[ranking] = np.arange(len(roots))
+
+    # Group member rows by cluster rank
+    order = np.lexsort((members, rank_of[inverse]))
+    rows = members[order]
+    offsets = np.zeros(len(roots) + 1, dtype=np.int32)
+    np.cumsum(sizes[ranking], out=offsets[1:])
+
+    def grouped(column):
+        return pa.ListArray.from_arrays(pa.array(offsets), accounts[column].take(pa.array(rows)).combine_chunks())
+
+    names = grouped('Name')
+    return pa.table({
+        'cluster': pa.array(np.arange(1, len(roots) + 1)),
+        'size': pa.array(sizes[ranking]),
+        'similarity': pa.array(np.round(similarity[ranking], 3)),
+        'name': pc.list_element(names, 0) if len(roots) else pa.array([], pa.string()),
+        'names': names,
+        'account_ids': grouped('Id'),
+        'streets': grouped('BillingStreet'),
+        'cities': grouped('BillingCity'),
+    })
+
+
+def write_clusters(clusters, path=DEFAULT_OUTPUT):
+    """Write the cluster table atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(clusters, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def read_clusters(path=DEFAULT_OUTPUT):
+    """Return (clusters table, written at epoch seconds) from the last run, or None."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _read_clusters(path, mtime), mtime
+
+
+@lru_cache(maxsize=4)
+def _read_clusters(path, mtime):
+    return pq.read_table(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to read raw_salesforce.Account from")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from data_sources import create_data_source
+
+    start = time.perf_counter()
+    accounts = create_data_source(args.source).fetch_sf_accounts()
+    fetch_s = time.perf_counter() - start
+
+    clusters, stats = find_clusters(accounts, args.workers)
+    write_clusters(clusters, args.output)
+    print(f"Read {stats['accounts']:,} accounts in {fetch_s:.1f}s; "
+          f"{stats['clusters']:,} duplicate clusters ({stats['duplicate_accounts']:,} accounts) "
+          f"from {stats['candidate_pairs']:,} candidate pairs in "
+          f"{stats['prepare_s'] + stats['blocking_s'] + stats['clustering_s']:.1f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+-- Offline stand-in for staging_vip.retail_universe_fact_sheet (columns used by
+-- the unmatched-account drilldown, see data_sources.UNMATCHED_COLUMNS).
+-- Generated deterministically to match the vip_match_quality fixture:
+-- 412,870 accounts of which 74,317 have no sf_account_id, spread over
+-- 312 distributors and 1,846 chains (about a third of stores belong to a chain).
+
+CREATE SCHEMA staging_vip;
+
+CREATE TABLE staging_vip.retail_universe_fact_sheet AS
+SELECT
+    'R' || lpad(i::VARCHAR, 7, '0')                                     AS vip_code,
+    CASE WHEN (i * 104729) % 412870 < 74317 THEN NULL
+         ELSE '001' || lpad(((i * 104729) % 412870)::VARCHAR, 15, '0')
+    END                                                                 AS sf_account_id,
+    -- Mixed-radix digits of i, so every name is distinct
+    ['Smith', 'Garcia', 'Patel', 'Nguyen', 'Kim', 'O''Brien', 'Rossi', 'Cohen', 'Murphy', 'Lopez', 'Chen', 'Novak', 'Silva'][1 + (i // 8) % 13]
+        || '''s ' || ['Corner', 'Main Street', 'Village', 'Harbor', 'Summit', 'Oak', 'Liberty', 'Depot'][1 + i % 8]
+        || ' ' || ['Liquors', 'Market', 'Wine & Spirits', 'Grocery', 'Tavern', 'Bottle Shop'][1 + (i // 104) % 6]
+        || ' #' || (i // 624 + 1)::VARCHAR                              AS account_name,
+    (100 + i % 9800)::VARCHAR || ' '
+        || ['Main St', 'Oak Ave', 'Elm St', 'Route 9', 'Broadway', 'Park Ave', 'Mill Rd'][1 + i % 7]
+                                                                        AS street_address,
+    ['Springfield', 'Riverside', 'Fairview', 'Franklin', 'Greenville', 'Clinton', 'Madison'][1 + (i // 7) % 7]
+                                                                        AS city,
+    ['CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI'][1 + (i // 3) % 10]
+                                                                        AS state,
+    lpad(((i * 37) % 99950 + 10)::VARCHAR, 5, '0')                      AS zip_code,
+    'Distributor ' || lpad(((i * 31) % 312 + 1)::VARCHAR, 3, '0')      AS distributor_name,
+    CASE WHEN i % 3 = 0 THEN 'Chain ' || lpad(((i // 3) % 1846 + 1)::VARCHAR, 4, '0') END
+                                                                        AS chain_name,
+    -- Nightly VIP loads over the last 30 days
+    TIMESTAMPTZ '2025-06-01 06:00:00+00' + to_days(CAST(i % 30 AS INTEGER)) AS loaded_at
+FROM range(412870) r(i);
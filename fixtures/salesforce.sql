@@ -0,0 +1,93 @@
+-- Offline stand-in for raw_salesforce.Account (the columns the duplicate and
+-- match engines read, see data_sources.SF_ACCOUNT_COLUMNS). Derived from the
+-- retail universe fixture (loaded first), so the two line up:
+-- - matched VIP rows have an account with the same Id, name and VIP_ID__c
+-- - some unmatched VIP rows have an unlinked account with a variant name and
+--   address (what a fuzzy matcher should find)
+-- - ~1 in 120 matched accounts has an unlinked duplicate with a variant name
+-- - one account per linked distributor and chain HQ, plus unlinked accounts
+--   for a few of the unlinked ones
+-- Contact and Lead carry only the columns salesforce_quality reads.
+
+CREATE SCHEMA raw_salesforce;
+
+CREATE TABLE raw_salesforce.Account AS
+WITH retail AS (
+    SELECT *, (CAST(substr(vip_code, 2) AS BIGINT) * 104729) % 412870 AS p
+    FROM staging_vip.retail_universe_fact_sheet
+),
+variants AS (
+    SELECT
+        *,
+        CASE p % 5
+            WHEN 0 THEN upper(account_name)
+            WHEN 1 THEN account_name || ' LLC'
+            WHEN 2 THEN replace(account_name, ' #', ' No. ')
+            WHEN 3 THEN replace(account_name, ' & ', ' and ')
+            ELSE 'The ' || account_name
+        END AS variant_name,
+        regexp_replace(regexp_replace(regexp_replace(street_address,
+            ' St$', ' Street'), ' Ave$', ' Avenue'), ' Rd$', ' Road') AS variant_street
+    FROM retail
+)
+-- Linked retail accounts
+SELECT
+    '001' || lpad(p::VARCHAR, 15, '0') AS Id, account_name AS Name, 'Retailer' AS Type,
+    vip_code AS VIP_ID__c, street_address AS BillingStreet, city AS BillingCity,
+    state AS BillingState, zip_code AS BillingPostalCode, p
+FROM retail WHERE p >= 74317
+UNION ALL
+-- Unlinked accounts for unmatched VIP rows
+SELECT
+    '001' || lpad(p::VARCHAR, 15, '0'), variant_name, 'Retailer',
+    NULL, variant_street, city, state, zip_code, p
+FROM variants WHERE p >= 56656 AND p < 74317
+UNION ALL
+-- Duplicates of linked accounts
+SELECT
+    '001' || lpad((1000000 + p)::VARCHAR, 15, '0'), variant_name, 'Retailer',
+    NULL, CASE WHEN p % 240 = 0 THEN variant_street ELSE street_address END, city, state, zip_code, p
+FROM variants WHERE p >= 74317 AND p % 120 = 0
+UNION ALL
+SELECT
+    '001' || lpad((2000000 + d)::VARCHAR, 15, '0'), 'Distributor ' || lpad(d::VARCHAR, 3, '0') || ' Inc', 'Distributor',
+    NULL, (d * 7)::VARCHAR || ' Commerce Way', 'Springfield', 'IL', '62701', d
+FROM range(1, 301) r(d)
+UNION ALL
+SELECT
+    '001' || lpad((3000000 + c)::VARCHAR, 15, '0'), 'Chain ' || lpad(c::VARCHAR, 4, '0') || ' HQ', 'Chain HQ',
+    NULL, (c * 3)::VARCHAR || ' Corporate Dr', 'Madison', 'WI', '53703', c
+FROM range(1, 1201) r(c);
+
+-- Phone, last activity and modification stamps, spread deterministically
+ALTER TABLE raw_salesforce.Account ADD COLUMN Phone VARCHAR;
+ALTER TABLE raw_salesforce.Account ADD COLUMN LastActivityDate DATE;
+ALTER TABLE raw_salesforce.Account ADD COLUMN IsDeleted BOOLEAN DEFAULT false;
+ALTER TABLE raw_salesforce.Account ADD COLUMN SystemModstamp TIMESTAMPTZ;
+UPDATE raw_salesforce.Account SET
+    Phone = CASE WHEN p % 25 < 17 THEN '(555) ' || lpad((p % 1000)::VARCHAR, 3, '0') || '-' || lpad((p % 10000)::VARCHAR, 4, '0') END,
+    LastActivityDate = CASE WHEN p % 15 < 2 THEN current_date - CAST((p * 31) % 270 AS INTEGER) END,
+    SystemModstamp = TIMESTAMPTZ '2025-01-01 00:00:00+00' + to_seconds((p * 7919) % 25000000);
+ALTER TABLE raw_salesforce.Account DROP COLUMN p;
+
+CREATE TABLE raw_salesforce.Contact AS
+SELECT
+    '003' || lpad(c::VARCHAR, 15, '0')                                  AS Id,
+    CASE WHEN c % 69 <> 0 THEN '001' || lpad((74317 + (c * 7919) % 338553)::VARCHAR, 15, '0') END AS AccountId,
+    CASE WHEN c % 20 < 11 OR c % 97 = 0 THEN 'contact' || c::VARCHAR || '@example.com' END AS Email,
+    false                                                               AS IsDeleted,
+    TIMESTAMPTZ '2025-01-01 00:00:00+00' + to_seconds((c * 6151) % 25000000) AS SystemModstamp
+FROM range(1, 127306) r(c);
+
+CREATE TABLE raw_salesforce.Lead AS
+SELECT
+    '00Q' || lpad(l::VARCHAR, 15, '0')                                  AS Id,
+    CASE WHEN l % 11 < 2 THEN 'Closed - Converted'
+         WHEN l % 11 < 5 THEN 'Open - Not Contacted'
+         WHEN l % 11 = 5 THEN 'Working - Contacted'
+         ELSE 'Closed - Not Converted'
+    END                                                                 AS Status,
+    l % 11 < 2                                                          AS IsConverted,
+    false                                                               AS IsDeleted,
+    TIMESTAMPTZ '2025-01-01 00:00:00+00' + to_seconds((l * 3571) % 25000000) AS SystemModstamp
+FROM range(1, 22177) r(l);
@@ -0,0 +1,95 @@
+-- Offline stand-ins for the staging_data_quality views (schemas as in README.md).
+-- Loaded (with the other fixtures/*.sql) into an in-memory DuckDB database
+-- by data_sources.LocalSource.
+-- Like the real views, calculated_at is the time the view is queried.
+
+CREATE TABLE vip_match_quality_counts (
+    total_vip_accounts            BIGINT,
+    matched_to_sf                 BIGINT,
+    unmatched                     BIGINT,
+    match_rate_pct                DOUBLE,
+    exact_vip_id_matches          BIGINT,
+    fuzzy_name_matches            BIGINT,
+    address_matches               BIGINT,
+    manual_matches                BIGINT,
+    missing_vip_code              BIGINT,
+    missing_name                  BIGINT,
+    missing_address               BIGINT,
+    name_completeness_pct         DOUBLE,
+    address_completeness_pct      DOUBLE,
+    active_distributors           BIGINT,
+    distributors_matched_sf       BIGINT,
+    distributor_match_rate_pct    DOUBLE,
+    total_chains                  BIGINT,
+    chains_with_hq                BIGINT,
+    chain_hq_coverage_pct         DOUBLE
+);
+
+INSERT INTO vip_match_quality_counts VALUES (
+    412870, 338553, 74317, 82.0,
+    301204, 21877, 12430, 3042,
+    118, 27, 5911, 99.99, 98.57,
+    312, 287, 92.0,
+    1846, 1163, 63.0
+);
+
+CREATE VIEW vip_match_quality AS
+SELECT *, current_timestamp AS calculated_at FROM vip_match_quality_counts;
+
+
+CREATE TABLE salesforce_quality_counts (
+    total_accounts                BIGINT,
+    accounts_with_vip_id          BIGINT,
+    vip_coverage_pct              DOUBLE,
+    account_name_completeness     DOUBLE,
+    address_completeness          DOUBLE,
+    phone_completeness            DOUBLE,
+    contact_email_completeness    DOUBLE,
+    accounts_with_activity        BIGINT,
+    active_last_90d               BIGINT,
+    active_rate_pct               DOUBLE,
+    accounts_with_duplicate_names BIGINT,
+    accounts_with_duplicate_vip_ids BIGINT,
+    total_contacts                BIGINT,
+    orphan_contacts               BIGINT,
+    total_leads                   BIGINT,
+    open_leads                    BIGINT,
+    converted_leads               BIGINT
+);
+
+INSERT INTO salesforce_quality_counts VALUES (
+    356214, 341980, 96.0,
+    100.0, 91.4, 68.2, 57.9,
+    48211, 15530, 4.36,
+    2874, 96,
+    127305, 1840,
+    22176, 6409, 3978
+);
+
+CREATE VIEW salesforce_quality AS
+SELECT *, current_timestamp AS calculated_at FROM salesforce_quality_counts;
+
+
+CREATE TABLE vip_sf_alignment_counts (
+    vip_retail_count              BIGINT,
+    sf_retail_count               BIGINT,
+    matched_retail_count          BIGINT,
+    retail_match_rate_pct         DOUBLE,
+    vip_distributor_count         BIGINT,
+    sf_distributor_count          BIGINT,
+    matched_distributor_count     BIGINT,
+    distributor_match_rate_pct    DOUBLE,
+    vip_chain_count               BIGINT,
+    sf_chain_hq_count             BIGINT,
+    matched_chain_count           BIGINT,
+    chain_match_rate_pct          DOUBLE
+);
+
+INSERT INTO vip_sf_alignment_counts VALUES (
+    412870, 341980, 338553, 82.0,
+    312, 301, 287, 92.0,
+    1846, 1201, 1163, 63.0
+);
+
+CREATE VIEW vip_sf_alignment AS
+SELECT *, current_timestamp AS calculated_at FROM vip_sf_alignment_counts;
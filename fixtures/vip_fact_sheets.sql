@@ -0,0 +1,26 @@
+-- Offline stand-ins for staging_vip.distributor_fact_sheet_v2 and
+-- staging_vip.chain_fact_sheet_v2 (columns used by the match engine, see
+-- data_sources.MATCH_TARGETS, plus the load timestamp). Counts follow the vip_match_quality fixture:
+-- 312 distributors (287 linked to SF) and 1,846 chains (1,163 with an SF HQ).
+
+CREATE SCHEMA IF NOT EXISTS staging_vip;
+
+CREATE TABLE staging_vip.distributor_fact_sheet_v2 AS
+SELECT
+    'D' || lpad(d::VARCHAR, 3, '0')                                     AS distributor_code,
+    'Distributor ' || lpad(d::VARCHAR, 3, '0')                         AS distributor_name,
+    (d * 7)::VARCHAR || ' Commerce Way'                                 AS street_address,
+    'Springfield'                                                       AS city,
+    'IL'                                                                AS state,
+    '62701'                                                             AS zip_code,
+    CASE WHEN d <= 287 THEN '001' || lpad((2000000 + d)::VARCHAR, 15, '0') END AS sf_account_id,
+    TIMESTAMPTZ '2025-06-01 06:00:00+00' + to_days(CAST(d % 30 AS INTEGER)) AS loaded_at
+FROM range(1, 313) r(d);
+
+CREATE TABLE staging_vip.chain_fact_sheet_v2 AS
+SELECT
+    'C' || lpad(c::VARCHAR, 4, '0')                                     AS chain_code,
+    'Chain ' || lpad(c::VARCHAR, 4, '0')                                AS chain_name,
+    CASE WHEN c <= 1163 THEN '001' || lpad((3000000 + c)::VARCHAR, 15, '0') END AS sfdc_hq_account_id,
+    TIMESTAMPTZ '2025-06-01 06:00:00+00' + to_days(CAST(c % 30 AS INTEGER)) AS loaded_at
+FROM range(1, 1847) r(c);
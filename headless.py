@@ -0,0 +1,166 @@
+"""
+Headless health metrics: the dashboard's health score and alignment rates as JSON.
+
+For monitors and alerting. Nothing here imports Streamlit or runs the page
+script. Snapshots come from the same SQLite cache as the dashboard
+(DQ_CACHE_DIR, see loaders.py), which lets only one process at a time query
+a view. A monitor polling every few seconds therefore starts no BigQuery jobs
+beyond the dashboard's own 5-minute refreshes.
+
+BigQuery credentials: the [gcp_service_account] table of .streamlit/secrets.toml
+when present (as in the dashboard), else Application Default Credentials.
+
+Usage:
+    python headless.py [--source bigquery|local]            # print JSON once
+    python headless.py --serve [--host HOST] [--port PORT]  # GET /health, /cache, /metrics
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tomllib
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_sources import default_bq_client
+from health import calculate_health_score, health_status
+from instrumentation import prometheus_text, span
+from loaders import DATA_SOURCE, LOCAL_LATENCY_MS, load_all, open_data_source, open_snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+# Alignment rates reported next to the score, as (view, column)
+RATES = (
+    ('vip_match_quality', 'match_rate_pct'),
+    ('vip_sf_alignment', 'retail_match_rate_pct'),
+    ('vip_sf_alignment', 'distributor_match_rate_pct'),
+    ('vip_sf_alignment', 'chain_match_rate_pct'),
+)
+
+# A one-shot run waits this long for a stale snapshot's refresh before exiting
+REFRESH_WAIT_SECONDS = 60
+
+
+def bq_client():
+    """Return a BigQuery client using the dashboard's secrets file, else ADC."""
+    if os.path.exists(SECRETS_PATH):
+        with open(SECRETS_PATH, 'rb') as f:
+            return default_bq_client(tomllib.load(f).get('gcp_service_account'))
+    return default_bq_client()
+
+
+def _json_value(value):
+    """Make a view value JSON-serializable."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def health_summary(entries, errors):
+    """Return the health score, alignment rates and snapshot freshness as a JSON-ready dict."""
+    stats = {view: entry.value for view, entry in entries.items()}
+    with span('health_score'):
+        score = calculate_health_score(
+            stats.get('vip_match_quality'), stats.get('salesforce_quality'), stats.get('vip_sf_alignment')
+        )
+    summary = {
+        'health_score': score,
+        'health_status': health_status(score),
+        'rates': {
+            column: _json_value(getattr(stats[view], column)) if view in stats else None
+            for view, column in RATES
+        },
+        'calculated_at': {view: _json_value(value.calculated_at) for view, value in stats.items()},
+        'fetched_at': None,
+        'age_s': None,
+        'stale': any(entry.stale for entry in entries.values()),
+        'errors': {view: str(e) for view, e in errors.items()},
+    }
+    if entries:
+        fetched_at = min(entry.fetched_at for entry in entries.values())
+        summary['fetched_at'] = datetime.fromtimestamp(fetched_at, timezone.utc).isoformat()
+        summary['age_s'] = round(time.time() - fetched_at, 1)
+    return summary
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """GET /health: health_summary() (503 if a view failed); GET /cache: cache stats;
+    GET /metrics: Prometheus text."""
+
+    # Set by serve()
+    cache = None
+    source = None
+
+    def do_GET(self):
+        if self.path in ('/', '/health'):
+            summary = health_summary(*load_all(self.cache, self.source))
+            self._send_json(503 if summary['errors'] else 200, summary)
+        elif self.path == '/cache':
+            self._send_json(200, self.cache.stats())
+        elif self.path == '/metrics':
+            self._send(200, prometheus_text(self.cache.stats()).encode(), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(404, {'error': f"unknown path {self.path}"})
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body, default=str).encode(), 'application/json')
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(source, host, port):
+    """Serve health_summary() over HTTP until interrupted."""
+    HealthHandler.cache = open_snapshot_cache()
+    HealthHandler.source = source
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    logger.info("Serving health metrics on http://%s:%d/health", host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DATA_SOURCE, choices=('bigquery', 'local'))
+    parser.add_argument('--serve', action='store_true', help="run the HTTP endpoint instead of printing once")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    source = open_data_source(args.source, bq_client, latency=LOCAL_LATENCY_MS / 1000)
+    if args.serve:
+        serve(source, args.host, args.port)
+        return
+
+    cache = open_snapshot_cache(warm=False)
+    entries, errors = load_all(cache, source)
+    summary = health_summary(entries, errors)
+    print(json.dumps(summary, indent=2, default=str))
+    # Let a refresh this run started finish, so it is not abandoned mid-query
+    cache.wait(REFRESH_WAIT_SECONDS)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Health score for the Data Quality Command Center.
+
+calculate_health_score() scores one snapshot; calculate_health_scores() does
+the same arithmetic over whole arrays of snapshots at once with NumPy (e.g. to
+backfill the history) and returns the per-component breakdown as well.
+
+Components (see README "Health Score Calculation"):
+- VIP match rate: 35 pts
+- Alignment (avg of retail/distributor/chain match rates): 40 pts
+- Salesforce quality (name + phone completeness, minus duplicate penalty): 25 pts
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from snapshots import history_column
+
+# Arrays of per-snapshot points for each component, plus the rounded total
+HealthBreakdown = namedtuple('HealthBreakdown', ['vip', 'alignment', 'salesforce', 'score'])
+
+
+def calculate_health_score(vip_stats, sf_stats, alignment_stats):
+    """Calculate overall data health score (0-100)."""
+    scores = []
+
+    # VIP match rate score (35 points max)
+    if vip_stats is not None:
+        match_rate = vip_stats.match_rate_pct or 0
+        vip_score = (match_rate / 100) * 35
+        scores.append(vip_score)
+    else:
+        scores.append(0)
+
+    # Alignment score (40 points max) - average of retail, distributor, chain match rates
+    if alignment_stats is not None:
+        retail_rate = alignment_stats.retail_match_rate_pct or 0
+        dist_rate = alignment_stats.distributor_match_rate_pct or 0
+        chain_rate = alignment_stats.chain_match_rate_pct or 0
+        avg_alignment = (retail_rate + dist_rate + chain_rate) / 3
+        alignment_score = (avg_alignment / 100) * 40
+        scores.append(alignment_score)
+    else:
+        scores.append(0)
+
+    # Salesforce data quality score (25 points max)
+    if sf_stats is not None:
+        name_completeness = sf_stats.account_name_completeness or 100
+        phone_completeness = sf_stats.phone_completeness or 0
+        duplicate_penalty = min(10, sf_stats.accounts_with_duplicate_names / 1000)
+        sf_score = ((name_completeness + phone_completeness) / 200 * 25) - duplicate_penalty
+        sf_score = max(0, sf_score)
+        scores.append(sf_score)
+    else:
+        scores.append(0)
+
+    return round(sum(scores))
+
+
+def health_status(score):
+    """Return the status ('healthy', 'warning' or 'critical') for a health score."""
+    return "healthy" if score >= 80 else "warning" if score >= 60 else "critical"
+
+
+def _column(history, view, column):
+    """Return a history column as float64, with nulls as NaN."""
+    return np.asarray(history[history_column(view, column)], dtype=np.float64)
+
+
+def _or(values, default):
+    """Vectorized `value or default`: null and zero both fall back to default."""
+    return np.where(np.isnan(values) | (values == 0), default, values)
+
+
+def calculate_health_scores(history):
+    """Score many snapshots at once; return a HealthBreakdown of NumPy arrays.
+
+    `history` maps history column names (`<view>__<column>`, as written by
+    HistoryStore) to equal-length arrays; an Arrow table works directly.
+    Mirrors calculate_health_score() operation for operation, so results are
+    identical. The one difference: a null duplicate count (which makes the
+    scalar version raise) costs no penalty.
+    """
+    # VIP match rate score (35 points max)
+    match_rate = _or(_column(history, 'vip_match_quality', 'match_rate_pct'), 0)
+    vip_score = (match_rate / 100) * 35
+
+    # Alignment score (40 points max)
+    retail_rate = _or(_column(history, 'vip_sf_alignment', 'retail_match_rate_pct'), 0)
+    dist_rate = _or(_column(history, 'vip_sf_alignment', 'distributor_match_rate_pct'), 0)
+    chain_rate = _or(_column(history, 'vip_sf_alignment', 'chain_match_rate_pct'), 0)
+    avg_alignment = (retail_rate + dist_rate + chain_rate) / 3
+    alignment_score = (avg_alignment / 100) * 40
+
+    # Salesforce data quality score (25 points max)
+    name_completeness = _or(_column(history, 'salesforce_quality', 'account_name_completeness'), 100)
+    phone_completeness = _or(_column(history, 'salesforce_quality', 'phone_completeness'), 0)
+    duplicates = np.nan_to_num(_column(history, 'salesforce_quality', 'accounts_with_duplicate_names'))
+    duplicate_penalty = np.minimum(10, duplicates / 1000)
+    sf_score = ((name_completeness + phone_completeness) / 200 * 25) - duplicate_penalty
+    sf_score = np.maximum(0, sf_score)
+
+    # np.rint rounds half to even, like Python's round()
+    score = np.rint(vip_score + alignment_score + sf_score).astype(np.int64)
+    return HealthBreakdown(vip_score, alignment_score, sf_score, score)
@@ -0,0 +1,203 @@
+"""
+Local snapshot history for the Data Quality Command Center.
+
+Every newly loaded snapshot (all three views, flattened into one wide row
+with `<view>__<column>` names) is appended to a Parquet dataset partitioned
+by day:
+
+    <root>/date=2026-10-17/part-<snapshot_at>.parquet   one file per append
+    <root>/date=2026-10-17/data.parquet              compacted day
+
+Appends never touch existing files. Compaction merges a single day's part
+files into data.parquet, so history is never rewritten as a whole. Reads only
+open the partitions inside the requested date range.
+"""
+
+import glob
+import os
+import threading
+from dataclasses import fields
+from datetime import date, datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from snapshots import SNAPSHOT_TYPES, history_column
+
+KEY_COLUMN = 'snapshot_at'
+
+# Compact today's partition once it has this many part files
+COMPACT_AFTER_PARTS = 48
+
+_ARROW_TYPES = {int: pa.int64(), float: pa.float64(), datetime: pa.timestamp('us', tz='UTC')}
+
+
+def history_schema():
+    """Return the Arrow schema of a history row."""
+    arrow_fields = [pa.field(KEY_COLUMN, pa.timestamp('us', tz='UTC'))]
+    for view, snapshot_type in SNAPSHOT_TYPES.items():
+        for field in fields(snapshot_type):
+            arrow_fields.append(pa.field(history_column(view, field.name), _ARROW_TYPES[field.type]))
+    return pa.schema(arrow_fields)
+
+
+def history_row(snapshots):
+    """Flatten a snapshot (dict of view -> typed snapshot) into a one-row history
+    column dict, keyed by the newest calculated_at across the views."""
+    row = {KEY_COLUMN: [max(snapshot.calculated_at for snapshot in snapshots.values())]}
+    for view, snapshot in snapshots.items():
+        for column, value in snapshot.to_dict().items():
+            row[history_column(view, column)] = [value]
+    return row
+
+
+def snapshots_from_row(row):
+    """Rebuild the typed snapshots (dict of view -> snapshot) from a history row dict."""
+    return {
+        view: snapshot_type.from_row({
+            column: row[history_column(view, column)] for column in snapshot_type.columns()
+        })
+        for view, snapshot_type in SNAPSHOT_TYPES.items()
+    }
+
+
+class HistoryStore:
+    """Append-only, day-partitioned Parquet history of view snapshots."""
+
+    def __init__(self, root):
+        self.root = root
+        self.schema = history_schema()
+        self._lock = threading.Lock()
+        self._last_key = None
+        self._read_cache = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _partition_dir(self, day):
+        return os.path.join(self.root, f"date={day.isoformat()}")
+
+    def _days(self):
+        """Return the partition dates present on disk, oldest first."""
+        days = []
+        for path in glob.glob(os.path.join(self.root, 'date=*')):
+            try:
+                days.append(date.fromisoformat(os.path.basename(path)[len('date='):]))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def _files(self, day):
+        directory = self._partition_dir(day)
+        compacted = os.path.join(directory, 'data.parquet')
+        parts = sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+        return ([compacted] if os.path.exists(compacted) else []) + parts
+
+    def _latest_key(self):
+        """Return the newest stored snapshot time (only the latest partition is read)."""
+        days = self._days()
+        if not days:
+            return None
+        table = pa.concat_tables(
+            pq.read_table(path, columns=[KEY_COLUMN]) for path in self._files(days[-1])
+        )
+        return pc.max(table[KEY_COLUMN]).as_py() if table.num_rows else None
+
+    def append(self, snapshots):
+        """Append a snapshot (dict of view -> typed snapshot) unless already stored.
+
+        The row is keyed by the newest calculated_at across the views; returns
+        True if a row was written.
+        """
+        row = history_row(snapshots)
+        key = row[KEY_COLUMN][0]
+
+        with self._lock:
+            if self._last_key is None:
+                self._last_key = self._latest_key()
+            if self._last_key is not None and key <= self._last_key:
+                return False
+
+            day = key.astimezone(timezone.utc).date()
+            directory = self._partition_dir(day)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pydict(row, schema=self.schema)
+            path = os.path.join(directory, f"part-{key.astimezone(timezone.utc):%Y%m%dT%H%M%S%f}.parquet")
+            pq.write_table(table, path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+            previous_day = self._last_key.astimezone(timezone.utc).date() if self._last_key else None
+            self._last_key = key
+            self._read_cache.clear()
+
+            # A new day closes the previous partition; otherwise keep today's part count bounded
+            if previous_day is not None and previous_day != day:
+                self._compact(previous_day)
+            if len(self._files(day)) > COMPACT_AFTER_PARTS:
+                self._compact(day)
+        return True
+
+    def _compact(self, day):
+        """Merge one day's part files into its data.parquet."""
+        files = self._files(day)
+        parts = [path for path in files if os.path.basename(path).startswith('part-')]
+        if not parts:
+            return
+        table = pa.concat_tables(pq.read_table(path).cast(self.schema) for path in files)
+        table = table.sort_by(KEY_COLUMN)
+        target = os.path.join(self._partition_dir(day), 'data.parquet')
+        pq.write_table(table, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        for path in parts:
+            os.remove(path)
+
+    def compact(self):
+        """Compact every partition before today (for maintenance jobs)."""
+        today = datetime.now(timezone.utc).date()
+        with self._lock:
+            for day in self._days():
+                if day < today:
+                    self._compact(day)
+
+    def read(self, columns, days=7):
+        """Return the last `days` days of history for `columns` as an Arrow table.
+
+        Only partitions in the range are opened; results are cached until the
+        next append.
+        """
+        today = datetime.now(timezone.utc).date()
+        cache_key = (tuple(columns), days, today)
+        with self._lock:
+            cached = self._read_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            since = today - timedelta(days=days - 1)
+            wanted = [KEY_COLUMN] + [column for column in columns if column != KEY_COLUMN]
+            tables = [
+                pq.read_table(path, columns=wanted)
+                for day in self._days() if day >= since
+                for path in self._files(day)
+            ]
+            schema = pa.schema([self.schema.field(column) for column in wanted])
+            table = (
+                pa.concat_tables(t.cast(schema) for t in tables).sort_by(KEY_COLUMN)
+                if tables else schema.empty_table()
+            )
+            self._read_cache[cache_key] = table
+            return table
+
+    def latest_before(self, at, max_days=1):
+        """Return the newest history row (a dict) stored at or before `at`, looking
+        back at most `max_days` partitions before at's day; None if there is none."""
+        day = at.astimezone(timezone.utc).date()
+        with self._lock:
+            days = [d for d in self._days() if day - timedelta(days=max_days) <= d <= day]
+            for partition in reversed(days):
+                files = self._files(partition)
+                if not files:
+                    continue
+                table = pa.concat_tables(pq.read_table(path).cast(self.schema) for path in files)
+                table = table.filter(pc.less_equal(table[KEY_COLUMN], pa.scalar(at, self.schema.field(KEY_COLUMN).type)))
+                if table.num_rows:
+                    return table.sort_by(KEY_COLUMN).slice(table.num_rows - 1).to_pylist()[0]
+        return None
@@ -0,0 +1,575 @@
+"""
+Incremental quality metrics: the views' counts kept as running counters and
+updated from source-table deltas.
+
+The staging_data_quality views rescan every source table on each refresh, so
+refresh time and scan cost grow with the size of the tables. MetricsEngine
+keeps the same counts as running counters in <DQ_CACHE_DIR>/metrics_state.sqlite.
+It reads only the rows modified since each table's watermark:
+- Salesforce tables by SystemModstamp (deletions arrive as IsDeleted rows)
+- VIP fact sheets by their load timestamp (VIP_LOADED_AT)
+
+Each row's last contribution (0/1 flags and group values such as the account
+name) is stored with the counters. An edited row is retracted and re-added,
+and re-applying a row is harmless. Duplicate names and VIP IDs are tracked as
+per-value counts. active_last_90d is summed from counts per LastActivityDate
+when a snapshot is built, so it follows the calendar without a rescan.
+
+Deltas cannot see hard-deleted rows. The match-method columns of
+vip_match_quality cannot be derived from the fact sheet either. So each
+table is rebuilt from a full scan every RECONCILE_SECONDS, or with --full.
+vip_match_quality is then queried once, and the columns the counters do not
+cover (CARRIED_OVER) keep that snapshot's values until the next
+reconciliation.
+
+Usage:
+    python incremental.py [--source bigquery|local] [--views VIEW ...] [--full] [--state PATH]
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+
+import numpy as np
+
+from data_sources import MATCH_TARGETS, RETAIL_KEY, RETAIL_SF_ID, RETAIL_UNIVERSE, SF_ACCOUNT, VIEWS
+from instrumentation import span
+from loaders import CACHE_DIR, DATA_SOURCE
+from snapshots import SNAPSHOT_TYPES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE = os.path.join(CACHE_DIR, "metrics_state.sqlite")
+
+# Bump when the table layout changes; older state files are rebuilt
+SCHEMA_VERSION = 1
+
+RECONCILE_SECONDS = 24 * 3600  # full rescan per table at least this often
+MIN_REFRESH_SECONDS = 5        # views sharing a table refresh it once
+ACTIVE_DAYS = 90
+
+# Load timestamp of the staging_vip fact sheets (assumed; only sf_account_id is documented)
+VIP_LOADED_AT = 'loaded_at'
+
+# Lead statuses follow the standard Salesforce picklist
+OPEN_LEAD = "NOT IsConverted AND Status NOT LIKE 'Closed%'"
+
+# Salesforce replication can commit a row after rows with later SystemModstamps;
+# deltas re-read this far behind the watermark. VIP loads are atomic batches.
+SF_OVERLAP_SECONDS = 600
+
+# A source table: its key and watermark columns, how far behind the watermark
+# deltas start (seconds), its soft-delete flag (None: rows only disappear at
+# reconciliation), the 0/1 counters a row contributes to as (name, SQL
+# condition), and the values it is counted under as (name, SQL expression).
+# Every live row also counts towards 'rows', and 'dup:<group>' counts the
+# values shared by more than one row.
+TableSpec = namedtuple('TableSpec', ['table', 'key', 'watermark', 'overlap', 'deleted', 'counters', 'groups'])
+
+
+def _present(column):
+    return f"{column} IS NOT NULL AND TRIM({column}) <> ''"
+
+
+TABLES = {
+    'account': TableSpec(
+        SF_ACCOUNT, 'Id', 'SystemModstamp', SF_OVERLAP_SECONDS, 'IsDeleted',
+        (
+            ('with_vip_id', 'VIP_ID__c IS NOT NULL'),
+            ('with_name', _present('Name')),
+            ('with_street', _present('BillingStreet')),
+            ('with_phone', _present('Phone')),
+            ('with_activity', 'LastActivityDate IS NOT NULL'),
+            ('distributors', "Type = 'Distributor'"),
+            ('chain_hqs', "Type = 'Chain HQ'"),
+        ),
+        (('name', 'Name'), ('vip_id', 'VIP_ID__c'), ('activity_date', 'LastActivityDate')),
+    ),
+    'contact': TableSpec(
+        'raw_salesforce.Contact', 'Id', 'SystemModstamp', SF_OVERLAP_SECONDS, 'IsDeleted',
+        (('with_email', _present('Email')), ('orphan', 'AccountId IS NULL')),
+        (),
+    ),
+    'lead': TableSpec(
+        'raw_salesforce.Lead', 'Id', 'SystemModstamp', SF_OVERLAP_SECONDS, 'IsDeleted',
+        (('open', OPEN_LEAD), ('converted', 'IsConverted')),
+        (),
+    ),
+    'retail': TableSpec(
+        RETAIL_UNIVERSE, RETAIL_KEY, VIP_LOADED_AT, 0, None,
+        (
+            ('matched', f'{RETAIL_SF_ID} IS NOT NULL'),
+            ('with_name', _present('account_name')),
+            ('with_address', _present('street_address')),
+        ),
+        (),
+    ),
+    'distributor': TableSpec(
+        MATCH_TARGETS['distributor'].table, MATCH_TARGETS['distributor'].key, VIP_LOADED_AT, 0, None,
+        (('matched', f"{MATCH_TARGETS['distributor'].link} IS NOT NULL"),),
+        (),
+    ),
+    'chain': TableSpec(
+        MATCH_TARGETS['chain'].table, MATCH_TARGETS['chain'].key, VIP_LOADED_AT, 0, None,
+        (('matched', f"{MATCH_TARGETS['chain'].link} IS NOT NULL"),),
+        (),
+    ),
+}
+
+# Tables behind each view (data_sources.VIEW_SOURCES)
+VIEW_TABLES = {
+    'vip_match_quality': ('retail', 'distributor', 'chain'),
+    'salesforce_quality': ('account', 'contact', 'lead'),
+    'vip_sf_alignment': ('retail', 'distributor', 'chain', 'account'),
+}
+
+# View columns taken from the view itself at reconciliation: match methods are
+# not columns of the fact sheet, and rows without a vip_code have no key to track
+CARRIED_OVER = {
+    'vip_match_quality': (
+        'exact_vip_id_matches', 'fuzzy_name_matches', 'address_matches', 'manual_matches', 'missing_vip_code',
+    ),
+}
+
+
+def _pct(part, whole):
+    return round(100.0 * part / whole, 2) if whole else 0.0
+
+
+def _count(counters, groups, spec, flags, values, sign):
+    """Add (sign=1) or retract (sign=-1) one row's contribution."""
+    counters['rows'] += sign
+    for i, (counter, _) in enumerate(spec.counters):
+        if flags >> i & 1:
+            counters[counter] += sign
+    for (group, _), value in zip(spec.groups, values):
+        if value is not None:
+            groups[group, value] += sign
+
+
+def _rows(table, spec):
+    """Turn a delta/full scan result into (key, modstamp, deleted, flags, group values) tuples."""
+    flags = np.zeros(table.num_rows, np.int64)
+    for i in range(len(spec.counters)):
+        flags |= table[f'c{i}'].to_numpy(zero_copy_only=False).astype(np.int64) << i
+    values = zip(*(table[f'g{i}'].to_pylist() for i in range(len(spec.groups)))) if spec.groups else repeat(())
+    return list(zip(
+        table['key'].to_pylist(), table['modstamp'].to_pylist(), table['deleted'].to_pylist(),
+        flags.tolist(), values,
+    ))
+
+
+class MetricsEngine:
+    """Running view counters over source-table deltas, persisted in SQLite."""
+
+    def __init__(self, source, path=DEFAULT_STATE, reconcile_every=RECONCILE_SECONDS,
+                 min_interval=MIN_REFRESH_SECONDS, as_of=None):
+        self.source = source
+        self.path = path
+        # Snapshots are stamped, and activity windows end, at as_of (default: now);
+        # set it when `source` reads the tables as of an earlier time
+        self.as_of = as_of
+        self.reconcile_every = reconcile_every
+        self.min_interval = min_interval
+        self._locks = {name: threading.Lock() for name in list(TABLES) + list(CARRIED_OVER)}
+        self._refreshed = {}   # table -> time of this process's last refresh
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._transaction() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in ('rows', 'counters', 'groups', 'watermarks', 'bases'):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            # Each row's stored contribution, so an update can retract it
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rows (
+                    tbl      TEXT NOT NULL,
+                    key      TEXT NOT NULL,
+                    modstamp INTEGER NOT NULL,
+                    flags    INTEGER NOT NULL,
+                    groups   TEXT NOT NULL,
+                    PRIMARY KEY (tbl, key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    tbl   TEXT NOT NULL,
+                    name  TEXT NOT NULL,
+                    value INTEGER NOT NULL,
+                    PRIMARY KEY (tbl, name)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS groups (
+                    tbl   TEXT NOT NULL,
+                    grp   TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    n     INTEGER NOT NULL,
+                    PRIMARY KEY (tbl, grp, value)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    tbl           TEXT PRIMARY KEY,
+                    watermark     INTEGER NOT NULL,
+                    reconciled_at REAL NOT NULL
+                )
+            """)
+            # View snapshots the CARRIED_OVER columns come from
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bases (
+                    view       TEXT PRIMARY KEY,
+                    payload    BLOB NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that holds the file's write lock from the first read,
+        so processes sharing the state apply deltas one at a time."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # ====================================================================
+    # Refresh
+    # ====================================================================
+
+    def _query(self, spec, delta):
+        """Return the scan of a table: every row, or (delta) rows past the @since watermark."""
+        source = self.source
+        columns = [
+            f"CAST({spec.key} AS STRING) AS key",
+            f"COALESCE({source.timestamp_micros(spec.watermark)}, 0) AS modstamp",
+            f"COALESCE({spec.deleted}, FALSE) AS deleted" if spec.deleted else "FALSE AS deleted",
+        ]
+        columns += [f"CASE WHEN {condition} THEN 1 ELSE 0 END AS c{i}" for i, (_, condition) in enumerate(spec.counters)]
+        columns += [f"CAST({expr} AS STRING) AS g{i}" for i, (_, expr) in enumerate(spec.groups)]
+        query = f"SELECT {', '.join(columns)} FROM {source.source_ref(spec.table)} WHERE {spec.key} IS NOT NULL"
+        if delta:
+            query += f" AND {spec.watermark} > {source.micros_timestamp(source.param('since'))}"
+        return query
+
+    def _add_counts(self, conn, name, counters, groups):
+        """Apply counter and group-count deltas, keeping 'dup:<group>' in step."""
+        for (group, value), delta in groups.items():
+            if not delta:
+                continue
+            row = conn.execute(
+                "SELECT n FROM groups WHERE tbl = ? AND grp = ? AND value = ?", (name, group, value)
+            ).fetchone()
+            before = row[0] if row else 0
+            after = before + delta
+            if after:
+                conn.execute(
+                    "INSERT OR REPLACE INTO groups (tbl, grp, value, n) VALUES (?, ?, ?, ?)",
+                    (name, group, value, after)
+                )
+            else:
+                conn.execute("DELETE FROM groups WHERE tbl = ? AND grp = ? AND value = ?", (name, group, value))
+            counters[f'dup:{group}'] += (after > 1) - (before > 1)
+        for counter, delta in counters.items():
+            if delta:
+                conn.execute(
+                    "INSERT INTO counters (tbl, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (tbl, name) DO UPDATE SET value = value + excluded.value",
+                    (name, counter, delta)
+                )
+
+    def _apply(self, conn, name, spec, rows):
+        """Retract each changed row's stored contribution and add its new one; return rows applied."""
+        counters, groups = Counter(), Counter()
+        applied = 0
+        for key, modstamp, deleted, flags, values in rows:
+            old = conn.execute(
+                "SELECT modstamp, flags, groups FROM rows WHERE tbl = ? AND key = ?", (name, key)
+            ).fetchone()
+            if old is not None:
+                if old[0] > modstamp:
+                    continue  # a newer version is applied already (by another process)
+                _count(counters, groups, spec, old[1], json.loads(old[2]), -1)
+            elif deleted:
+                continue
+            if deleted:
+                conn.execute("DELETE FROM rows WHERE tbl = ? AND key = ?", (name, key))
+            else:
+                _count(counters, groups, spec, flags, values, 1)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rows (tbl, key, modstamp, flags, groups) VALUES (?, ?, ?, ?, ?)",
+                    (name, key, modstamp, flags, json.dumps(values))
+                )
+            applied += 1
+        self._add_counts(conn, name, counters, groups)
+        return applied
+
+    def _rebuild(self, conn, name, spec, rows):
+        """Replace a table's state with a full scan; return live rows."""
+        latest = {}
+        for row in rows:
+            if not row[2] and (row[0] not in latest or row[1] >= latest[row[0]][1]):
+                latest[row[0]] = row
+        # Sorted by key, inserts append to the primary-key B-tree
+        live = [latest[key] for key in sorted(latest)]
+
+        flags = np.array([row[3] for row in live], np.int64)
+        counters = {'rows': len(live)}
+        for i, (counter, _) in enumerate(spec.counters):
+            counters[counter] = int((flags >> i & 1).sum())
+        groups = {}
+        for i, (group, _) in enumerate(spec.groups):
+            counts = Counter(row[4][i] for row in live)
+            counts.pop(None, None)
+            groups[group] = counts
+            counters[f'dup:{group}'] = sum(n > 1 for n in counts.values())
+
+        for table in ('rows', 'counters', 'groups'):
+            conn.execute(f"DELETE FROM {table} WHERE tbl = ?", (name,))
+        conn.executemany(
+            "INSERT INTO rows (tbl, key, modstamp, flags, groups) VALUES (?, ?, ?, ?, ?)",
+            ((name, key, modstamp, flags, json.dumps(values)) for key, modstamp, _, flags, values in live)
+        )
+        conn.executemany(
+            "INSERT INTO counters (tbl, name, value) VALUES (?, ?, ?)",
+            ((name, counter, value) for counter, value in counters.items())
+        )
+        conn.executemany(
+            "INSERT INTO groups (tbl, grp, value, n) VALUES (?, ?, ?, ?)",
+            ((name, group, value, n) for group, counts in groups.items() for value, n in sorted(counts.items()))
+        )
+        return len(live)
+
+    def refresh(self, name, full=False):
+        """Bring one table's counters up to date; return {'mode', 'rows', 'seconds'}.
+
+        mode is 'delta', 'full' (reconciliation) or 'skipped' (refreshed moments ago).
+        """
+        spec = TABLES[name]
+        with self._locks[name]:
+            now = time.time()
+            if not full and now - self._refreshed.get(name, 0) < self.min_interval:
+                return {'mode': 'skipped', 'rows': 0, 'seconds': 0.0}
+            with self._connect() as conn:
+                state = conn.execute(
+                    "SELECT watermark, reconciled_at FROM watermarks WHERE tbl = ?", (name,)
+                ).fetchone()
+            full = full or state is None or now - state[1] >= self.reconcile_every
+
+            start = time.perf_counter()
+            with span('metrics_refresh', table=name):
+                if full:
+                    rows = _rows(self.source.run_arrow_query(self._query(spec, delta=False), {}, bulk=True), spec)
+                else:
+                    since = state[0] - spec.overlap * 1_000_000
+                    rows = _rows(self.source.run_arrow_query(self._query(spec, delta=True), {'since': since}), spec)
+                watermark = max((row[1] for row in rows), default=0)
+                with self._transaction() as conn:
+                    if full:
+                        applied = self._rebuild(conn, name, spec, rows)
+                        conn.execute(
+                            "INSERT OR REPLACE INTO watermarks (tbl, watermark, reconciled_at) VALUES (?, ?, ?)",
+                            (name, watermark, now)
+                        )
+                    else:
+                        applied = self._apply(conn, name, spec, rows)
+                        conn.execute(
+                            "UPDATE watermarks SET watermark = MAX(watermark, ?) WHERE tbl = ?", (watermark, name)
+                        )
+            self._refreshed[name] = time.time()
+        stats = {'mode': 'full' if full else 'delta', 'rows': applied, 'seconds': time.perf_counter() - start}
+        logger.info("Refreshed %s counters: %s", name, stats)
+        return stats
+
+    def refresh_base(self, view, full=False):
+        """Re-query a view for its CARRIED_OVER columns when due."""
+        with self._locks[view]:
+            with self._connect() as conn:
+                row = conn.execute("SELECT fetched_at FROM bases WHERE view = ?", (view,)).fetchone()
+            if not full and row is not None and time.time() - row[0] < self.reconcile_every:
+                return
+            snapshot = self.source.fetch_view(view)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO bases (view, payload, fetched_at) VALUES (?, ?, ?)",
+                    (view, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+                )
+
+    def refresh_view(self, view, full=False):
+        """Refresh the tables behind a view; return {table: refresh() stats}."""
+        stats = {name: self.refresh(name, full) for name in VIEW_TABLES[view]}
+        if view in CARRIED_OVER:
+            self.refresh_base(view, full)
+        return stats
+
+    # ====================================================================
+    # Snapshots
+    # ====================================================================
+
+    def _counters(self):
+        """Return {table: Counter of counter values}."""
+        counters = {name: Counter() for name in TABLES}
+        with self._connect() as conn:
+            for name, counter, value in conn.execute("SELECT tbl, name, value FROM counters"):
+                if name in counters:
+                    counters[name][counter] = value
+        return counters
+
+    def _now(self):
+        return self.as_of or datetime.now(timezone.utc)
+
+    def _active_accounts(self):
+        """Return accounts whose LastActivityDate is within the last ACTIVE_DAYS days."""
+        cutoff = (self._now().date() - timedelta(days=ACTIVE_DAYS)).isoformat()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(n), 0) FROM groups WHERE tbl = 'account' AND grp = 'activity_date' AND value >= ?",
+                (cutoff,)
+            ).fetchone()[0]
+
+    def snapshot(self, view, carry_over=True):
+        """Build a view snapshot from the stored counters (no queries).
+
+        With carry_over=False the CARRIED_OVER columns are None instead of
+        coming from the last reconciled view snapshot.
+        """
+        c = self._counters()
+        account, contact, lead = c['account'], c['contact'], c['lead']
+        retail, distributor, chain = c['retail'], c['distributor'], c['chain']
+        now = self._now()
+
+        if view == 'salesforce_quality':
+            active = self._active_accounts()
+            row = {
+                'total_accounts': account['rows'],
+                'accounts_with_vip_id': account['with_vip_id'],
+                'vip_coverage_pct': _pct(account['with_vip_id'], account['rows']),
+                'account_name_completeness': _pct(account['with_name'], account['rows']),
+                'address_completeness': _pct(account['with_street'], account['rows']),
+                'phone_completeness': _pct(account['with_phone'], account['rows']),
+                'contact_email_completeness': _pct(contact['with_email'], contact['rows']),
+                'accounts_with_activity': account['with_activity'],
+                'active_last_90d': active,
+                'active_rate_pct': _pct(active, account['rows']),
+                'accounts_with_duplicate_names': account['dup:name'],
+                'accounts_with_duplicate_vip_ids': account['dup:vip_id'],
+                'total_contacts': contact['rows'],
+                'orphan_contacts': contact['orphan'],
+                'total_leads': lead['rows'],
+                'open_leads': lead['open'],
+                'converted_leads': lead['converted'],
+            }
+        elif view == 'vip_match_quality':
+            row = {
+                'total_vip_accounts': retail['rows'],
+                'matched_to_sf': retail['matched'],
+                'unmatched': retail['rows'] - retail['matched'],
+                'match_rate_pct': _pct(retail['matched'], retail['rows']),
+                'missing_name': retail['rows'] - retail['with_name'],
+                'missing_address': retail['rows'] - retail['with_address'],
+                'name_completeness_pct': _pct(retail['with_name'], retail['rows']),
+                'address_completeness_pct': _pct(retail['with_address'], retail['rows']),
+                'active_distributors': distributor['rows'],
+                'distributors_matched_sf': distributor['matched'],
+                'distributor_match_rate_pct': _pct(distributor['matched'], distributor['rows']),
+                'total_chains': chain['rows'],
+                'chains_with_hq': chain['matched'],
+                'chain_hq_coverage_pct': _pct(chain['matched'], chain['rows']),
+            }
+        elif view == 'vip_sf_alignment':
+            row = {
+                'vip_retail_count': retail['rows'],
+                'sf_retail_count': account['with_vip_id'],
+                'matched_retail_count': retail['matched'],
+                'retail_match_rate_pct': _pct(retail['matched'], retail['rows']),
+                'vip_distributor_count': distributor['rows'],
+                'sf_distributor_count': account['distributors'],
+                'matched_distributor_count': distributor['matched'],
+                'distributor_match_rate_pct': _pct(distributor['matched'], distributor['rows']),
+                'vip_chain_count': chain['rows'],
+                'sf_chain_hq_count': account['chain_hqs'],
+                'matched_chain_count': chain['matched'],
+                'chain_match_rate_pct': _pct(chain['matched'], chain['rows']),
+            }
+        else:
+            raise ValueError(f"Unknown view: {view!r}")
+
+        if view in CARRIED_OVER and not carry_over:
+            row.update(dict.fromkeys(CARRIED_OVER[view]))
+        elif view in CARRIED_OVER:
+            with self._connect() as conn:
+                base = conn.execute("SELECT payload FROM bases WHERE view = ?", (view,)).fetchone()
+            if base is None:
+                raise LookupError(f"{view} has not been reconciled yet; call refresh_view() first")
+            base = pickle.loads(base[0])
+            row.update({column: getattr(base, column) for column in CARRIED_OVER[view]})
+        row['calculated_at'] = now
+        return SNAPSHOT_TYPES[view].from_row(row)
+
+    def fetch_view(self, view):
+        """Apply the deltas behind a view and return its snapshot."""
+        self.refresh_view(view)
+        return self.snapshot(view)
+
+
+class IncrementalSource:
+    """Data source whose quality views come from a MetricsEngine; all other
+    reads (drilldowns, breakdowns, source_version()) go to the wrapped source."""
+
+    def __init__(self, source, path=DEFAULT_STATE):
+        self.source = source
+        self.engine = MetricsEngine(source, path)
+
+    def fetch_view(self, view):
+        return self.engine.fetch_view(view)
+
+    def fetch_snapshot(self):
+        return {view: self.engine.fetch_view(view) for view in VIEWS}
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to read from")
+    parser.add_argument('--views', nargs='+', default=list(VIEWS), choices=VIEWS)
+    parser.add_argument('--full', action='store_true', help="reconcile: rebuild every table from a full scan")
+    parser.add_argument('--state', default=DEFAULT_STATE)
+    args = parser.parse_args()
+
+    from data_sources import create_data_source
+
+    engine = MetricsEngine(create_data_source(args.source), args.state)
+    # Views share tables; refresh each once
+    for name in dict.fromkeys(name for view in args.views for name in VIEW_TABLES[view]):
+        stats = engine.refresh(name, args.full)
+        print(f"{name}: {stats['mode']}, {stats['rows']:,} rows in {stats['seconds']:.2f}s")
+    for view in args.views:
+        if view in CARRIED_OVER:
+            engine.refresh_base(view, args.full)
+    snapshots = {view: engine.snapshot(view).to_dict() for view in args.views}
+    print(json.dumps(snapshots, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
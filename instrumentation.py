@@ -0,0 +1,208 @@
+"""
+Hot-path instrumentation for the Data Quality Command Center.
+
+Records, per process and in memory (module state survives Streamlit reruns):
+- span() / Laps: wall time of named sections (client setup, loaders, health
+  score, render sections) as histograms
+- record_query(): every query a data source runs, with BigQuery job ID,
+  bytes processed/billed, slot-ms and whether BigQuery's result cache served it
+
+prometheus_text() renders all of it, plus the snapshot cache's hit/refresh
+counters, in the Prometheus text exposition format. The dashboard shows the
+same data in an optional debug panel; headless.py serves it at /metrics.
+"""
+
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# Histogram buckets for span durations (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Queries kept for the debug panel
+RECENT_QUERIES = 50
+
+# job_id etc. are None for sources without query jobs (LocalSource)
+QueryRecord = namedtuple('QueryRecord', [
+    'label', 'seconds', 'job_id', 'bytes_processed', 'bytes_billed', 'slot_ms', 'cache_hit', 'finished_at'
+])
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}     # (name, labels) -> [count, sum, last, per-bucket counts]
+_queries = {}   # label -> [count, seconds, bytes processed, bytes billed, slot-ms, cache hits]
+_recent = deque(maxlen=RECENT_QUERIES)
+
+
+def _labels(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Record one timing of section `name`."""
+    with _lock:
+        entry = _spans.get(_labels(name, labels))
+        if entry is None:
+            entry = _spans[_labels(name, labels)] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry[3][i] += 1
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the enclosed block as section `name`; queries run inside it are labelled with it."""
+    stack = _local.__dict__.setdefault('stack', [])
+    stack.append(name + "".join(f":{value}" for _, value in sorted(labels.items())))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+        stack.pop()
+
+
+class Laps:
+    """Times consecutive sections of straight-line code: each lap(section)
+    records the time since the previous lap (or since creation)."""
+
+    def __init__(self, name):
+        self.name = name
+        self._start = time.perf_counter()
+
+    def lap(self, section):
+        now = time.perf_counter()
+        observe(self.name, now - self._start, section=section)
+        self._start = now
+
+
+def current_label():
+    """Return the innermost span of this thread, else the thread name (e.g. refresh-<key>)."""
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else threading.current_thread().name
+
+
+def record_query(seconds, job=None):
+    """Record a finished query; `job` is its BigQuery QueryJob (None for local sources)."""
+    record = QueryRecord(
+        current_label(),
+        seconds,
+        getattr(job, 'job_id', None),
+        getattr(job, 'total_bytes_processed', None),
+        getattr(job, 'total_bytes_billed', None),
+        getattr(job, 'slot_millis', None),
+        getattr(job, 'cache_hit', None),
+        time.time(),
+    )
+    with _lock:
+        _recent.append(record)
+        totals = _queries.setdefault(record.label, [0, 0.0, 0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += record.bytes_processed or 0
+        totals[3] += record.bytes_billed or 0
+        totals[4] += record.slot_ms or 0
+        totals[5] += bool(record.cache_hit)
+
+
+def span_summary():
+    """Return one dict per (section, labels): count, total/mean/last seconds."""
+    with _lock:
+        items = [(key, list(entry)) for key, entry in _spans.items()]
+    return [
+        {
+            'span': name + "".join(f" {key}={value}" for key, value in labels),
+            'count': count,
+            'total_s': total,
+            'mean_ms': total / count * 1000,
+            'last_ms': last * 1000,
+        }
+        for (name, labels), (count, total, last, _) in sorted(items)
+    ]
+
+
+def query_summary():
+    """Return one dict per query label: count, total seconds, bytes billed, cache hits."""
+    with _lock:
+        items = sorted((label, list(totals)) for label, totals in _queries.items())
+    return [
+        {'query': label, 'count': count, 'total_s': seconds, 'bytes_billed': billed, 'cache_hits': cache_hits}
+        for label, (count, seconds, _, billed, _, cache_hits) in items
+    ]
+
+
+def recent_queries():
+    """Return the most recent QueryRecords, newest first."""
+    with _lock:
+        return list(reversed(_recent))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, labels, value):
+    label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+    return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+
+def prometheus_text(cache_stats=None):
+    """Render all metrics in the Prometheus text format; `cache_stats` is SnapshotCache.stats()."""
+    with _lock:
+        spans = [(key, entry[0], entry[1], list(entry[3])) for key, entry in sorted(_spans.items())]
+        queries = sorted((label, list(totals)) for label, totals in _queries.items())
+
+    lines = [
+        "# HELP dq_span_seconds Wall time of instrumented dashboard sections.",
+        "# TYPE dq_span_seconds histogram",
+    ]
+    for (name, labels), count, total, buckets in spans:
+        labels = (('span', name),) + labels
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            lines.append(_series('dq_span_seconds_bucket', labels + (('le', bound),), bucket_count))
+        lines.append(_series('dq_span_seconds_bucket', labels + (('le', '+Inf'),), count))
+        lines.append(_series('dq_span_seconds_sum', labels, total))
+        lines.append(_series('dq_span_seconds_count', labels, count))
+
+    query_metrics = (
+        ('dq_queries_total', "Queries run against the data source.", 0),
+        ('dq_query_seconds_total', "Wall time spent in queries.", 1),
+        ('dq_bigquery_bytes_processed_total', "Bytes processed by BigQuery jobs.", 2),
+        ('dq_bigquery_bytes_billed_total', "Bytes billed for BigQuery jobs.", 3),
+        ('dq_bigquery_slot_milliseconds_total', "Slot time consumed by BigQuery jobs.", 4),
+        ('dq_bigquery_cache_hits_total', "BigQuery jobs answered from BigQuery's result cache.", 5),
+    )
+    for metric, help_text, index in query_metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        lines += [_series(metric, (('query', label),), totals[index]) for label, totals in queries]
+
+    if cache_stats:
+        lines += [
+            "# HELP dq_snapshot_cache_events_total Snapshot cache reads and loads by outcome.",
+            "# TYPE dq_snapshot_cache_events_total counter",
+        ]
+        events = ('hits', 'stale_hits', 'cold_loads', 'reloads', 'revalidations', 'warmed',
+                  'deduplicated', 'waited', 'failures')
+        for key, stats in sorted(cache_stats.items()):
+            lines += [_series('dq_snapshot_cache_events_total', (('key', key), ('event', event)), stats[event])
+                      for event in events]
+        lines += [
+            "# HELP dq_snapshot_cache_age_seconds Age of each cached snapshot.",
+            "# TYPE dq_snapshot_cache_age_seconds gauge",
+        ]
+        lines += [_series('dq_snapshot_cache_age_seconds', (('key', key),), stats['age_s'])
+                  for key, stats in sorted(cache_stats.items()) if stats['age_s'] is not None]
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, cache_stats=None):
+    """Atomically write prometheus_text() to `path` (for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text(cache_stats))
+    os.replace(tmp_path, path)
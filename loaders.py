@@ -0,0 +1,111 @@
+"""
+Snapshot loading shared by the dashboard (app.py) and headless.py.
+
+Nothing here imports Streamlit. Both entry points read their configuration
+from the same environment variables and open the same SQLite snapshot cache
+under DQ_CACHE_DIR. The cache coordinates loads across processes, so a view
+is queried once no matter how many dashboards and monitors ask for it.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from data_sources import VIEWS, create_data_source
+from instrumentation import span
+from snapshot_cache import SnapshotCache
+
+# DQ_DATA_SOURCE=local serves the views from the DuckDB fixtures instead of BigQuery;
+# DQ_LOCAL_LATENCY_MS adds artificial per-query latency to the local source
+DATA_SOURCE = os.environ.get("DQ_DATA_SOURCE", "bigquery")
+LOCAL_LATENCY_MS = float(os.environ.get("DQ_LOCAL_LATENCY_MS", "0"))
+
+# Snapshot cache location (point DQ_CACHE_DIR at persistent storage to survive redeploys)
+CACHE_DIR = os.environ.get("DQ_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_TTL_SECONDS = 300  # 5-minute refresh
+CACHE_WARM_LEAD_SECONDS = 30  # refresh this long before the TTL runs out
+
+# Set DQ_BATCHED_SNAPSHOT=1 to fetch all views with one job instead of three
+BATCHED_SNAPSHOT = os.environ.get("DQ_BATCHED_SNAPSHOT", "0") == "1"
+
+# Set DQ_INCREMENTAL_METRICS=1 to compute the views from source-table deltas (incremental.py)
+INCREMENTAL_METRICS = os.environ.get("DQ_INCREMENTAL_METRICS", "0") == "1"
+
+# Set DQ_SNAPSHOT_ARTIFACT=<dir> to read the views from the artifact refresh.py publishes there
+SNAPSHOT_ARTIFACT = os.environ.get("DQ_SNAPSHOT_ARTIFACT")
+
+
+def open_snapshot_cache(warm=True):
+    """Open the shared snapshot cache, starting its warmer unless warm=False."""
+    cache = SnapshotCache(os.path.join(CACHE_DIR, "snapshots.sqlite"), ttl=CACHE_TTL_SECONDS)
+    if warm:
+        cache.start_warmer(lead=CACHE_WARM_LEAD_SECONDS)
+    return cache
+
+
+def metrics_source(source):
+    """Return `source`, with the views served by incremental.py's counters if DQ_INCREMENTAL_METRICS=1."""
+    if not INCREMENTAL_METRICS:
+        return source
+    from incremental import IncrementalSource
+    return IncrementalSource(source, os.path.join(CACHE_DIR, "metrics_state.sqlite"))
+
+
+def open_data_source(kind, bq_client_factory=None, latency=0.0):
+    """Build the configured data source. With DQ_SNAPSHOT_ARTIFACT set, the views come
+    from the published artifact and the query source is only built on first use."""
+    def build():
+        return metrics_source(create_data_source(kind, bq_client_factory, latency=latency))
+
+    if not SNAPSHOT_ARTIFACT:
+        return build()
+    from refresh import ArtifactSource
+    return ArtifactSource(SNAPSHOT_ARTIFACT, build)
+
+
+# Loaders return CacheEntry(value, fetched_at, stale). Stale entries are served
+# immediately while the cache refreshes them in the background; a refresh only
+# re-runs the view query if the source tables were modified since the last load.
+
+def load_view(cache, source, view):
+    """Load one quality view, re-running its query only when its source tables changed."""
+    with span('load_view', view=view):
+        return cache.get(
+            view,
+            lambda: source.fetch_view(view),
+            version=lambda: source.source_version([view])
+        )
+
+
+def load_snapshot_batched(cache, source):
+    """Load all three quality views in a single query."""
+    with span('load_view', view='snapshot'):
+        entry = cache.get(
+            'snapshot',
+            source.fetch_snapshot,
+            version=lambda: source.source_version(VIEWS)
+        )
+    return {view: entry._replace(value=value) for view, value in entry.value.items()}
+
+
+def load_all(cache, source, batched=BATCHED_SNAPSHOT):
+    """Load all views, cold ones concurrently; return (entries, errors) keyed by view name."""
+    if batched:
+        try:
+            return load_snapshot_batched(cache, source), {}
+        except Exception as e:
+            return {}, {view: e for view in VIEWS}
+
+    # Cached views return at once (stale ones refresh in the background), so
+    # only cold loads need threads. Every dashboard section rerun gets here.
+    cold = [view for view in VIEWS if cache.peek(view) is None]
+    futures = {}
+    if cold:
+        with ThreadPoolExecutor(max_workers=len(cold)) as pool:
+            futures = {view: pool.submit(load_view, cache, source, view) for view in cold}
+    entries, errors = {}, {}
+    for view in VIEWS:
+        try:
+            entries[view] = futures[view].result() if view in futures else load_view(cache, source, view)
+        except Exception as e:
+            errors[view] = e
+    return entries, errors
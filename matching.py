@@ -0,0 +1,443 @@
+"""
+Candidate-match engine: suggests Salesforce accounts for unmatched VIP records.
+
+For every VIP retail location, distributor or chain without a Salesforce link
+(data_sources.MATCH_TARGETS) it proposes the TOP_K most similar accounts:
+
+1. A MatchIndex holds the Salesforce accounts of one kind: normalized names
+   as trigram sets with a trigram -> accounts inverted index (CSR arrays),
+   and an exact ZIP + street lookup.
+2. A record's candidates are the accounts sharing one of its rarest name
+   trigrams or its exact address. Prefix filtering guarantees that any account
+   with name similarity >= MIN_SIMILARITY shares one of those trigrams. Only
+   the MAX_CANDIDATES sharing the most are kept.
+3. Candidates are scored in batches with NumPy: exact trigram Jaccard of names
+   and streets, discounted when store numbers disagree.
+
+The batch job scores every unmatched record across a process pool and writes
+<DQ_CACHE_DIR>/match_candidates.parquet. With --incremental it re-scores only
+records whose fields changed since the last run, or whose suggested accounts
+changed. Every other record is only checked against new or changed accounts.
+
+Usage:
+    python matching.py [--source bigquery|local] [--kinds retail distributor chain]
+                       [--incremental] [--workers N] [--output PATH]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from loaders import CACHE_DIR, DATA_SOURCE
+from normalize import (
+    TRIGRAM_SPACE,
+    jaccard,
+    normalize_address,
+    normalize_name,
+    normalize_postal_code,
+    number_tokens,
+    stable_hash,
+    trigram_ids,
+)
+
+DEFAULT_OUTPUT = os.path.join(CACHE_DIR, "match_candidates.parquet")
+
+TOP_K = 5                      # suggestions kept per record
+MIN_SIMILARITY = 0.5           # name similarity the candidate prefix filter guarantees
+MAX_CANDIDATES = 50            # candidates scored per record
+MAX_POSTING = 1000             # trigrams in more accounts than this are too common to probe
+MIN_SCORE = 0.5                # suggestions below this are dropped
+NAME_WEIGHT = 0.7              # name vs. street share of the score when both have a street
+NUMBER_MISMATCH_PENALTY = 0.5  # score factor when store numbers disagree
+ADDRESS_VOTE = 1000            # candidate-ranking weight of an exact address match
+QUERY_BATCH = 1000             # records matched per NumPy batch
+CHUNK_SIZE = 10000             # records per worker task
+
+
+def _expand(starts, lengths):
+    """Return the flat indices of the ranges [start, start + length)."""
+    run_starts = np.cumsum(lengths) - lengths
+    return np.repeat(starts - run_starts, lengths) + np.arange(lengths.sum())
+
+
+def _rank_within(groups, sort_key):
+    """Return (order, rank) where order sorts by group then ascending sort_key and
+    rank is each element's position within its group in that order."""
+    order = np.lexsort((sort_key, groups))
+    sorted_groups = groups[order]
+    first = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]] if len(order) else np.zeros(0, bool)
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    return order, np.arange(len(order)) - group_start
+
+
+def record_features(names, streets, postal_codes):
+    """Normalize records for matching; return a dict of NumPy arrays."""
+    names = [normalize_name(name) for name in names]
+    streets = [normalize_address(street) for street in streets]
+    postal_codes = [normalize_postal_code(code) for code in postal_codes]
+    name_ids, name_offsets = trigram_ids(names)
+    street_ids, street_offsets = trigram_ids(streets)
+    return {
+        'names': (name_ids, name_offsets),
+        'streets': (street_ids, street_offsets),
+        'number_key': np.array([stable_hash(' '.join(number_tokens(name))) for name in names], dtype=np.uint64),
+        'address_key': np.array([
+            stable_hash(f"{code}|{street}") if code and street else 0
+            for code, street in zip(postal_codes, streets)
+        ], dtype=np.uint64),
+    }
+
+
+class MatchIndex:
+    """Inverted trigram index and address lookup over a set of Salesforce accounts."""
+
+    def __init__(self, accounts):
+        self.account_ids = accounts['Id'].to_pylist()
+        self.account_names = accounts['Name'].to_pylist()
+        self.features = record_features(
+            self.account_names,
+            accounts['BillingStreet'].to_pylist(),
+            accounts['BillingPostalCode'].to_pylist()
+        )
+
+        # CSR postings: accounts containing trigram t are postings[offsets[t]:offsets[t + 1]]
+        ids, offsets = self.features['names']
+        rows = np.repeat(np.arange(len(self.account_ids)), np.diff(offsets))
+        self.postings = rows[np.argsort(ids, kind='stable')]
+        self.frequency = np.bincount(ids, minlength=TRIGRAM_SPACE)
+        self.posting_offsets = np.concatenate([[0], np.cumsum(self.frequency)])
+
+        address_key = self.features['address_key']
+        with_address = np.flatnonzero(address_key)
+        order = np.argsort(address_key[with_address], kind='stable')
+        self.address_rows = with_address[order]
+        self.address_keys = address_key[self.address_rows]
+
+    def __len__(self):
+        return len(self.account_ids)
+
+    def candidates(self, query):
+        """Return (query row, account row) candidate pairs for a batch of record_features()."""
+        ids, offsets = query['names']
+        sizes = np.diff(offsets)
+        query_rows = np.repeat(np.arange(len(sizes)), sizes)
+
+        # Prefix filter: a similarity >= MIN_SIMILARITY leaves at most
+        # size - ceil(MIN_SIMILARITY * size) trigrams unshared, so one more than
+        # that many of the rarest trigrams must hit every such account. Trigrams
+        # in more than MAX_POSTING accounts ("liq", " co") are skipped unless
+        # they are a record's rarest, which trades that guarantee for bounded work.
+        order, rank = _rank_within(query_rows, self.frequency[ids])
+        prefix = sizes - np.ceil(MIN_SIMILARITY * sizes).astype(np.int64) + 1
+        in_prefix = rank < prefix[query_rows[order]]
+        selective = (rank == 0) | (self.frequency[ids[order]] <= MAX_POSTING)
+        chosen = order[in_prefix & selective]
+        starts = self.posting_offsets[ids[chosen]]
+        lengths = self.posting_offsets[ids[chosen] + 1] - starts
+        pair_query = np.repeat(query_rows[chosen], lengths)
+        pair_account = self.postings[_expand(starts, lengths)]
+        votes = np.ones(len(pair_query))
+
+        # Exact address matches always make the cut
+        address_key = query['address_key']
+        low = np.searchsorted(self.address_keys, address_key, 'left')
+        high = np.searchsorted(self.address_keys, address_key, 'right')
+        lengths = np.where(address_key != 0, high - low, 0)
+        pair_query = np.concatenate([pair_query, np.repeat(np.arange(len(address_key)), lengths)])
+        pair_account = np.concatenate([pair_account, self.address_rows[_expand(low, lengths)]])
+        votes = np.concatenate([votes, np.full(lengths.sum(), ADDRESS_VOTE)])
+
+        # Keep the MAX_CANDIDATES accounts with the most votes per record
+        keys, inverse = np.unique(pair_query * len(self) + pair_account, return_inverse=True)
+        votes = np.bincount(inverse, weights=votes)
+        candidate_query, candidate_account = keys // len(self), keys % len(self)
+        order, rank = _rank_within(candidate_query, -votes)
+        keep = order[rank < MAX_CANDIDATES]
+        return candidate_query[keep], candidate_account[keep]
+
+    def score(self, query, query_rows, account_rows):
+        """Score (query row, account row) pairs in [0, 1]."""
+        name = jaccard(query['names'], query_rows, self.features['names'], account_rows)
+        street = jaccard(query['streets'], query_rows, self.features['streets'], account_rows)
+        query_streets, account_streets = query['streets'][1], self.features['streets'][1]
+        both_streets = (np.diff(query_streets)[query_rows] > 0) & (np.diff(account_streets)[account_rows] > 0)
+        score = np.where(both_streets, NAME_WEIGHT * name + (1 - NAME_WEIGHT) * street, name)
+
+        query_number = query['number_key'][query_rows]
+        account_number = self.features['number_key'][account_rows]
+        mismatch = (query_number != 0) & (account_number != 0) & (query_number != account_number)
+        return np.where(mismatch, score * NUMBER_MISMATCH_PENALTY, score)
+
+    def match(self, records):
+        """Return (record row, account row, score) of the TOP_K suggestions per record.
+
+        `records` is a dict of name, street and zip lists.
+        """
+        results = []
+        for start in range(0, len(records['name']), QUERY_BATCH):
+            stop = start + QUERY_BATCH
+            query = record_features(records['name'][start:stop], records['street'][start:stop], records['zip'][start:stop])
+            query_rows, account_rows = self.candidates(query)
+            scores = self.score(query, query_rows, account_rows)
+            good = scores >= MIN_SCORE
+            query_rows, account_rows, scores = query_rows[good], account_rows[good], scores[good]
+            order, rank = _rank_within(query_rows, -scores)
+            top = order[rank < TOP_K]
+            results.append((query_rows[top] + start, account_rows[top], scores[top]))
+        if not results:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+# Worker processes get the index once, through the pool initializer
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _match_chunk(records):
+    return _worker_index.match(records)
+
+
+def match_records(index, records, workers):
+    """Match an Arrow table of records (key, name, street, zip, ...) against an index, across processes."""
+    if not len(index) or not records.num_rows:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    chunks = [
+        records.slice(start, CHUNK_SIZE).select(['name', 'street', 'zip']).to_pydict()
+        for start in range(0, records.num_rows, CHUNK_SIZE)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as pool:
+            parts = list(pool.map(_match_chunk, chunks))
+    else:
+        parts = [index.match(chunk) for chunk in chunks]
+    rows = np.concatenate([part[0] + n * CHUNK_SIZE for n, part in enumerate(parts)])
+    account_rows = np.concatenate([part[1] for part in parts])
+    scores = np.concatenate([part[2] for part in parts])
+    return rows, account_rows, scores
+
+
+def record_hashes(table, columns):
+    """Return a stable 64-bit hash of each row's values in `columns`."""
+    values = [table[column].to_pylist() for column in columns]
+    return np.array([stable_hash('\x1f'.join(v or '' for v in row)) for row in zip(*values)], dtype=np.uint64)
+
+
+def kind_accounts(accounts, sf_type):
+    """Return the accounts a MATCH_TARGETS kind is matched against."""
+    if sf_type is not None:
+        return accounts.filter(pc.equal(accounts['Type'], sf_type))
+    # Any account not already linked to a VIP record (and not an HQ/distributor record)
+    from data_sources import MATCH_TARGETS
+    other_types = pa.array([target.sf_type for target in MATCH_TARGETS.values() if target.sf_type])
+    return accounts.filter(pc.and_(
+        pc.is_null(accounts['VIP_ID__c']),
+        pc.invert(pc.fill_null(pc.is_in(accounts['Type'], value_set=other_types), False))
+    ))
+
+
+def _suggestions(records, kind, hashes, rows, account_rows, scores, index):
+    """Build the result table: one row per record with its ranked suggestion lists."""
+    order = np.lexsort((-scores, rows))
+    rows, account_rows, scores = rows[order], account_rows[order], scores[order]
+    offsets = pa.array(np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=records.num_rows))]).astype(np.int32))
+    return pa.table({
+        'kind': pa.array([kind] * records.num_rows, pa.string()),
+        'key': records['key'],
+        'name': records['name'],
+        'record_hash': pa.array(hashes, pa.uint64()),
+        'candidate_ids': pa.ListArray.from_arrays(offsets, pa.array([index.account_ids[r] for r in account_rows], pa.string())),
+        'candidate_names': pa.ListArray.from_arrays(offsets, pa.array([index.account_names[r] for r in account_rows], pa.string())),
+        'scores': pa.ListArray.from_arrays(offsets, pa.array(np.round(scores, 3), pa.float64())),
+    })
+
+
+def _merge(previous, fresh):
+    """Merge two suggestion lists of (account id, name, score); keep the TOP_K best per id."""
+    best = {}
+    for candidate in previous + fresh:
+        if candidate[0] not in best or candidate[2] > best[candidate[0]][2]:
+            best[candidate[0]] = candidate
+    return sorted(best.values(), key=lambda candidate: -candidate[2])[:TOP_K]
+
+
+def _candidate_lists(table):
+    """Return {key: [(account id, name, score), ...]} for a result table."""
+    return {
+        key: list(zip(ids, names, scores))
+        for key, ids, names, scores in zip(
+            table['key'].to_pylist(), table['candidate_ids'].to_pylist(),
+            table['candidate_names'].to_pylist(), table['scores'].to_pylist()
+        )
+    }
+
+
+def match_kind(kind, records, accounts, workers, previous=None, changed_accounts=None):
+    """Suggest accounts for one kind's unmatched records; return (result table, stats).
+
+    With `previous` (last run's rows for this kind) and `changed_accounts` (Ids
+    that are new or changed since then), only new/changed records and records
+    whose suggestions include a changed account are re-scored against every
+    account; the rest are only matched against the changed accounts.
+    """
+    stats = {'records': records.num_rows, 'accounts': accounts.num_rows}
+    hashes = record_hashes(records, ['name', 'street', 'city', 'state', 'zip'])
+    start = time.perf_counter()
+    index = MatchIndex(accounts)
+    stats['index_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if previous is None:
+        rescore = np.ones(records.num_rows, dtype=bool)
+    else:
+        previous_hash = dict(zip(previous['key'].to_pylist(), previous['record_hash'].to_pylist()))
+        previous_lists = _candidate_lists(previous)
+        rescore = np.array([
+            previous_hash.get(key) != record_hash
+            or any(candidate[0] in changed_accounts for candidate in previous_lists[key])
+            for key, record_hash in zip(records['key'].to_pylist(), hashes.tolist())
+        ], dtype=bool)
+
+    full_rows = np.flatnonzero(rescore)
+    rows, account_rows, scores = match_records(index, records.take(pa.array(full_rows)), workers)
+    result = _suggestions(records.take(pa.array(full_rows)), kind, hashes[full_rows], rows, account_rows, scores, index)
+    stats['rescored'] = len(full_rows)
+
+    if previous is not None:
+        # Unchanged records keep their suggestions, merged with matches among the changed accounts
+        kept_rows = np.flatnonzero(~rescore)
+        kept = records.take(pa.array(kept_rows))
+        changed = accounts.filter(pc.is_in(accounts['Id'], value_set=pa.array(sorted(changed_accounts), pa.string())))
+        delta_index = MatchIndex(changed)
+        delta = _suggestions(kept, kind, hashes[kept_rows], *match_records(delta_index, kept, workers), delta_index)
+        delta_lists = _candidate_lists(delta)
+        merged = [_merge(previous_lists[key], delta_lists[key]) for key in kept['key'].to_pylist()]
+        lengths = np.array([len(candidates) for candidates in merged], dtype=np.int32)
+        offsets = pa.array(np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32))
+        flat = [candidate for candidates in merged for candidate in candidates]
+        result = pa.concat_tables([result, pa.table({
+            'kind': delta['kind'],
+            'key': delta['key'],
+            'name': delta['name'],
+            'record_hash': delta['record_hash'],
+            'candidate_ids': pa.ListArray.from_arrays(offsets, pa.array([c[0] for c in flat], pa.string())),
+            'candidate_names': pa.ListArray.from_arrays(offsets, pa.array([c[1] for c in flat], pa.string())),
+            'scores': pa.ListArray.from_arrays(offsets, pa.array([c[2] for c in flat], pa.float64())),
+        })])
+        stats['delta_accounts'] = changed.num_rows
+
+    stats['match_s'] = time.perf_counter() - start
+    stats['with_suggestions'] = int(pc.sum(pc.greater(pc.list_value_length(result['candidate_ids']), 0)).as_py() or 0)
+    return result.sort_by('key'), stats
+
+
+def account_state_path(output):
+    """Return where a run stores the account hashes that --incremental compares against."""
+    return os.path.splitext(output)[0] + '_accounts.parquet'
+
+
+def _write(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def run(source, kinds, output=DEFAULT_OUTPUT, incremental=False, workers=None):
+    """Run the match job against a data source; return per-kind stats."""
+    from data_sources import MATCH_TARGETS, SF_ACCOUNT_COLUMNS
+
+    workers = workers or os.cpu_count() or 1
+    accounts = source.fetch_sf_accounts()
+    account_hashes = record_hashes(accounts, SF_ACCOUNT_COLUMNS)
+
+    previous = changed_accounts = None
+    state_path = account_state_path(output)
+    if incremental and os.path.exists(output) and os.path.exists(state_path):
+        previous = pq.read_table(output)
+        state = pq.read_table(state_path)
+        known = dict(zip(state['Id'].to_pylist(), state['hash'].to_pylist()))
+        current_ids = accounts['Id'].to_pylist()
+        # Changed or new accounts, plus deleted ones (so suggestions pointing at them are re-scored)
+        changed_accounts = {
+            account_id for account_id, account_hash in zip(current_ids, account_hashes.tolist())
+            if known.get(account_id) != account_hash
+        } | (known.keys() - set(current_ids))
+
+    results, stats = [], {}
+    for kind in kinds:
+        records = source.fetch_unmatched_records(kind)
+        previous_kind = previous.filter(pc.equal(previous['kind'], kind)) if previous is not None else None
+        table, stats[kind] = match_kind(
+            kind, records, kind_accounts(accounts, MATCH_TARGETS[kind].sf_type), workers,
+            previous=previous_kind, changed_accounts=changed_accounts
+        )
+        results.append(table)
+
+    # Kinds not run this time keep their previous suggestions
+    if os.path.exists(output):
+        earlier = pq.read_table(output)
+        results.append(earlier.filter(pc.invert(pc.is_in(earlier['kind'], value_set=pa.array(list(kinds))))))
+    _write(pa.concat_tables(results), output)
+    _write(pa.table({'Id': accounts['Id'], 'hash': pa.array(account_hashes, pa.uint64())}), state_path)
+    return stats
+
+
+def read_best_matches(kind, path=DEFAULT_OUTPUT):
+    """Return the top suggestion per record of a kind (key, suggested_account_id,
+    suggested_name, match_score) from the last run, or None."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _read_best_matches(kind, path, mtime)
+
+
+@lru_cache(maxsize=8)
+def _read_best_matches(kind, path, mtime):
+    table = pq.read_table(path, filters=[('kind', '=', kind)])
+    table = table.filter(pc.greater(pc.list_value_length(table['candidate_ids']), 0))
+    return pa.table({
+        'key': table['key'],
+        'suggested_account_id': pc.list_element(table['candidate_ids'], 0),
+        'suggested_name': pc.list_element(table['candidate_names'], 0),
+        'match_score': pc.list_element(table['scores'], 0),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to read from")
+    parser.add_argument('--kinds', nargs='+', default=['retail', 'distributor', 'chain'],
+                        choices=['retail', 'distributor', 'chain'])
+    parser.add_argument('--incremental', action='store_true',
+                        help="only re-score what changed since the last run")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from data_sources import create_data_source
+
+    start = time.perf_counter()
+    stats = run(create_data_source(args.source), args.kinds, args.output, args.incremental, args.workers)
+    for kind, kind_stats in stats.items():
+        print(f"{kind}: {kind_stats['rescored']:,} of {kind_stats['records']:,} unmatched records scored "
+              f"against {kind_stats['accounts']:,} accounts"
+              + (f" (+ {kind_stats['delta_accounts']:,} changed accounts for the rest)" if 'delta_accounts' in kind_stats else "")
+              + f"; {kind_stats['with_suggestions']:,} with suggestions")
+    print(f"Done in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
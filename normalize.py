@@ -0,0 +1,136 @@
+"""
+Name and address normalization for record matching.
+
+Shared by the duplicate-cluster engine (duplicates.py) and the VIP ↔ Salesforce
+match engine (matching.py). Normalized text only contains [a-z0-9 ], so
+character trigrams map to small integers (see trigram_ids()) and trigram-set
+operations run as NumPy array operations.
+"""
+
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+# Alphabet of normalized text: space, digits, letters
+ALPHABET = ' 0123456789abcdefghijklmnopqrstuvwxyz'
+TRIGRAM_SPACE = len(ALPHABET) ** 3
+
+_CODES = np.zeros(256, dtype=np.int32)
+for _code, _char in enumerate(ALPHABET):
+    _CODES[ord(_char)] = _code
+
+# Tokens that carry no identity (legal forms, articles, "No." in "No. 12")
+NAME_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'of', 'no', 'llc', 'inc', 'incorporated', 'co', 'corp',
+    'corporation', 'company', 'ltd', 'limited', 'lp', 'llp', 'pllc', 'dba',
+})
+
+# USPS-style abbreviations for street suffixes, directions and unit designators
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'drive': 'dr',
+    'boulevard': 'blvd', 'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy',
+    'highway': 'hwy', 'route': 'rte', 'square': 'sq', 'terrace': 'ter', 'circle': 'cir',
+    'trail': 'trl', 'way': 'wy', 'plaza': 'plz', 'north': 'n', 'south': 's', 'east': 'e',
+    'west': 'w', 'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'suite': 'ste', 'apartment': 'apt', 'building': 'bldg', 'floor': 'fl', 'unit': 'unit',
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _fold(text):
+    """Lowercase, strip accents, and reduce to space-separated [a-z0-9] tokens."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    # "O'Brien's" -> "obriens", "Wine & Spirits" -> "wine and spirits"
+    text = text.replace("'", '').replace('&', ' and ')
+    return _NON_ALNUM.sub(' ', text).split()
+
+
+def normalize_name(name):
+    """Return the comparable form of an account name ('' if nothing is left)."""
+    return ' '.join(token for token in _fold(name) if token not in NAME_STOPWORDS)
+
+
+def normalize_address(street):
+    """Return the comparable form of a street address ('' if missing)."""
+    return ' '.join(ADDRESS_ABBREVIATIONS.get(token, token) for token in _fold(street))
+
+
+def normalize_postal_code(postal_code):
+    """Return the 5-digit ZIP of a postal code ('' if it has none)."""
+    digits = ''.join(ch for ch in (postal_code or '') if ch.isdigit())
+    return digits[:5] if len(digits) >= 5 else ''
+
+
+def number_tokens(normalized):
+    """Return the numeric tokens of normalized text (store numbers, suite numbers)."""
+    return tuple(token for token in normalized.split() if token.isdigit())
+
+
+def stable_hash(text):
+    """Return a 64-bit hash of text that is the same in every process (0 for '')."""
+    if not text:
+        return 0
+    data = text.encode('utf-8')
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+def trigram_ids(texts):
+    """Return (ids, offsets) for the sets of padded character trigrams of normalized texts.
+
+    ids is one int32 array for all texts; the distinct trigrams of texts[k]
+    are ids[offsets[k]:offsets[k + 1]], sorted. Each text is padded with a
+    space on both sides, so any non-empty text has at least one trigram.
+    """
+    padded = [f" {text} " if text else '' for text in texts]
+    lengths = np.array([max(len(text) - 2, 0) for text in padded], dtype=np.int64)
+    offsets = np.zeros(len(padded) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    codes = _CODES[np.frombuffer(''.join(padded).encode('ascii'), dtype=np.uint8)]
+    # Trigram k of a text starts at its own position in the joined string;
+    # skip the two positions at the end of each text that would cross into the next
+    text_starts = np.zeros(len(padded), dtype=np.int64)
+    np.cumsum([len(text) for text in padded[:-1]], out=text_starts[1:])
+    starts = np.repeat(text_starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    size = len(ALPHABET)
+    ids = (codes[starts] * size + codes[starts + 1]) * size + codes[starts + 2]
+
+    # Sort and de-duplicate within each text: unique (text, trigram) keys
+    keys = np.unique(np.repeat(np.arange(len(padded), dtype=np.int64), lengths) * TRIGRAM_SPACE + ids)
+    offsets[1:] = np.cumsum(np.bincount(keys // TRIGRAM_SPACE, minlength=len(padded)))
+    return (keys % TRIGRAM_SPACE).astype(np.int32), offsets
+
+
+def _ragged_take(ids, offsets, records):
+    """Concatenate the id runs of `records`; return (values, position in `records`)."""
+    lengths = offsets[records + 1] - offsets[records]
+    segment = np.repeat(np.arange(len(records)), lengths)
+    run_starts = np.cumsum(lengths) - lengths
+    return ids[offsets[records][segment] + np.arange(lengths.sum()) - run_starts[segment]], segment
+
+
+def jaccard(left_sets, left, right_sets, right):
+    """Exact Jaccard similarity of trigram sets for many pairs at once.
+
+    `left_sets` and `right_sets` are (ids, offsets) as returned by
+    trigram_ids() and may be the same; pair k compares set left[k] of the
+    former with set right[k] of the latter. Two empty sets score 0.
+    """
+    left_ids, left_offsets = left_sets
+    right_ids, right_offsets = right_sets
+    left_values, left_pair = _ragged_take(left_ids, left_offsets, left)
+    right_values, right_pair = _ragged_take(right_ids, right_offsets, right)
+    # A trigram is shared when (pair, trigram) appears on both sides; each side is a set
+    keys = np.sort(np.concatenate([
+        left_pair.astype(np.int64) * TRIGRAM_SPACE + left_values,
+        right_pair.astype(np.int64) * TRIGRAM_SPACE + right_values,
+    ]))
+    shared = keys[1:][keys[1:] == keys[:-1]] // TRIGRAM_SPACE
+    intersection = np.bincount(shared, minlength=len(left))
+    union = (left_offsets[left + 1] - left_offsets[left]) + (right_offsets[right + 1] - right_offsets[right]) - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1), 0.0)
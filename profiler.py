@@ -0,0 +1,169 @@
+"""
+Column profiler: null rates, distinct counts, top values and lengths of any
+table's columns in one aggregate query.
+
+profile_table() generates a single SELECT over the table that computes, for
+every requested column at once:
+- nulls and blanks (empty or whitespace-only after a cast to STRING), and the
+  resulting completeness percentage
+- APPROX_COUNT_DISTINCT (HyperLogLog++ in BigQuery, within about 1%)
+- the TOP_VALUES most frequent values with their counts
+- minimum, average and maximum length of the value as a string
+
+The table is scanned once, however many columns are profiled. With
+`sample_percent` the query reads only about that share of the table's storage
+blocks (TABLESAMPLE SYSTEM), so it costs about that share of the full scan.
+Counts are then scaled up and each estimate carries a 95% error bound:
+- completeness and row count: binomial standard error over the sampled rows,
+  with a finite-population correction
+- average length: standard error of the sampled lengths
+- distinct counts, minimum and maximum length: from the sample only, so
+  distinct counts are lower bounds
+
+The bounds assume rows are sampled independently. BigQuery samples whole
+storage blocks instead (the local DuckDB source samples rows). Rows loaded
+together then stay together, and the block count makes the real sampled share
+drift from `sample_percent`. Scaled counts are therefore rough, and the
+bounds are optimistic when a field's completeness depends on load order.
+
+Usage:
+    python profiler.py TABLE [COLUMN ...] [--source bigquery|local] [--sample PERCENT] [--where SQL]
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import namedtuple
+
+from loaders import DATA_SOURCE
+
+TOP_VALUES = 5
+
+# z for two-sided 95% bounds
+Z_95 = 1.96
+
+# Per column; *_error fields are 95% half-widths, None for exact (unsampled) profiles
+ColumnProfile = namedtuple('ColumnProfile', [
+    'column', 'nulls', 'blanks', 'completeness_pct', 'completeness_error_pct', 'distinct',
+    'top_values', 'min_length', 'avg_length', 'avg_length_error', 'max_length',
+])
+TableProfile = namedtuple('TableProfile', [
+    'table', 'rows', 'rows_error', 'sample_percent', 'sampled_rows', 'columns', 'profiled_at', 'seconds',
+])
+
+
+def profile_query(source, table, columns, sample_percent=None, where=None, top=TOP_VALUES):
+    """Return the single-pass aggregate query profiling `columns` of `table`."""
+    selects = ["COUNT(*) AS row_count"]
+    for i, column in enumerate(columns):
+        text = f"CAST({column} AS STRING)"
+        length = f"LENGTH({text})"
+        selects += [
+            f"SUM(CASE WHEN {column} IS NULL THEN 1 ELSE 0 END) AS c{i}_nulls",
+            f"SUM(CASE WHEN TRIM({text}) = '' THEN 1 ELSE 0 END) AS c{i}_blanks",
+            f"APPROX_COUNT_DISTINCT({column}) AS c{i}_distinct",
+            f"{source.top_values(text, top)} AS c{i}_top",
+            f"MIN({length}) AS c{i}_min_length",
+            f"AVG({length}) AS c{i}_avg_length",
+            f"STDDEV_SAMP({length}) AS c{i}_sd_length",
+            f"MAX({length}) AS c{i}_max_length",
+        ]
+    sample = f" {source.sample_clause(sample_percent)}" if sample_percent else ""
+    return (
+        "SELECT\n    " + ",\n    ".join(selects)
+        + f"\nFROM {source.source_ref(table)}{sample}"
+        + (f"\nWHERE {where}" if where else "")
+    )
+
+
+def _column_profile(column, row, i, fraction, top):
+    """Build one ColumnProfile from the query row, scaling sampled counts by 1/fraction."""
+    sampled = row['row_count']
+    nulls = row[f'c{i}_nulls'] or 0
+    blanks = row[f'c{i}_blanks'] or 0
+    present = sampled - nulls - blanks
+    completeness = 100.0 * present / sampled if sampled else None
+    completeness_error = avg_length_error = None
+    if fraction < 1 and sampled:
+        # Binomial standard error with the finite-population correction
+        p = present / sampled
+        completeness_error = 100.0 * Z_95 * math.sqrt(p * (1 - p) / sampled * (1 - fraction))
+        sd_length = row[f'c{i}_sd_length']
+        non_null = sampled - nulls
+        if sd_length is not None and non_null > 1:
+            avg_length_error = Z_95 * sd_length / math.sqrt(non_null) * math.sqrt(1 - fraction)
+    return ColumnProfile(
+        column,
+        round(nulls / fraction),
+        round(blanks / fraction),
+        completeness,
+        completeness_error,
+        row[f'c{i}_distinct'],
+        [
+            (item['value'], round(item['count'] / fraction))
+            for item in row[f'c{i}_top'] or () if item['value'] is not None
+        ][:top],
+        row[f'c{i}_min_length'],
+        row[f'c{i}_avg_length'],
+        avg_length_error,
+        row[f'c{i}_max_length'],
+    )
+
+
+def profile_table(source, table, columns=None, sample_percent=None, where=None, top=TOP_VALUES):
+    """Profile `columns` (default: all) of a source table such as 'raw_salesforce.Account'.
+
+    `sample_percent` (0-100) profiles a block sample instead of the whole
+    table; `where` is an optional SQL filter (e.g. 'NOT IsDeleted').
+    Returns a TableProfile whose `columns` maps column name -> ColumnProfile.
+    """
+    known = source.table_columns(table)
+    columns = list(columns or known)
+    unknown = [column for column in columns if column not in known]
+    if unknown:
+        raise ValueError(f"{table} has no column(s) {', '.join(unknown)}")
+    if sample_percent is not None and not 0 < sample_percent <= 100:
+        raise ValueError(f"sample_percent must be in (0, 100], got {sample_percent}")
+    fraction = (sample_percent or 100) / 100
+
+    start = time.perf_counter()
+    row = source.run_query(profile_query(source, table, columns, sample_percent, where, top))[0]
+    seconds = time.perf_counter() - start
+
+    sampled = row['row_count']
+    rows_error = Z_95 * math.sqrt(sampled * (1 - fraction)) / fraction if fraction < 1 else None
+    return TableProfile(
+        table,
+        round(sampled / fraction),
+        rows_error,
+        sample_percent if fraction < 1 else None,
+        sampled,
+        {column: _column_profile(column, row, i, fraction, top) for i, column in enumerate(columns)},
+        time.time(),
+        seconds,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('table', help="source table, e.g. raw_salesforce.Account")
+    parser.add_argument('columns', nargs='*', help="columns to profile (default: all)")
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to query")
+    parser.add_argument('--sample', type=float, help="profile a TABLESAMPLE of about this many percent")
+    parser.add_argument('--where', help="SQL filter, e.g. 'NOT IsDeleted'")
+    parser.add_argument('--top', type=int, default=TOP_VALUES, help="most frequent values to report")
+    args = parser.parse_args()
+
+    from data_sources import create_data_source
+
+    profile = profile_table(create_data_source(args.source), args.table, args.columns, args.sample, args.where, args.top)
+    print(json.dumps(dict(
+        profile._asdict(),
+        columns=[column._asdict() for column in profile.columns.values()],
+    ), indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+Snapshot artifact: the views queried once per refresh period and published
+as memory-mappable Arrow IPC files.
+
+The batch job queries the three views and the alignment breakdown, adds the
+derived health score and status, and publishes a new version:
+
+    <dir>/<version>/snapshot.arrow    one row: history_store columns + health
+    <dir>/<version>/breakdown.arrow   DataSource.fetch_alignment_breakdown()
+    <dir>/CURRENT                     name of the newest complete version
+
+A version is written in full before CURRENT is swapped to it, so readers
+never see a partial artifact. The last KEEP_VERSIONS versions are kept for
+readers still mapping an older one. If the source tables did not change
+(source_version()) and the artifact is younger than MAX_AGE_SECONDS, the job
+publishes nothing and runs no queries.
+
+With DQ_SNAPSHOT_ARTIFACT=<dir> the dashboard and headless.py read the views
+through ArtifactSource instead of querying them. It memory-maps the current
+version, with no copies, and re-reads it only when CURRENT changes. Any number
+of dashboard replicas, monitors and alerting jobs then share one query per
+refresh period, and the app starts without BigQuery. The drilldowns still
+query the underlying source when opened.
+
+Usage:
+    python refresh.py [--source bigquery|local] [--output DIR] [--every SECONDS] [--force]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+from data_sources import VIEWS
+from health import calculate_health_score, health_status
+from history_store import KEY_COLUMN, history_row, history_schema, snapshots_from_row
+from instrumentation import span
+from loaders import CACHE_DIR, DATA_SOURCE, SNAPSHOT_ARTIFACT, metrics_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = SNAPSHOT_ARTIFACT or os.path.join(CACHE_DIR, "artifact")
+
+# Bump when the file layout changes; readers reject other formats
+FORMAT_VERSION = '1'
+
+KEEP_VERSIONS = 3
+# Publish at least this often even if the sources did not change: some
+# metrics (e.g. active_last_90d) move with the calendar
+MAX_AGE_SECONDS = 3600
+
+SNAPSHOT_FILE = 'snapshot.arrow'
+BREAKDOWN_FILE = 'breakdown.arrow'
+CURRENT_FILE = 'CURRENT'
+
+# Derived columns stored next to the view columns
+HEALTH_FIELDS = [pa.field('health_score', pa.int64()), pa.field('health_status', pa.string())]
+
+# snapshots: dict of view -> typed snapshot; breakdown: memory-mapped Arrow table
+Artifact = namedtuple('Artifact', [
+    'version', 'created_at', 'source_version', 'snapshots', 'health_score', 'health_status', 'breakdown'
+])
+
+
+def artifact_schema():
+    """Return the Arrow schema of snapshot.arrow."""
+    schema = history_schema()
+    for field in HEALTH_FIELDS:
+        schema = schema.append(field)
+    return schema
+
+
+def _write_ipc(table, path):
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_ipc(path):
+    """Read an Arrow IPC file without copying: buffers point into the mapping."""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def current_version(directory):
+    """Return the name of the current version, or None before the first publish."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_artifact(directory=DEFAULT_DIR, version=None):
+    """Memory-map a published version (default: the current one) as an Artifact."""
+    version = version or current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No snapshot artifact in {directory}; run python refresh.py")
+    path = os.path.join(directory, version)
+    table = _read_ipc(os.path.join(path, SNAPSHOT_FILE))
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'format_version') != FORMAT_VERSION.encode():
+        raise ValueError(f"{path} has artifact format {metadata.get(b'format_version')!r}, expected {FORMAT_VERSION}")
+    row = table.to_pylist()[0]
+    return Artifact(
+        version,
+        row[KEY_COLUMN],
+        metadata[b'source_version'].decode() or None,
+        snapshots_from_row(row),
+        row['health_score'],
+        row['health_status'],
+        _read_ipc(os.path.join(path, BREAKDOWN_FILE)),
+    )
+
+
+def publish(directory, snapshots, breakdown, source_version=None, keep=KEEP_VERSIONS):
+    """Write a new version and make it current; return its name."""
+    created_at = datetime.now(timezone.utc)
+    version = f"{created_at:%Y%m%dT%H%M%S%f}"
+    health_score = calculate_health_score(*(snapshots[view] for view in VIEWS))
+
+    row = history_row(snapshots)
+    row.update({KEY_COLUMN: [created_at], 'health_score': [health_score], 'health_status': [health_status(health_score)]})
+    schema = artifact_schema().with_metadata({
+        'format_version': FORMAT_VERSION,
+        'source_version': source_version or '',
+    })
+
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+    _write_ipc(pa.Table.from_pydict(row, schema=schema), os.path.join(tmp_dir, SNAPSHOT_FILE))
+    _write_ipc(breakdown, os.path.join(tmp_dir, BREAKDOWN_FILE))
+    os.replace(tmp_dir, os.path.join(directory, version))
+
+    tmp_current = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_current, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_current, os.path.join(directory, CURRENT_FILE))
+
+    # Version names sort chronologically; mapped files stay readable after removal
+    versions = sorted(name for name in os.listdir(directory) if not name.startswith('.') and name != CURRENT_FILE)
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return version
+
+
+def refresh(source, directory=DEFAULT_DIR, force=False):
+    """Query the views once and publish them unless nothing changed; return the
+    new version name, or None if the current one is still valid."""
+    version = source.source_version(VIEWS)
+    if not force:
+        try:
+            current = read_artifact(directory)
+        except (FileNotFoundError, ValueError):
+            current = None
+        if (current is not None and version is not None and current.source_version == version
+                and (datetime.now(timezone.utc) - current.created_at).total_seconds() < MAX_AGE_SECONDS):
+            return None
+
+    with span('refresh_artifact'):
+        with ThreadPoolExecutor(max_workers=len(VIEWS) + 1) as pool:
+            futures = {view: pool.submit(source.fetch_view, view) for view in VIEWS}
+            breakdown = pool.submit(source.fetch_alignment_breakdown)
+            snapshots = {view: future.result() for view, future in futures.items()}
+            return publish(directory, snapshots, breakdown.result(), version)
+
+
+class ArtifactSource:
+    """Data source serving the views and the alignment breakdown from the published
+    artifact. Everything else (drilldowns, batch reads) goes to the source built by
+    `source_factory`, which is only called on first use."""
+
+    def __init__(self, directory, source_factory):
+        self.directory = directory
+        self._source_factory = source_factory
+        self._source = None
+        self._artifact = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """Return the current Artifact, re-mapping it only when CURRENT changed."""
+        version = current_version(self.directory)
+        with self._lock:
+            if self._artifact is None or self._artifact.version != version:
+                self._artifact = read_artifact(self.directory, version)
+            return self._artifact
+
+    def source_version(self, views):
+        # A new version is the only way the served views can change
+        return current_version(self.directory)
+
+    def fetch_view(self, view):
+        return self._current().snapshots[view]
+
+    def fetch_snapshot(self):
+        return dict(self._current().snapshots)
+
+    def fetch_alignment_breakdown(self):
+        return self._current().breakdown
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        with self._lock:
+            if self._source is None:
+                self._source = self._source_factory()
+        return getattr(self._source, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        choices=('bigquery', 'local'), help="data source to query")
+    parser.add_argument('--output', default=DEFAULT_DIR, help="artifact directory")
+    parser.add_argument('--every', type=float, help="keep running, refreshing every this many seconds")
+    parser.add_argument('--force', action='store_true', help="publish even if the sources did not change")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from data_sources import create_data_source
+
+    source = metrics_source(create_data_source(args.source))
+    while True:
+        start = time.perf_counter()
+        try:
+            version = refresh(source, args.output, args.force)
+        except Exception:
+            if args.every is None:
+                raise
+            logger.exception("Refresh failed; retrying in %ss", args.every)
+        else:
+            if version:
+                logger.info("Published %s/%s in %.1fs", args.output, version, time.perf_counter() - start)
+            else:
+                logger.info("Sources unchanged; %s is current", current_version(args.output))
+        if args.every is None:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Size-bounded on-disk cache for results that never change.
+
+Point-in-time results (the views as of a past timestamp) are immutable. Unlike
+snapshot_cache.py, there is no TTL and no revalidation: an entry stays until
+the cache file grows past `max_bytes`. The least recently read entries are
+then evicted. Entries are pickled into one SQLite file, so they survive
+restarts and are shared by every process pointing at it. Loads are
+single-flight per key within a process.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes; older cache files are discarded
+SCHEMA_VERSION = 1
+
+
+class ResultCache:
+    """SQLite LRU of immutable results, bounded by total payload size."""
+
+    def __init__(self, path, max_bytes=64 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS results")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key       TEXT PRIMARY KEY,
+                    payload   BLOB NOT NULL,
+                    size      INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    read_at   REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS results_read_at ON results (read_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used), or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE results SET read_at = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            # Written by an incompatible version of the app; treat as a miss
+            logger.warning("Discarding unreadable result %r", key)
+            return None
+
+    def put(self, key, value):
+        """Store a value, then evict least recently read entries beyond max_bytes."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, payload, size, stored_at, read_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, size in conn.execute(
+                    "SELECT key, size FROM results WHERE key != ? ORDER BY read_at", (key,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    total -= size
+                    evicted += 1
+                with self._lock:
+                    self.evictions += evicted
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, running loader() (once per process) on a miss."""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key)
+            with self._lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if value is None:
+                value = loader()
+                self.put(key, value)
+            return value
+
+    def stats(self):
+        """Return entry count, total bytes and this process's hits/misses/evictions."""
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        with self._lock:
+            return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
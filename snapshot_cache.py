@@ -0,0 +1,387 @@
+"""
+Persistent snapshot cache for the Data Quality Command Center.
+
+Entries live in memory and in a SQLite file, so a restarted process can serve
+the last snapshot immediately instead of blocking on BigQuery. Entries past
+their TTL are still served (marked stale) while a background thread refreshes
+them (stale-while-revalidate).
+
+A refresh first compares a cheap source version (e.g. source table
+modification times) with the one stored alongside the entry. If nothing
+changed, the entry is just re-stamped instead of re-running the full query.
+
+Loads are single-flight per key: while one load or refresh of a key is in
+flight, other readers wait for it (cold miss) or keep serving the stale entry
+instead of starting another. Processes sharing the cache file (the dashboard,
+headless.py) coordinate through a lease row per key, so only one of them runs
+a given load; the others pick up its result from SQLite. An optional warmer
+thread refreshes recently read entries shortly before they expire, so readers
+normally never see a stale entry at all. stats() exposes per-key refresh
+counts and timings.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes; older cache files are discarded
+SCHEMA_VERSION = 3
+
+# After a failed refresh, the warmer leaves the key alone for this long
+RETRY_AFTER_SECONDS = 60
+
+# A process's claim on loading a key; expires if the process dies mid-load
+LEASE_SECONDS = 120
+LEASE_POLL_SECONDS = 0.25
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'fetched_at', 'stale'])
+
+# fetched_at: last time the entry was confirmed current
+# loaded_at: last time the value was actually (re)loaded
+_Stored = namedtuple('_Stored', ['value', 'fetched_at', 'loaded_at', 'version'])
+
+
+class SnapshotCache:
+    """Memory + SQLite cache with stale-while-revalidate refreshes."""
+
+    def __init__(self, path, ttl=300, max_age=3600):
+        self.path = path
+        self.ttl = ttl
+        # Even with unchanged sources, reload at least this often: some metrics
+        # (e.g. active_last_90d) move with the calendar, not with the tables
+        self.max_age = max_age
+        self._memory = {}
+        self._inflight = {}    # key -> Event set when its load/refresh finishes
+        self._loaders = {}     # key -> (loader, version) of the last get(), for the warmer
+        self._last_read = {}   # key -> time of the last get()
+        self._stats = {}
+        self._warmer = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS snapshots")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    key        TEXT PRIMARY KEY,
+                    payload    BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    loaded_at  REAL NOT NULL,
+                    version    TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    key        TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _read(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, fetched_at, loaded_at, version FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return _Stored(pickle.loads(row[0]), *row[1:])
+        except Exception:
+            # Written by an incompatible version of the app; treat as a miss
+            logger.warning("Discarding unreadable cache entry %r", key)
+            return None
+
+    def put(self, key, value, version=None):
+        """Store a freshly loaded value in both tiers; return its fetch timestamp."""
+        now = time.time()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (key, payload, fetched_at, loaded_at, version) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, now, now, version)
+            )
+        with self._lock:
+            self._memory[key] = _Stored(value, now, now, version)
+        return now
+
+    def _revalidate(self, key, stored):
+        """Mark an unchanged entry as current without reloading it."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE snapshots SET fetched_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self._memory[key] = stored._replace(fetched_at=now)
+
+    def _claim_lease(self, key):
+        """Claim key for loading across processes; False while another process holds it."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (key, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE leases.expires_at < ?",
+                (key, now + LEASE_SECONDS, now)
+            )
+            return cursor.rowcount == 1
+
+    def _release_lease(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def _sync(self, key, stored):
+        """Return the SQLite copy of key if another process stored a newer one, else stored."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT fetched_at FROM snapshots WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] <= stored.fetched_at:
+            return stored
+        newer = self._read(key)
+        if newer is None:
+            return stored
+        with self._lock:
+            self._memory[key] = newer
+        return newer
+
+    def peek(self, key):
+        """Return the stored entry for key without refreshing it, or None."""
+        with self._lock:
+            stored = self._memory.get(key)
+        if stored is None:
+            stored = self._read(key)
+            if stored is not None:
+                with self._lock:
+                    self._memory[key] = stored
+        return stored
+
+    def get(self, key, loader, version=None, warm=True):
+        """Return a CacheEntry for key; blocks on loader() only when nothing is cached.
+
+        `version` is an optional callable returning a cheap source-data version;
+        stale entries whose version is unchanged are re-stamped, not reloaded.
+        With warm=False the warmer leaves the entry alone; it is only refreshed
+        when read stale, for loads too expensive to repeat ahead of demand.
+        """
+        with self._lock:
+            if warm:
+                self._loaders[key] = (loader, version)
+            self._last_read[key] = time.time()
+            self._stat(key)
+        stored = self.peek(key)
+        if stored is None:
+            return self._load_cold(key, loader, version)
+
+        stale = time.time() - stored.fetched_at > self.ttl
+        if stale:
+            # Another process may already have refreshed it
+            stored = self._sync(key, stored)
+            stale = time.time() - stored.fetched_at > self.ttl
+        with self._lock:
+            self._stat(key)['stale_hits' if stale else 'hits'] += 1
+        if stale:
+            self._refresh_in_background(key, loader, version)
+        return CacheEntry(stored.value, stored.fetched_at, stale)
+
+    def prefetch(self, key, loader, version=None):
+        """Start loading key in the background if nothing is cached; never blocks.
+
+        Unlike get(), this does not count as a read, so the warmer only keeps
+        the entry fresh once something actually reads it.
+        """
+        with self._lock:
+            if key in self._inflight or key in self._memory:
+                return
+        if self.peek(key) is not None:
+            return
+
+        def load():
+            try:
+                self._load_cold(key, loader, version)
+            except Exception:
+                logger.exception("Prefetch of %r failed", key)
+
+        threading.Thread(target=load, name=f"prefetch-{key}", daemon=True).start()
+
+    def _stat(self, key):
+        """Return the (mutable) stats dict of a key; call with the lock held."""
+        if key not in self._stats:
+            self._stats[key] = {
+                'hits': 0, 'stale_hits': 0, 'cold_loads': 0, 'reloads': 0, 'revalidations': 0, 'warmed': 0,
+                'deduplicated': 0, 'waited': 0, 'failures': 0,
+                'last_refresh_s': None, 'last_refresh_at': None, 'last_failure_at': None,
+            }
+        return self._stats[key]
+
+    def _begin(self, key):
+        """Claim the key's single flight; return (event, True) if claimed, else the in-flight (event, False)."""
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is not None:
+                return event, False
+            event = self._inflight[key] = threading.Event()
+            return event, True
+
+    def _end(self, key, event, outcome, started):
+        """Release the key's single flight and record how the load went."""
+        now = time.time()
+        with self._lock:
+            del self._inflight[key]
+            stats = self._stat(key)
+            stats[outcome] += 1
+            if outcome == 'failures':
+                stats['last_failure_at'] = now
+            elif outcome in ('cold_loads', 'reloads', 'revalidations'):
+                stats['last_refresh_s'] = time.perf_counter() - started
+                stats['last_refresh_at'] = now
+        event.set()
+
+    def wait(self, timeout=None):
+        """Wait for this process's in-flight loads and refreshes (e.g. before exiting)."""
+        with self._lock:
+            events = list(self._inflight.values())
+        deadline = None if timeout is None else time.time() + timeout
+        for event in events:
+            event.wait(None if deadline is None else max(0, deadline - time.time()))
+
+    def _load_cold(self, key, loader, version):
+        """Load a missing entry; concurrent callers for the same key wait for the first one."""
+        event, claimed = self._begin(key)
+        if not claimed:
+            with self._lock:
+                self._stat(key)['waited'] += 1
+            event.wait()
+            stored = self.peek(key)
+            if stored is not None:
+                return CacheEntry(stored.value, stored.fetched_at, False)
+            # The load we waited for failed; try once more ourselves
+            return self._load_cold(key, loader, version)
+
+        started, outcome = time.perf_counter(), 'failures'
+        try:
+            # Another process loading the same key: wait for its result instead
+            while not self._claim_lease(key):
+                time.sleep(LEASE_POLL_SECONDS)
+                stored = self.peek(key)
+                if stored is not None:
+                    outcome = 'waited'
+                    return CacheEntry(stored.value, stored.fetched_at, False)
+            try:
+                # Take the version first so a change during the load is seen next time
+                current_version = self._current_version(key, version)
+                value = loader()
+                fetched_at = self.put(key, value, current_version)
+            finally:
+                self._release_lease(key)
+            outcome = 'cold_loads'
+            return CacheEntry(value, fetched_at, False)
+        finally:
+            self._end(key, event, outcome, started)
+
+    def _current_version(self, key, version):
+        if version is None:
+            return None
+        try:
+            return version()
+        except Exception:
+            # Without a version the entry is simply reloaded every time
+            logger.warning("Could not read source version for %r", key, exc_info=True)
+            return None
+
+    def _refresh(self, key, loader, version):
+        """Revalidate or reload an entry; return which happened ('deduplicated' if
+        another process is refreshing it or just did)."""
+        seen = self.peek(key)
+        if not self._claim_lease(key):
+            return 'deduplicated'
+        try:
+            stored = self._sync(key, seen)
+            if stored.fetched_at > seen.fetched_at:
+                return 'deduplicated'
+            current_version = self._current_version(key, version)
+            if (current_version is not None
+                    and stored.version == current_version
+                    and time.time() - stored.loaded_at < self.max_age):
+                self._revalidate(key, stored)
+                return 'revalidations'
+            self.put(key, loader(), current_version)
+            return 'reloads'
+        finally:
+            self._release_lease(key)
+
+    def _refresh_in_background(self, key, loader, version):
+        """Start a refresh thread unless one is in flight; return True if one was started."""
+        event, claimed = self._begin(key)
+        if not claimed:
+            with self._lock:
+                self._stat(key)['deduplicated'] += 1
+            return False
+
+        def refresh():
+            started, outcome = time.perf_counter(), 'failures'
+            try:
+                outcome = self._refresh(key, loader, version)
+            except Exception:
+                # Keep serving the stale entry; the next read retries
+                logger.exception("Background refresh of %r failed", key)
+            finally:
+                self._end(key, event, outcome, started)
+
+        threading.Thread(target=refresh, name=f"refresh-{key}", daemon=True).start()
+        return True
+
+    def warm(self, lead=30, idle=900):
+        """Refresh (in the background) every entry read in the last `idle` seconds
+        that expires within `lead` seconds."""
+        now = time.time()
+        with self._lock:
+            due = [
+                (key, loader, version) for key, (loader, version) in self._loaders.items()
+                if now - self._last_read[key] < idle
+                and now - (self._stat(key)['last_failure_at'] or 0) > RETRY_AFTER_SECONDS
+            ]
+        for key, loader, version in due:
+            stored = self.peek(key)
+            if stored is None or now - stored.fetched_at < self.ttl - lead:
+                continue
+            if self._refresh_in_background(key, loader, version):
+                with self._lock:
+                    self._stat(key)['warmed'] += 1
+
+    def start_warmer(self, lead=30, idle=900, interval=5):
+        """Start the process-wide warmer thread (idempotent); see warm()."""
+        with self._lock:
+            if self._warmer is not None:
+                return
+            self._warmer = threading.Thread(
+                target=self._warm_forever, args=(lead, idle, interval), name="snapshot-cache-warmer", daemon=True
+            )
+        self._warmer.start()
+
+    def _warm_forever(self, lead, idle, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.warm(lead, idle)
+            except Exception:
+                logger.exception("Cache warmer pass failed")
+
+    def stats(self):
+        """Return per-key refresh stats: counts, last refresh duration/time, entry age."""
+        now = time.time()
+        with self._lock:
+            result = {key: dict(values) for key, values in self._stats.items()}
+            for key in result:
+                stored = self._memory.get(key)
+                result[key]['age_s'] = now - stored.fetched_at if stored else None
+                result[key]['in_flight'] = key in self._inflight
+        return result
@@ -0,0 +1,150 @@
+"""
+Typed snapshots of the staging_data_quality views.
+
+Each view returns a single row. Its columns are declared once here (matching
+the README schemas) and drive both the explicit SELECT lists and row
+validation, so a renamed or dropped column fails loudly at load time.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import ClassVar
+
+
+class SchemaDriftError(Exception):
+    """A view did not return the columns the dashboard expects."""
+
+
+class _Snapshot:
+    """Shared helpers for the view snapshot dataclasses."""
+
+    __slots__ = ()
+
+    VIEW: ClassVar[str]
+
+    @classmethod
+    def columns(cls):
+        """Return the view's column names in schema order."""
+        return tuple(f.name for f in fields(cls))
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a snapshot from a mapping of column name to value."""
+        missing = [column for column in cls.columns() if column not in row]
+        if missing:
+            raise SchemaDriftError(f"{cls.VIEW} is missing columns: {', '.join(missing)}")
+        return cls(*(row[column] for column in cls.columns()))
+
+    def to_dict(self):
+        """Return the snapshot as a column name to value dict."""
+        return {column: getattr(self, column) for column in self.columns()}
+
+
+@dataclass(frozen=True, slots=True)
+class VipMatchQuality(_Snapshot):
+    """Row of staging_data_quality.vip_match_quality."""
+
+    VIEW: ClassVar[str] = 'vip_match_quality'
+
+    # Overall match stats
+    total_vip_accounts: int
+    matched_to_sf: int
+    unmatched: int
+    match_rate_pct: float
+
+    # Match methods
+    exact_vip_id_matches: int
+    fuzzy_name_matches: int
+    address_matches: int
+    manual_matches: int
+
+    # Data completeness
+    missing_vip_code: int
+    missing_name: int
+    missing_address: int
+    name_completeness_pct: float
+    address_completeness_pct: float
+
+    # Distributor stats
+    active_distributors: int
+    distributors_matched_sf: int
+    distributor_match_rate_pct: float
+
+    # Chain stats
+    total_chains: int
+    chains_with_hq: int
+    chain_hq_coverage_pct: float
+
+    calculated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class SalesforceQuality(_Snapshot):
+    """Row of staging_data_quality.salesforce_quality."""
+
+    VIEW: ClassVar[str] = 'salesforce_quality'
+
+    # Account metrics
+    total_accounts: int
+    accounts_with_vip_id: int
+    vip_coverage_pct: float
+
+    # Field completeness (%)
+    account_name_completeness: float
+    address_completeness: float
+    phone_completeness: float
+    contact_email_completeness: float
+
+    # Activity
+    accounts_with_activity: int
+    active_last_90d: int
+    active_rate_pct: float
+
+    # Duplicates
+    accounts_with_duplicate_names: int
+    accounts_with_duplicate_vip_ids: int
+
+    # Contacts & leads
+    total_contacts: int
+    orphan_contacts: int
+    total_leads: int
+    open_leads: int
+    converted_leads: int
+
+    calculated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class VipSfAlignment(_Snapshot):
+    """Row of staging_data_quality.vip_sf_alignment."""
+
+    VIEW: ClassVar[str] = 'vip_sf_alignment'
+
+    # Retail locations
+    vip_retail_count: int
+    sf_retail_count: int
+    matched_retail_count: int
+    retail_match_rate_pct: float
+
+    # Distributors
+    vip_distributor_count: int
+    sf_distributor_count: int
+    matched_distributor_count: int
+    distributor_match_rate_pct: float
+
+    # Chain HQs
+    vip_chain_count: int
+    sf_chain_hq_count: int
+    matched_chain_count: int
+    chain_match_rate_pct: float
+
+    calculated_at: datetime
+
+
+# Snapshot type for each view, keyed by view name
+SNAPSHOT_TYPES = {cls.VIEW: cls for cls in (VipMatchQuality, SalesforceQuality, VipSfAlignment)}
+
+
+def history_column(view, column):
+    """Return the history column name for a view column."""
+    return f"{view}__{column}"
@@ -0,0 +1,19 @@
+"""fetch_alignment_breakdown() returns one row per distributor and chain."""
+
+import glob
+import os
+import shutil
+
+from data_sources import FIXTURES_DIR, LocalSource
+
+
+def test_repeated_fact_sheet_names_are_not_double_counted(tmp_path):
+    for path in glob.glob(os.path.join(FIXTURES_DIR, '*.sql')):
+        shutil.copy(path, tmp_path)
+    # Runs after the fixtures (files load in name order): every fact sheet name twice
+    (tmp_path / 'zz_repeated_names.sql').write_text(
+        "INSERT INTO staging_vip.distributor_fact_sheet_v2 SELECT * FROM staging_vip.distributor_fact_sheet_v2;\n"
+        "INSERT INTO staging_vip.chain_fact_sheet_v2 SELECT * FROM staging_vip.chain_fact_sheet_v2;\n"
+    )
+    repeated = LocalSource(fixtures_dir=str(tmp_path)).fetch_alignment_breakdown()
+    assert repeated.to_pylist() == LocalSource().fetch_alignment_breakdown().to_pylist()
@@ -0,0 +1,85 @@
+"""calculate_health_scores() agrees with calculate_health_score() snapshot for snapshot."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from health import calculate_health_score, calculate_health_scores
+from history_store import history_column
+
+# Every input of the score, per view
+COLUMNS = {
+    'vip_match_quality': ('match_rate_pct',),
+    'vip_sf_alignment': ('retail_match_rate_pct', 'distributor_match_rate_pct', 'chain_match_rate_pct'),
+    'salesforce_quality': ('account_name_completeness', 'phone_completeness', 'accounts_with_duplicate_names'),
+}
+
+
+def snapshot(match=80.0, retail=85.0, distributor=90.0, chain=60.0, name=99.0, phone=70.0, duplicates=500):
+    return {
+        'vip_match_quality': {'match_rate_pct': match},
+        'vip_sf_alignment': {
+            'retail_match_rate_pct': retail,
+            'distributor_match_rate_pct': distributor,
+            'chain_match_rate_pct': chain,
+        },
+        'salesforce_quality': {
+            'account_name_completeness': name,
+            'phone_completeness': phone,
+            'accounts_with_duplicate_names': duplicates,
+        },
+    }
+
+
+def scalar_score(snap):
+    stats = {view: SimpleNamespace(**values) for view, values in snap.items()}
+    return calculate_health_score(stats['vip_match_quality'], stats['salesforce_quality'], stats['vip_sf_alignment'])
+
+
+def history(snapshots):
+    return {
+        history_column(view, column): [snap[view][column] for snap in snapshots]
+        for view, columns in COLUMNS.items() for column in columns
+    }
+
+
+EDGE_CASES = {
+    'typical': snapshot(),
+    # Null rates (a view whose denominator was zero) count as 0
+    'null rates': snapshot(match=None, retail=None, distributor=None, chain=None, phone=None),
+    'zero rates': snapshot(match=0.0, retail=0.0, distributor=0.0, chain=0.0, phone=0.0),
+    # Null or zero name completeness falls back to 100
+    'null name completeness': snapshot(name=None),
+    'zero name completeness': snapshot(name=0.0),
+    'no duplicates': snapshot(duplicates=0),
+    # The duplicate penalty is capped at 10 points, and the Salesforce score floored at 0
+    'capped duplicate penalty': snapshot(duplicates=50000),
+    'floored salesforce score': snapshot(name=5.0, phone=0.0, duplicates=9000),
+    'all perfect': snapshot(100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 0),
+    # Totals landing on .5 round half to even, as round() does
+    'rounds half up to even': snapshot(match=10.0, retail=0.0, distributor=0.0, chain=0.0, name=None, phone=0.0),
+    'rounds half down to even': snapshot(match=30.0, retail=0.0, distributor=0.0, chain=0.0, name=None, phone=0.0),
+}
+
+
+@pytest.mark.parametrize("snap", EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_edge_cases_match_scalar(snap):
+    assert calculate_health_scores(history([snap])).score.tolist() == [scalar_score(snap)]
+
+
+def test_random_snapshots_match_scalar():
+    rng = np.random.default_rng(0)
+    snapshots = []
+    for _ in range(5000):
+        rates = [
+            rng.choice([None, 0.0, round(float(rng.uniform(0, 100)), 1)], p=[0.05, 0.05, 0.9])
+            for _ in range(6)
+        ]
+        snapshots.append(snapshot(*rates, duplicates=int(rng.integers(0, 20000))))
+    assert calculate_health_scores(history(snapshots)).score.tolist() == [scalar_score(s) for s in snapshots]
+
+
+def test_breakdown_sums_to_score():
+    breakdown = calculate_health_scores(history(list(EDGE_CASES.values())))
+    assert np.array_equal(np.rint(breakdown.vip + breakdown.alignment + breakdown.salesforce), breakdown.score)
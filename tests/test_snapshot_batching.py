@@ -0,0 +1,51 @@
+"""The batched snapshot query returns the same values as the per-view queries."""
+
+import dataclasses
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient
+from data_sources import VIEWS, BigQuerySource, LocalSource
+from loaders import load_all, load_snapshot_batched, load_view
+from snapshot_cache import SnapshotCache
+
+
+@pytest.fixture(scope="module")
+def source():
+    return LocalSource()
+
+
+def without_timestamp(snapshot):
+    return dataclasses.replace(snapshot, calculated_at=None)
+
+
+@pytest.mark.parametrize("view", VIEWS)
+def test_fetch_snapshot_matches_fetch_view(source, view):
+    batched = source.fetch_snapshot()
+    assert without_timestamp(batched[view]) == without_timestamp(source.fetch_view(view))
+
+
+def test_fetch_snapshot_returns_every_view(source):
+    assert set(source.fetch_snapshot()) == set(VIEWS)
+
+
+def test_load_all_batched_matches_per_view(source, tmp_path):
+    batched, batched_errors = load_all(SnapshotCache(str(tmp_path / "batched.sqlite")), source, batched=True)
+    separate, separate_errors = load_all(SnapshotCache(str(tmp_path / "separate.sqlite")), source, batched=False)
+    assert batched_errors == separate_errors == {}
+    assert {view: without_timestamp(entry.value) for view, entry in batched.items()} == {
+        view: without_timestamp(entry.value) for view, entry in separate.items()
+    }
+
+
+def test_bigquery_batched_matches_per_view(tmp_path):
+    client = FakeBigQueryClient()
+    source = BigQuerySource(client)
+    batched = load_snapshot_batched(SnapshotCache(str(tmp_path / "batched.sqlite")), source)
+    assert client.query_count == 1
+    cache = SnapshotCache(str(tmp_path / "separate.sqlite"))
+    separate = {view: load_view(cache, source, view) for view in VIEWS}
+    assert client.query_count == 1 + len(VIEWS)
+    assert {view: entry.value for view, entry in batched.items()} == {
+        view: entry.value for view, entry in separate.items()
+    }
@@ -0,0 +1,26 @@
+"""Stale snapshots are re-stamped while the sources are unchanged and reloaded once they change."""
+
+from data_sources import LocalSource
+from loaders import load_view
+from snapshot_cache import SnapshotCache
+
+VIEW = 'vip_match_quality'
+
+
+def test_stale_entry_reloads_only_after_source_change(tmp_path):
+    source = LocalSource()
+    # ttl=0: every read after the first finds the entry stale and refreshes it
+    cache = SnapshotCache(str(tmp_path / "snapshots.sqlite"), ttl=0)
+    load_view(cache, source, VIEW)
+    queries = source.query_count
+
+    assert load_view(cache, source, VIEW).stale
+    cache.wait()
+    assert cache.stats()[VIEW]['revalidations'] == 1
+    assert source.query_count == queries
+
+    source.mark_modified()
+    load_view(cache, source, VIEW)
+    cache.wait()
+    assert cache.stats()[VIEW]['reloads'] == 1
+    assert source.query_count == queries + 1